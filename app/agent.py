@@ -12,39 +12,151 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import datetime
-import os
+import hashlib
 import json
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+import os
+import re
+import uuid
+from collections.abc import Iterator
+from typing import IO, Any, Literal
 
-import google.auth
-from google.adk.agents import Agent, RunConfig, LiveRequestQueue  # Importar Agent y RunConfig
-from toolbox_core import ToolboxSyncClient # Importar MCP Toolbox for DBs de Google
-from google.adk.runners import Runner
+from google.adk.agents import Agent, RunConfig  # Importar Agent y RunConfig
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.tool_context import ToolContext
 from google.genai import types as genai_types
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.genai.types import GenerateContentConfig
+from pydantic import BaseModel, Field, ValidationError
 
-from google.cloud import bigquery
-import uuid
-import asyncio
+from app.utils.bigquery_client import as_async_tool, get_bigquery_client
+from app.utils.booking_writer import BOOKING_WAL_PATH, BatchedRowWriter
+from app.utils.bulk_import import ImportResult, LoadJobImporter
+from app.utils.cache import GcsGeneration, TTLCache
+from app.utils.fast_path import FastPathRouter, Route
+from app.utils.history import HistoryCompactor
+from app.utils.idempotency import IdempotencyStore, idempotency_key
+from app.utils.metrics import AgentMetrics
+from app.utils.prompt_cache import PromptCache
+from app.utils.sql_guard import SqlGuard
+from app.utils.status_summary import DIMENSIONS, StatusSummary, SummaryKey, group_key
+from app.utils.toolbox_cache import CachedToolboxToolset
+from app.utils.travel_store import (
+    TRAVEL_REPLICA_ENABLED,
+    AnalyticsSpec,
+    BigQueryTravelStore,
+    ReplicatedTravelStore,
+    SqliteTravelStore,
+    StatusFilter,
+    TravelRequestStore,
+    TravelStoreError,
+)
 
-_, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
+# El proyecto (GOOGLE_CLOUD_PROJECT) lo resuelve el cliente de Gemini al primer uso,
+# así que no hace falta consultar las credenciales al importar el módulo.
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "europe-southwest1")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
 # --- Configuración del Modelo ---
-MODEL_ID = "gemini-2.5-flash" # 
+MODEL_ID = "gemini-2.5-flash"
+# Modelo del modo live (/live): la Live API solo admite modelos específicos.
+LIVE_MODEL_ID = os.environ.get("LIVE_MODEL_ID", "gemini-2.0-flash-live-preview-04-09")
 
 # --- Configuración de BigQuery ---
 BIGQUERY_PROJECT_ID = "fon-test-project"
 BIGQUERY_DATASET_ID = "foncorp_travel_data"
 BIGQUERY_TABLE_ID = "travel_requests"
 
+# "dml" ejecuta un INSERT por solicitud; "stream" encola las filas y las escribe por
+# micro-lotes con la API de streaming. Las filas recién escritas por streaming no
+# admiten UPDATE durante unos minutos, así que el modo por defecto sigue siendo DML.
+BOOKING_WRITE_MODE = os.environ.get("BOOKING_WRITE_MODE", "dml").lower()
+# Caché de lectura de get_travel_requests_by_status. Se invalida con cada escritura de
+# este proceso; con TRAVEL_CACHE_SHARED_BUCKET la invalidación llega al resto de instancias.
+TRAVEL_CACHE_TTL_SECONDS = float(os.environ.get("TRAVEL_CACHE_TTL_SECONDS", "60"))
+TRAVEL_CACHE_MAX_ENTRIES = int(os.environ.get("TRAVEL_CACHE_MAX_ENTRIES", "128"))
+TRAVEL_CACHE_SHARED_BUCKET = os.environ.get("TRAVEL_CACHE_SHARED_BUCKET")
+status_query_cache = TTLCache(
+    maxsize=TRAVEL_CACHE_MAX_ENTRIES,
+    ttl_seconds=TRAVEL_CACHE_TTL_SECONDS,
+    shared=GcsGeneration(
+        TRAVEL_CACHE_SHARED_BUCKET,
+        "cache/travel_requests.generation",
+        poll_interval=float(os.environ.get("TRAVEL_CACHE_SHARED_POLL_SECONDS", "5")),
+    )
+    if TRAVEL_CACHE_SHARED_BUCKET
+    else None,
+)
+
+# Número de solicitudes por página en get_travel_requests_by_status.
+TRAVEL_REQUESTS_PAGE_SIZE = int(os.environ.get("TRAVEL_REQUESTS_PAGE_SIZE", "10"))
+
+# Máximo de solicitudes que se pueden actualizar en una sola llamada masiva.
+BULK_UPDATE_MAX_IDS = int(os.environ.get("BULK_UPDATE_MAX_IDS", "100"))
+
+# En modo "stream" la reserva se confirma en cuanto está en el log local, así que el log
+# debe estar en almacenamiento persistente: el /tmp de Cloud Run vive en memoria.
+if BOOKING_WRITE_MODE == "stream" and not BOOKING_WAL_PATH:
+    raise ValueError(
+        "BOOKING_WRITE_MODE=stream requiere BOOKING_WAL_PATH en almacenamiento persistente."
+    )
+booking_writer = BatchedRowWriter(
+    f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}",
+    row_id_field="request_id",
+    on_flush=status_query_cache.invalidate,
+)
+
+# Reservas registradas recientemente por sesión. Si el modelo repite la llamada con los
+# mismos datos (tras un error transitorio o una confirmación reformulada) se devuelve la
+# solicitud original en lugar de crear otra.
+booking_dedupe = IdempotencyStore()
+
+# Almacenamiento de las solicitudes. BigQuery es siempre la fuente de verdad; con
+# TRAVEL_REPLICA_ENABLED los listados y las consultas por ID se sirven desde una réplica
+# SQLite local sincronizada por timestamp, con antigüedad máxima acotada.
+_bigquery_travel_store = BigQueryTravelStore(
+    f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}",
+    client_factory=lambda: get_bigquery_client(),
+)
+travel_store: TravelRequestStore = _bigquery_travel_store
+
+
+def _on_foreign_travel_change() -> None:
+    """Los cambios que llegan de otras instancias invalidan solo la caché y los recuentos de este proceso."""
+    status_query_cache.invalidate(propagate=False)
+    status_summary.mark_stale()
+
+
+if TRAVEL_REPLICA_ENABLED:
+    travel_store = ReplicatedTravelStore(
+        _bigquery_travel_store,
+        SqliteTravelStore(),
+        on_change=_on_foreign_travel_change,
+    )
+
+
+# Recuentos por estado, ciudad de destino y mes de inicio, mantenidos en memoria con cada
+# escritura de este proceso y recalculados con una consulta agregada cuando otra instancia
+# publica una invalidación en la caché compartida o cambia una solicitud no registrada aquí.
+def _load_summary_counts() -> Iterator[tuple[SummaryKey, int]]:
+    """Cuenta todas las solicitudes por estado, ciudad de destino y mes con una única consulta."""
+    spec = AnalyticsSpec(DIMENSIONS, ("requests",))
+    for group in _bigquery_travel_store.aggregate(spec, limit=1_000_000):
+        yield group_key(group), group["requests"]
+
+
+status_summary = StatusSummary(
+    _load_summary_counts,
+    generation=status_query_cache.shared.current if status_query_cache.shared else None,
+)
+
+# Máximo de grupos devueltos por get_travel_request_counts y get_travel_analytics.
+TRAVEL_COUNTS_MAX_GROUPS = 50
+
 # --- Definición del Prompt ---
-TRAVEL_AGENT_INSTRUCTION = f"""
+# Parte estática: idéntica en todos los turnos, se sirve mediante context caching de Gemini.
+# Las fechas van en la parte dinámica (travel_agent_dynamic_instruction), que se calcula en cada turno.
+TRAVEL_AGENT_STATIC_INSTRUCTION = """
 Eres un amigable y eficiente asistente de viajes para los empleados de la empresa Foncorp.
 Cuando un empleado inicie una conversación contigo, salúdalo cordialmente y preséntate indicando claramente qué puedes hacer por él en formato de lista.
 
@@ -65,7 +177,7 @@ Estados Comunes de Solicitudes y sus Significados (para tu conocimiento interno
 - 'Cancelada': Solicitudes canceladas.
 
 Descripción del Esquema de la Tabla de Solicitudes de Viaje
-A continuación se detalla el esquema de una tabla de base de datos que almacena solicitudes de viaje de empleados. 
+A continuación se detalla el esquema de una tabla de base de datos que almacena solicitudes de viaje de empleados.
 Utiliza esta información para comprender la estructura de los datos y cómo interactuar con ellos.
 Nombre de la Tabla: travel_requests (implícito)
 Columnas de la Tabla:
@@ -88,8 +200,8 @@ Instrucciones para las herramientas:
 1. Para registrar una nueva solicitud de viaje:
    - Recopila la siguiente información esencial: Nombre del empleado (pila), Apellidos del empleado, ID de empleado, Ciudad de Origen del viaje, Ciudad de Destino del viaje, Fecha de inicio (formato yyyy-MM-dd), Fecha de fin (formato yyyy-MM-dd), Medio de Transporte Preferido (Avión, Tren, Autobús, Coche), Tipo de Coche si aplica (Particular o Alquiler), y Motivo del viaje.
    - **Validación de Fechas Importante:**
-     - Ambas fechas, inicio y fin, DEBEN ser futuras a la fecha actual ({datetime.datetime.now().strftime('%Y-%m-%d')}).
-     - Si el usuario proporciona solo día y mes (ej. "15 de junio"), asume el año actual ({datetime.datetime.now().year}) para completar la fecha. Verifica que esta fecha resultante sea futura.
+     - Ambas fechas, inicio y fin, DEBEN ser futuras a la fecha actual (indicada en el contexto del turno).
+     - Si el usuario proporciona solo día y mes (ej. "15 de junio"), asume el año actual (indicado en el contexto del turno) para completar la fecha. Verifica que esta fecha resultante sea futura.
      - La fecha de fin no puede ser anterior a la fecha de inicio.
      - Si alguna fecha es inválida (pasada, o fin antes que inicio), NO llames a la herramienta. En su lugar, explica el problema al usuario y PÍDELE que proporcione fechas válidas. Por ejemplo: "Lo siento, la fecha [fecha inválida] ya ha pasado. Por favor, proporciona una fecha futura." o "La fecha de regreso no puede ser anterior a la de salida. Por favor, revisa las fechas."
    - Cuando tengas TODA la información válida (incluyendo fechas futuras y correctas), llama a la herramienta 'request_travel_booking_logic'.
@@ -101,11 +213,13 @@ Instrucciones para las herramientas:
      2. **Llama INMEDIATAMENTE a la herramienta `get_travel_requests_by_status`** con este `search_term`.
      3. **NO GENERES NINGUNA RESPUESTA AL USUARIO ANTES DE RECIBIR EL RESULTADO DE LA HERRAMIENTA.** Espera la cadena JSON de la herramienta.
      4. **Una vez que la herramienta devuelva el JSON, analiza su contenido y USA ÚNICAMENTE ESE CONTENIDO para formular tu respuesta completa y final al usuario en este mismo turno.**
-        - La herramienta devolverá datos como una cadena JSON: `{{"search_term": "...", "count": N, "requests": [{{"request_id": "...", ...}}], "message": "... opcional ..."}}` o `{{"message": "No se encontraron..."}}` o `{{"error": "..."}}`.
+        - La herramienta devolverá datos como una cadena JSON: `{"search_term": "...", "count": N, "requests": [{"request_id": "...", ...}], "message": "... opcional ..."}` o `{"message": "No se encontraron..."}` o `{"error": "..."}`.
         - Si el JSON tiene `"count" > 0` y una lista de `"requests"`: Responde con algo como: "He encontrado [count] solicitudes [search_term]. Aquí están:
           - ID: [request_id_1], Empleado: [employee_name_1], Destino: [destination_city_1], Fechas: [start_date_1] a [end_date_1], Motivo: [reason_1]
           - ID: [request_id_2], Empleado: [employee_name_2], Destino: [destination_city_2], Fechas: [start_date_2] a [end_date_2], Motivo: [reason_2]
           (Continúa para todas las solicitudes en la lista `requests`)"
+        - `count` es el total de solicitudes que cumplen el filtro; `requests` contiene solo la página actual. Si el JSON incluye `"next_page_token"`, indica al usuario cuántas se muestran y que hay más disponibles.
+        - Si el usuario pide ver más resultados, llama de nuevo a `get_travel_requests_by_status` con el mismo `search_term` y `page_token` igual al `next_page_token` recibido. NO uses 'execute_sql_tool' para paginar.
         - Si el JSON tiene un `"message"` (ej. no se encontraron resultados): Responde directamente con ese mensaje. Por ejemplo: "No se encontraron solicitudes para el término: [search_term]."
         - Si el JSON tiene un `"error"`: Responde informando del error. Por ejemplo: "Hubo un error al consultar las solicitudes: [error_message]."
      5. **ASEGÚRATE de que tu respuesta al usuario sea la presentación directa de los datos (o mensaje de no datos/error) recibidos de la herramienta, sin comentarios adicionales tuyos antes de presentar estos datos.**
@@ -115,23 +229,76 @@ Instrucciones para las herramientas:
    - Pregunta al usuario por estos datos si no los proporciona. Asegúrate de que 'new_status' sea uno de los estados válidos listados arriba.
    - Llama a la herramienta 'update_travel_request_status' con los argumentos: request_id (str) y new_status (str).
    - Después de llamar a la herramienta, informa al usuario del resultado que devuelva la herramienta (confirmación o error).
+   - Si el usuario quiere cambiar el estado de VARIAS solicitudes a la vez (ej. "aprueba todas estas"), llama UNA sola vez a la herramienta 'update_travel_requests_status_bulk' con los argumentos: request_ids (lista de str) y new_status (str), en lugar de llamar repetidamente a 'update_travel_request_status'.
+   - 'update_travel_requests_status_bulk' devuelve un JSON con `"results"`: para cada `request_id`, `"result"` es "actualizada", "sin_cambios" (ya estaba en ese estado) o "no_encontrada". Resume al usuario cuántas se actualizaron e indica las que no se encontraron o no cambiaron.
+
+4. Para preguntas de recuento o totales (ej. "¿cuántas solicitudes hay por estado?", "¿cuántos viajes a Barcelona este mes?"):
+   - Llama a la herramienta 'get_travel_request_counts' en lugar de escribir SQL. Argumentos opcionales: group_by (lista con "status", "destination_city" y/o "month"), statuses (lista de estados), destination_city (str), month_from y month_to (mes de inicio del viaje, formato yyyy-MM).
+   - "Este mes" significa month_from y month_to iguales al mes actual. Los meses se refieren a la fecha de inicio del viaje.
+   - Devuelve un JSON con `"total"` y `"groups"` (cada grupo con sus dimensiones y `"count"`). Si devuelve un `"error"` indicando que el resumen no está disponible, responde a la pregunta con 'execute_sql_tool'.
+
+5. Para preguntas de tendencias o estadísticas (ej. destinos más frecuentes, duración media de los viajes, reparto por medio de transporte, empleados que más viajan):
+   - Llama a la herramienta 'get_travel_analytics' en lugar de pedir filas y calcularlo tú. Argumentos: dimensions (hasta 2 de "destination_city", "origin_city", "transport_mode", "status", "employee_id", "month"), metrics (uno o más de "requests", "employees", "avg_trip_days", "total_trip_days"), y opcionalmente start_date_from y start_date_to (fecha de inicio del viaje, yyyy-MM-dd) y statuses (lista de estados).
+   - Devuelve un JSON compacto con `"columns"` y `"rows"` (una fila por grupo, ordenadas por mes si es una dimensión y después por la primera métrica, de mayor a menor). Presenta los datos tal cual, sin recalcularlos; si incluye `"truncated": true`, indica que solo se muestran los primeros grupos.
 
-4. Para cualquier otra consulta:
+6. Para cualquier otra consulta:
    - Utiliza la herramienta 'execute_sql_tool', con este table ID: fon-test-project.foncorp_travel_data.travel_requests.
    - Construye una consulta SQL en función de la información que suministre el cliente.
    - Ten en cuenta el esquema de la base de datos que se ha facilitado con estas instrucciones.
+   - Selecciona solo las columnas necesarias y filtra por `timestamp` o por fechas siempre que la pregunta lo permita. Las consultas demasiado costosas se rechazan con un error que explica cómo acotarlas; corrige la consulta y vuelve a intentarlo.
 
 Reglas Generales:
 - NO inventes información para las herramientas. Pide al usuario cualquier dato que falte.
 - Sé siempre cortés y profesional.
-- La fecha actual es: {datetime.datetime.now().strftime('%Y-%m-%d')}. Considera esto para inferir años si el usuario solo da día y mes para las fechas de viaje.
+- La fecha actual se indica en el contexto del turno. Considérala para inferir años si el usuario solo da día y mes para las fechas de viaje.
 """
 
+
+def travel_agent_dynamic_instruction(context: ReadonlyContext) -> str:
+    """Parte dinámica del prompt: se evalúa en cada turno para que la fecha nunca quede desfasada."""
+    today = datetime.date.today()
+    return (
+        "Contexto del turno:\n"
+        f"- La fecha actual es: {today.strftime('%Y-%m-%d')}.\n"
+        f"- El año actual es: {today.year}."
+    )
+
+
+prompt_cache = PromptCache(TRAVEL_AGENT_STATIC_INSTRUCTION)
+
 # Conectamos con el Google MCP ToolBox Server (previamente hay que arrancarlo)
-# toolbox = ToolboxSyncClient("http://mcp.fon.demo.altostrat.com:5000")
-toolbox = ToolboxSyncClient("https://toolbox-429460911019.europe-southwest1.run.app")
-#toolbox = ToolboxSyncClient("http://127.0.0.1:5000")
-tools = toolbox.load_toolset('adk-travel-agent-toolset')
+# El toolset se carga de forma perezosa en la primera invocación y el manifiesto se
+# guarda en una caché local, así que importar este módulo no hace llamadas de red.
+# TOOLBOX_URL="http://mcp.fon.demo.altostrat.com:5000"
+# TOOLBOX_URL="http://127.0.0.1:5000"
+TOOLBOX_URL = os.environ.get(
+    "TOOLBOX_URL", "https://toolbox-429460911019.europe-southwest1.run.app"
+)
+TOOLBOX_TOOLSET = os.environ.get("TOOLBOX_TOOLSET", "adk-travel-agent-toolset")
+
+
+def _on_sql_write() -> None:
+    """Un DML del modelo puede cambiar cualquier fila sin tocar `timestamp`: se recalculan los recuentos y la réplica."""
+    status_summary.mark_stale()
+    if isinstance(travel_store, ReplicatedTravelStore):
+        travel_store.request_full_sync()
+
+
+# Las consultas SQL que escribe el modelo se estiman con un dry run antes de ejecutarse:
+# las que superan SQL_GUARD_MAX_BYTES se rechazan y los SELECT se limitan y se cachean
+# junto al resto de lecturas, de modo que cualquier escritura los invalida y marca
+# como desactualizados los recuentos en memoria y la réplica local.
+sql_guard = SqlGuard(
+    status_query_cache,
+    client_factory=lambda: get_bigquery_client(),
+    on_write=_on_sql_write,
+)
+toolbox_toolset = CachedToolboxToolset(
+    TOOLBOX_URL,
+    TOOLBOX_TOOLSET,
+    tool_wrappers={"execute_sql_tool": sql_guard.wrap},
+)
+
 
 # --- (Opcional) Pydantic para claridad de argumentos ---
 class _TravelBookingArgsSchema(BaseModel):
@@ -140,21 +307,191 @@ class _TravelBookingArgsSchema(BaseModel):
     employee_id: str = Field(description="ID del empleado.")
     origin_city: str = Field(description="Ciudad de origen del viaje.")
     destination_city: str = Field(description="Ciudad de destino del viaje.")
-    start_date: str = Field(description="Fecha de inicio del viaje en formato yyyy-MM-dd.")
+    start_date: str = Field(
+        description="Fecha de inicio del viaje en formato yyyy-MM-dd."
+    )
     end_date: str = Field(description="Fecha de fin del viaje en formato yyyy-MM-dd.")
     transport_mode: str = Field(description="Medio de transporte preferido.")
     reason: str = Field(description="Motivo del viaje.")
-    car_type: Optional[str] = Field(default=None, description="Tipo de coche si es 'Coche' (Particular o Alquiler).")
+    car_type: str | None = Field(
+        default=None, description="Tipo de coche si es 'Coche' (Particular o Alquiler)."
+    )
+
 
 class _GetTravelRequestsArgsSchema(BaseModel):
-    search_term: str = Field(description="El estado o término de búsqueda para las solicitudes (ej. 'Cancelada', 'Pendiente', 'Registrada').")
+    search_term: str = Field(
+        description="El estado o término de búsqueda para las solicitudes (ej. 'Cancelada', 'Pendiente', 'Registrada')."
+    )
+    page_token: str | None = Field(
+        default=None,
+        description="Token 'next_page_token' devuelto por la llamada anterior para obtener la siguiente página.",
+    )
+
 
 class _UpdateTravelRequestArgsSchema(BaseModel):
     request_id: str = Field(description="ID de la solicitud a actualizar.")
     new_status: str = Field(description="Nuevo estado para la solicitud.")
 
 
-# --- Lógica de la Herramienta 1: Registrar Solicitud (Usa DML INSERT) ---
+class _BulkUpdateTravelRequestsArgsSchema(BaseModel):
+    request_ids: list[str] = Field(
+        min_length=1,
+        max_length=BULK_UPDATE_MAX_IDS,
+        description="IDs de las solicitudes a actualizar.",
+    )
+    new_status: str = Field(description="Nuevo estado para las solicitudes.")
+
+
+class _TravelAnalyticsArgsSchema(BaseModel):
+    dimensions: list[
+        Literal[
+            "destination_city",
+            "origin_city",
+            "transport_mode",
+            "status",
+            "employee_id",
+            "month",
+        ]
+    ] = Field(
+        default_factory=list, max_length=2, description="Dimensiones de agrupación."
+    )
+    metrics: list[
+        Literal["requests", "employees", "avg_trip_days", "total_trip_days"]
+    ] = Field(
+        default=["requests"],
+        min_length=1,
+        max_length=4,
+        description="Métricas a calcular.",
+    )
+    start_date_from: datetime.date | None = Field(
+        default=None,
+        description="Primera fecha de inicio de viaje incluida (yyyy-MM-dd).",
+    )
+    start_date_to: datetime.date | None = Field(
+        default=None,
+        description="Última fecha de inicio de viaje incluida (yyyy-MM-dd).",
+    )
+    statuses: list[str] | None = Field(default=None, description="Estados a incluir.")
+
+
+class _TravelRequestCountsArgsSchema(BaseModel):
+    group_by: list[Literal["status", "destination_city", "month"]] = Field(
+        default_factory=list, max_length=3, description="Dimensiones de agrupación."
+    )
+    statuses: list[str] | None = Field(default=None, description="Estados a contar.")
+    destination_city: str | None = Field(
+        default=None, description="Ciudad de destino a contar."
+    )
+    month_from: str | None = Field(
+        default=None,
+        pattern=r"^\d{4}-\d{2}$",
+        description="Primer mes de inicio (yyyy-MM).",
+    )
+    month_to: str | None = Field(
+        default=None,
+        pattern=r"^\d{4}-\d{2}$",
+        description="Último mes de inicio (yyyy-MM).",
+    )
+
+
+VALID_STATUSES = [
+    "Registrada",
+    "Pendiente de Aprobación",
+    "Aprobada",
+    "Rechazada",
+    "Reservada",
+    "Completada",
+    "Cancelada",
+]
+
+_STATUS_MAP = {
+    "registrada": "Registrada",
+    "pendiente de aprobación": "Pendiente de Aprobación",
+    "pendiente": "Pendiente de Aprobación",
+    "aprobada": "Aprobada",
+    "rechazada": "Rechazada",
+    "reservada": "Reservada",
+    "completada": "Completada",
+    "cancelada": "Cancelada",
+}
+
+
+def _normalize_status(new_status: str) -> str | None:
+    """Convierte el estado indicado por el usuario en uno de VALID_STATUSES, o None si no es válido."""
+    final_status = _STATUS_MAP.get(new_status.lower().strip())
+    if not final_status:
+        capitalized_status_direct = new_status.strip().capitalize()
+        if capitalized_status_direct in VALID_STATUSES:
+            final_status = capitalized_status_direct
+    return final_status
+
+
+def _apply_status_change(
+    request_ids: list[str], final_status: str
+) -> dict[str, str | None]:
+    """
+    Cambia el estado de las solicitudes indicadas en un único viaje de ida y vuelta.
+
+    Actualiza solo las que no estaban ya en `final_status` y devuelve los estados previos,
+    de modo que se distingue "no encontrada" de "ya estaba en ese estado".
+    Devuelve {request_id: estado_previo} para las solicitudes encontradas.
+    """
+    previous_statuses = travel_store.apply_status_change(
+        request_ids,
+        final_status,
+        datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    )
+    status_summary.record_status_change(previous_statuses, final_status)
+    return previous_statuses
+
+
+def _booking_confirmation(
+    request_id: str, args: _TravelBookingArgsSchema, via: str = ""
+) -> str:
+    """Construye el mensaje de confirmación de una solicitud registrada."""
+    full_name = f"{args.employee_first_name} {args.employee_last_name}"
+    car_detail = (
+        f" ({args.car_type})"
+        if args.car_type and args.transport_mode.lower() == "coche"
+        else ""
+    )
+    return (
+        f"¡Solicitud registrada{via}! ID: {request_id}. "
+        f"Para {full_name} (ID: {args.employee_id}) desde {args.origin_city} a {args.destination_city} "
+        f"({args.start_date} a {args.end_date}), usando {args.transport_mode}"
+        f"{car_detail}. Motivo: {args.reason}."
+    )
+
+
+def _booking_date_error(start_date: str, end_date: str) -> str | None:
+    """Comprueba las reglas de fechas de una reserva; devuelve el motivo del rechazo o None si son válidas."""
+    try:
+        date_format = "%Y-%m-%d"
+        current_date_obj = datetime.datetime.now().date()
+        start_date_obj = datetime.datetime.strptime(start_date, date_format).date()
+        end_date_obj = datetime.datetime.strptime(end_date, date_format).date()
+    except ValueError:
+        return "El formato de las fechas no es válido. Utiliza yyyy-MM-dd."
+    if start_date_obj < current_date_obj:
+        return f"La fecha de inicio '{start_date}' ya ha pasado."
+    if end_date_obj < current_date_obj:
+        return f"La fecha de fin '{end_date}' ya ha pasado."
+    if end_date_obj < start_date_obj:
+        return "La fecha de fin no puede ser anterior a la fecha de inicio."
+    return None
+
+
+def _new_booking_row(validated_args: _TravelBookingArgsSchema) -> dict[str, Any]:
+    """Construye la fila de una nueva solicitud en estado 'Registrada'."""
+    return {
+        "request_id": str(uuid.uuid4()),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        **validated_args.model_dump(),
+        "status": "Registrada",
+    }
+
+
+# --- Lógica de la Herramienta 1: Registrar Solicitud (DML INSERT o escritura por lotes) ---
 def request_travel_booking_logic(
     employee_first_name: str,
     employee_last_name: str,
@@ -165,7 +502,8 @@ def request_travel_booking_logic(
     end_date: str,
     transport_mode: str,
     reason: str,
-    car_type: Optional[str] = None
+    car_type: str | None = None,
+    tool_context: ToolContext | None = None,
 ) -> str:
     """Registra una solicitud de reserva de viaje en BigQuery con el nuevo esquema."""
     try:
@@ -179,269 +517,864 @@ def request_travel_booking_logic(
             end_date=end_date,
             transport_mode=transport_mode,
             reason=reason,
-            car_type=car_type)
+            car_type=car_type,
+        )
     except Exception as e:
         return f"Error de validación: {e}"
-    try:
-        date_format = "%Y-%m-%d"
-        current_date_obj = datetime.datetime.now().date()
-        start_date_obj = datetime.datetime.strptime(start_date, date_format).date()
-        end_date_obj = datetime.datetime.strptime(end_date, date_format).date()
+    date_error = _booking_date_error(start_date, end_date)
+    if date_error:
+        return f"Error en la herramienta: {date_error}"
+    if tool_context is None:
+        return _register_booking(validated_args)
+
+    # Misma sesión y mismos datos: se devuelve la confirmación original sin volver a escribir.
+    invocation = tool_context._invocation_context
+    key = idempotency_key(
+        f"{invocation.session.user_id}/{invocation.session.id}",
+        validated_args.model_dump(),
+    )
+    confirmation_message, replayed = booking_dedupe.run(
+        key,
+        lambda: _register_booking(validated_args),
+        keep=lambda message: message.startswith("¡Solicitud registrada"),
+    )
+    if replayed:
+        print(
+            f"[LOG request_travel_booking_logic]: Reserva repetida, se devuelve la original: {confirmation_message}"
+        )
+    return confirmation_message
 
-        if start_date_obj < current_date_obj:
-            return f"Error en la herramienta: La fecha de inicio '{start_date}' ya ha pasado."
-        if end_date_obj < current_date_obj:
-             return f"Error en la herramienta: La fecha de fin '{end_date}' ya ha pasado."
-        if end_date_obj < start_date_obj:
-            return "Error en la herramienta: La fecha de fin no puede ser anterior a la fecha de inicio."
-    except ValueError:
-        return "Error en la herramienta: El formato de las fechas no es válido. Utiliza yyyy-MM-dd."
 
+def _register_booking(validated_args: _TravelBookingArgsSchema) -> str:
+    """Escribe una nueva solicitud según BOOKING_WRITE_MODE y devuelve la confirmación o el error."""
     try:
-        client = bigquery.Client()
-        request_id_val = str(uuid.uuid4())
-        current_timestamp = datetime.datetime.now(datetime.timezone.utc)
-        initial_status = "Registrada"
-        table_ref_str = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
-
-        query = f"""
-            INSERT INTO `{table_ref_str}` (
-                request_id, timestamp, employee_first_name, employee_last_name, employee_id,
-                origin_city, destination_city, start_date, end_date,
-                transport_mode, car_type, reason, status
-            ) VALUES (
-                @request_id, @timestamp, @employee_first_name, @employee_last_name, @employee_id,
-                @origin_city, @destination_city, @start_date, @end_date,
-                @transport_mode, @car_type, @reason, @status
-            )
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("request_id", "STRING", request_id_val),
-                bigquery.ScalarQueryParameter("timestamp", "TIMESTAMP", current_timestamp.isoformat()),
-                bigquery.ScalarQueryParameter("employee_first_name", "STRING", validated_args.employee_first_name),
-                bigquery.ScalarQueryParameter("employee_last_name", "STRING", validated_args.employee_last_name),
-                bigquery.ScalarQueryParameter("employee_id", "STRING", validated_args.employee_id),
-                bigquery.ScalarQueryParameter("origin_city", "STRING", validated_args.origin_city),
-                bigquery.ScalarQueryParameter("destination_city", "STRING", validated_args.destination_city),
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date),
-                bigquery.ScalarQueryParameter("transport_mode", "STRING", transport_mode),
-                bigquery.ScalarQueryParameter("car_type", "STRING", car_type),
-                bigquery.ScalarQueryParameter("reason", "STRING", reason),
-                bigquery.ScalarQueryParameter("status", "STRING", initial_status),
-            ]
-        )
-        query_job = client.query(query, job_config=job_config)
-        query_job.result()
+        row = _new_booking_row(validated_args)
+        request_id_val = row["request_id"]
 
-        if query_job.errors:
-            error_messages = "; ".join([str(error["message"]) for error in query_job.errors])
-            print(f"[LOG request_travel_booking_logic - ERROR BQ DML]: {error_messages}")
-            return f"Error al registrar la solicitud (DML): {error_messages}."
+        if BOOKING_WRITE_MODE == "stream":
+            # Se confirma en cuanto la fila queda en el log local; el escritor la
+            # envía a BigQuery en el siguiente micro-lote.
+            booking_writer.submit(row)
+            status_summary.record(row)
+            if isinstance(travel_store, ReplicatedTravelStore):
+                # La réplica local la sirve ya; la sincronización no la vería hasta que
+                # el escritor la envíe a BigQuery.
+                travel_store.replica.upsert([row])
+            confirmation_message = _booking_confirmation(request_id_val, validated_args)
+            print(f"[LOG request_travel_booking_logic]: {confirmation_message}")
+            return confirmation_message
+
+        try:
+            inserted_rows = travel_store.insert(row)
+        except TravelStoreError as e:
+            print(f"[LOG request_travel_booking_logic - ERROR BQ DML]: {e}")
+            return f"Error al registrar la solicitud (DML): {e}."
+        if inserted_rows > 0:
+            status_query_cache.invalidate()
+            status_summary.record(row)
+            confirmation_message = _booking_confirmation(
+                request_id_val, validated_args, " (DML)"
+            )
+            print(f"[LOG request_travel_booking_logic]: {confirmation_message}")
+            return confirmation_message
         else:
-            if query_job.num_dml_affected_rows is not None and query_job.num_dml_affected_rows > 0:
-                full_name = f"{validated_args.employee_first_name} {validated_args.employee_last_name}"
-                confirmation_message = (
-                    f"¡Solicitud registrada (DML)! ID: {request_id_val}. "
-                    f"Para {full_name} (ID: {employee_id}) desde {origin_city} a {destination_city} "
-                    f"({start_date} a {end_date}), usando {transport_mode}"
-                    f"{f' ({car_type})' if car_type and transport_mode.lower() == 'coche' else ''}. Motivo: {reason}."
-                )
-                print(f"[LOG request_travel_booking_logic]: {confirmation_message}")
-                return confirmation_message
-            else:
-                print(f"[LOG request_travel_booking_logic - ERROR BQ DML]: No se afectaron filas.")
-                return "Error al registrar la solicitud: no se insertaron filas."
+            print(
+                "[LOG request_travel_booking_logic - ERROR BQ DML]: No se afectaron filas."
+            )
+            return "Error al registrar la solicitud: no se insertaron filas."
     except Exception as e:
         print(f"[LOG request_travel_booking_logic - ERROR]: {e}")
         return f"Error técnico al registrar la solicitud: {e}."
 
+
+def _encode_page_token(
+    filter_key: tuple, last_timestamp: Any, last_request_id: str
+) -> str:
+    """Genera un token opaco con la posición (timestamp, request_id) de la última fila devuelta."""
+    if isinstance(last_timestamp, datetime.datetime):
+        last_timestamp = last_timestamp.isoformat()
+    payload = {
+        "f": hashlib.sha256(repr(filter_key).encode()).hexdigest()[:16],
+        "ts": str(last_timestamp),
+        "id": last_request_id,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_page_token(page_token: str, filter_key: tuple) -> tuple[str, str] | None:
+    """Devuelve la posición (timestamp, request_id) del token, o None si no es válido para este filtro."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+        if payload["f"] != hashlib.sha256(repr(filter_key).encode()).hexdigest()[:16]:
+            return None
+        return str(payload["ts"]), str(payload["id"])
+    except Exception:
+        return None
+
+
 # --- Lógica de la Herramienta 2: Consultar Solicitudes por Estado (Devuelve JSON) ---
-def get_travel_requests_by_status(search_term: str) -> str:
-    """Consulta solicitudes de viaje por estado o término. Devuelve una cadena JSON."""
+def get_travel_requests_by_status(
+    search_term: str, page_token: str | None = None
+) -> str:
+    """Consulta solicitudes de viaje por estado o término, paginadas de la más reciente a la más antigua. Devuelve una cadena JSON; si hay más resultados incluye 'next_page_token'."""
     try:
         validated_args = _GetTravelRequestsArgsSchema(
-            search_term=search_term
+            search_term=search_term, page_token=page_token
         )
         search_term = validated_args.search_term
+        page_token = validated_args.page_token
     except Exception as e:
         return json.dumps({"error": f"Error de validación: {e}"})
     try:
-        client = bigquery.Client()
-        table_ref_str = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
-        status_conditions = []
-        query_params = []
-        param_counter = 0
+        statuses: list[str] = []
+        case_insensitive = True
         processed_search_term = search_term.lower().strip()
 
-        if "pendiente" in processed_search_term or \
-           "sin aprobar" in processed_search_term or \
-           "nuevas" in processed_search_term or \
-           ("registrada" in processed_search_term and "aprobaci" not in processed_search_term) :
-            param_counter += 1
-            status_conditions.append(f"LOWER(status) = LOWER(@status_param_{param_counter})")
-            query_params.append(bigquery.ScalarQueryParameter(f"status_param_{param_counter}", "STRING", "Registrada"))
-            if "aprobaci" in processed_search_term or "pendiente" in processed_search_term :
-                 param_counter += 1
-                 if not any(p.value.lower() == "pendiente de aprobación" for p in query_params):
-                    status_conditions.append(f"LOWER(status) = LOWER(@status_param_{param_counter})")
-                    query_params.append(bigquery.ScalarQueryParameter(f"status_param_{param_counter}", "STRING", "Pendiente de Aprobación"))
-        
-        exact_final_statuses = ["aprobada", "rechazada", "reservada", "completada", "cancelada"]
-        if processed_search_term in exact_final_statuses or \
-           (not status_conditions and processed_search_term):
+        if (
+            "pendiente" in processed_search_term
+            or "sin aprobar" in processed_search_term
+            or "nuevas" in processed_search_term
+            or (
+                "registrada" in processed_search_term
+                and "aprobaci" not in processed_search_term
+            )
+        ):
+            statuses.append("Registrada")
+            if (
+                "aprobaci" in processed_search_term
+                or "pendiente" in processed_search_term
+            ):
+                statuses.append("Pendiente de Aprobación")
+
+        exact_final_statuses = [
+            "aprobada",
+            "rechazada",
+            "reservada",
+            "completada",
+            "cancelada",
+        ]
+        if processed_search_term in exact_final_statuses or (
+            not statuses and processed_search_term
+        ):
             capitalized_search = search_term.strip().capitalize()
             if capitalized_search in [s.capitalize() for s in exact_final_statuses]:
-                 search_term_final = capitalized_search
+                search_term_final = capitalized_search
             else:
-                 search_term_final = search_term.strip()
-            status_conditions = []
-            query_params = []
-            param_counter = 0
-            param_counter += 1
-            status_conditions.append(f"status = @status_param_{param_counter}")
-            query_params.append(bigquery.ScalarQueryParameter(f"status_param_{param_counter}", "STRING", search_term_final))
-
-        if not status_conditions:
-             print(f"[LOG get_travel_requests_by_status]: Término no interpretado '{search_term}'.")
-             return json.dumps({
-                 "error": f"No pude interpretar el término de búsqueda de estado: '{search_term}'. Intenta usar uno de los estados conocidos (Registrada, Pendiente de Aprobación, Aprobada, Rechazada, Reservada, Completada, Cancelada)."
-             })
-
-        where_clause = " OR ".join(status_conditions)
-        query = f"""
-            SELECT request_id, employee_first_name, employee_last_name,
-                   origin_city, destination_city, start_date, end_date, transport_mode, car_type, reason, status
-            FROM `{table_ref_str}` WHERE {where_clause} ORDER BY timestamp DESC LIMIT 10
-        """
-        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-        query_job = client.query(query, job_config=job_config)
-        results = query_job.result()
-
-        if results.total_rows == 0:
-            print(f"[LOG get_travel_requests_by_status]: No se encontraron solicitudes para '{search_term}'.")
-            return json.dumps({
-                "search_term": search_term,
-                "count": 0,
-                "requests": [],
-                "message": f"No se encontraron solicitudes de viaje para el término: '{search_term}'."
-            })
-
-        output_requests = []
-        for row in results:
-            employee_full_name = f"{row.employee_first_name or ''} {row.employee_last_name or ''}".strip()
-            request_data = {
-                "request_id": str(row.request_id or "N/A"),
-                "employee_name": str(employee_full_name or "N/A"),
-                "origin_city": str(row.origin_city or "N/A"),
-                "destination_city": str(row.destination_city or "N/A"),
-                "start_date": str(row.start_date) if row.start_date else "N/A",
-                "end_date": str(row.end_date) if row.end_date else "N/A",
-                "transport_mode": str(row.transport_mode or "N/A"),
-                "car_type": str(row.car_type or "N/A") if row.car_type else None,
-                "reason": str(row.reason or "N/A"),
-                "status": str(row.status or "N/A")
-            }
-            output_requests.append(request_data)
-        
-        print(f"[LOG DE HERRAMIENTA get_travel_requests_by_status]: JSON generado para '{search_term}'.")
-        return json.dumps({
+                search_term_final = search_term.strip()
+            statuses = [search_term_final]
+            case_insensitive = False
+
+        if not statuses:
+            print(
+                f"[LOG get_travel_requests_by_status]: Término no interpretado '{search_term}'."
+            )
+            return json.dumps(
+                {
+                    "error": f"No pude interpretar el término de búsqueda de estado: '{search_term}'. Intenta usar uno de los estados conocidos (Registrada, Pendiente de Aprobación, Aprobada, Rechazada, Reservada, Completada, Cancelada)."
+                }
+            )
+
+        # La caché se indexa por el conjunto de estados ya resuelto, no por el texto del usuario.
+        filter_key = StatusFilter(tuple(statuses), case_insensitive)
+        cursor = None
+        if page_token:
+            cursor = _decode_page_token(page_token, filter_key)
+            if cursor is None:
+                return json.dumps(
+                    {
+                        "error": "El 'page_token' no es válido para esta búsqueda. Repite la consulta sin 'page_token'."
+                    }
+                )
+
+        page_key = (*filter_key, cursor, TRAVEL_REQUESTS_PAGE_SIZE)
+        count_key = (*filter_key, "count")
+        cached_page = status_query_cache.get(page_key)
+        total_rows = status_query_cache.get(count_key)
+        if cached_page is None or total_rows is None:
+            cache_version = status_query_cache.version()
+            # Se pide una fila de más para saber si hay otra página.
+            result = travel_store.find_by_status(
+                filter_key,
+                cursor,
+                TRAVEL_REQUESTS_PAGE_SIZE + 1,
+                page=cached_page is None,
+                count=total_rows is None,
+            )
+            if result.rows is not None:
+                rows = result.rows
+                output_requests = []
+                for row in rows[:TRAVEL_REQUESTS_PAGE_SIZE]:
+                    employee_full_name = f"{row['employee_first_name'] or ''} {row['employee_last_name'] or ''}".strip()
+                    request_data = {
+                        "request_id": str(row["request_id"] or "N/A"),
+                        "employee_name": str(employee_full_name or "N/A"),
+                        "destination_city": str(row["destination_city"] or "N/A"),
+                        "start_date": str(row["start_date"])
+                        if row["start_date"]
+                        else "N/A",
+                        "end_date": str(row["end_date"]) if row["end_date"] else "N/A",
+                        "reason": str(row["reason"] or "N/A"),
+                        "status": str(row["status"] or "N/A"),
+                    }
+                    output_requests.append(request_data)
+                next_page_token = None
+                if len(rows) > TRAVEL_REQUESTS_PAGE_SIZE:
+                    last_row = rows[TRAVEL_REQUESTS_PAGE_SIZE - 1]
+                    next_page_token = _encode_page_token(
+                        filter_key, last_row["timestamp"], last_row["request_id"]
+                    )
+                cached_page = (output_requests, next_page_token)
+                status_query_cache.set(page_key, cached_page, version=cache_version)
+            if result.total is not None:
+                total_rows = result.total
+                status_query_cache.set(count_key, total_rows, version=cache_version)
+        output_requests, next_page_token = cached_page
+
+        if total_rows == 0:
+            print(
+                f"[LOG get_travel_requests_by_status]: No se encontraron solicitudes para '{search_term}'."
+            )
+            return json.dumps(
+                {
+                    "search_term": search_term,
+                    "count": 0,
+                    "requests": [],
+                    "message": f"No se encontraron solicitudes de viaje para el término: '{search_term}'.",
+                }
+            )
+
+        print(
+            f"[LOG DE HERRAMIENTA get_travel_requests_by_status]: JSON generado para '{search_term}'."
+        )
+        response = {
             "search_term": search_term,
-            "count": results.total_rows,
-            "requests": output_requests
-        })
+            "count": total_rows,
+            "requests": output_requests,
+        }
+        if next_page_token:
+            response["next_page_token"] = next_page_token
+        return json.dumps(response)
 
     except Exception as e:
         print(f"[LOG DE HERRAMIENTA get_travel_requests_by_status - ERROR]: {e}")
-        return json.dumps({"error": f"Error técnico al consultar las solicitudes de viaje: {e}."})
+        return json.dumps(
+            {"error": f"Error técnico al consultar las solicitudes de viaje: {e}."}
+        )
+
 
 # --- Lógica de la Herramienta 3: Actualizar Estado de Solicitud ---
 def update_travel_request_status(request_id: str, new_status: str) -> str:
     """Actualiza el estado de una solicitud de viaje específica en BigQuery."""
     try:
         validated_args = _UpdateTravelRequestArgsSchema(
-            request_id=request_id,
-            new_status=new_status
+            request_id=request_id, new_status=new_status
         )
         request_id = validated_args.request_id
         new_status = validated_args.new_status
     except Exception as e:
         return f"Error de validación: {e}"
-    valid_statuses = ["Registrada", "Pendiente de Aprobación", "Aprobada", "Rechazada", "Reservada", "Completada", "Cancelada"]
-    
-    status_map = {
-        "registrada": "Registrada",
-        "pendiente de aprobación": "Pendiente de Aprobación",
-        "pendiente": "Pendiente de Aprobación",
-        "aprobada": "Aprobada",
-        "rechazada": "Rechazada",
-        "reservada": "Reservada",
-        "completada": "Completada",
-        "cancelada": "Cancelada"
-    }
-    normalized_new_status = new_status.lower().strip()
-    final_status = status_map.get(normalized_new_status)
-
+    final_status = _normalize_status(new_status)
     if not final_status:
-        capitalized_status_direct = new_status.strip().capitalize()
-        if capitalized_status_direct in valid_statuses:
-             final_status = capitalized_status_direct
-        else:
-            return f"Error: '{new_status}' no es un estado válido. Válidos: {', '.join(valid_statuses)}."
+        return f"Error: '{new_status}' no es un estado válido. Válidos: {', '.join(VALID_STATUSES)}."
 
     try:
-        client = bigquery.Client()
-        table_ref_str = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}"
-        query = f"""
-            UPDATE `{table_ref_str}`
-            SET status = @new_status_param, timestamp = @current_timestamp_param
-            WHERE request_id = @request_id_param
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("new_status_param", "STRING", final_status),
-                bigquery.ScalarQueryParameter("request_id_param", "STRING", request_id),
-                bigquery.ScalarQueryParameter("current_timestamp_param", "TIMESTAMP", datetime.datetime.now(datetime.timezone.utc).isoformat())
-            ]
-        )
-        query_job = client.query(query, job_config=job_config)
-        query_job.result()
-
-        if query_job.num_dml_affected_rows is not None and query_job.num_dml_affected_rows > 0:
-            success_message = f"Solicitud ID '{request_id}' actualizada a '{final_status}'."
-            print(f"[LOG update_travel_request_status]: {success_message}")
-            return success_message
-        else:
-            check_query = f"SELECT status FROM `{table_ref_str}` WHERE request_id = @request_id_param"
-            check_job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("request_id_param", "STRING", request_id)])
-            check_job = client.query(check_query, job_config=check_job_config)
-            check_results = list(check_job.result())
-            if not check_results:
-                 not_found_message = f"No se encontró solicitud con ID '{request_id}'."
-            elif check_results[0].status == final_status:
-                 not_found_message = f"La solicitud ID '{request_id}' ya estaba en estado '{final_status}'. No se realizaron cambios."
-            else:
-                 not_found_message = f"No se pudo actualizar la solicitud ID '{request_id}'. Razón desconocida."
+        previous_statuses = _apply_status_change([request_id], final_status)
+        if request_id not in previous_statuses:
+            not_found_message = f"No se encontró solicitud con ID '{request_id}'."
             print(f"[LOG update_travel_request_status]: {not_found_message}")
             return not_found_message
+        if previous_statuses[request_id] == final_status:
+            unchanged_message = f"La solicitud ID '{request_id}' ya estaba en estado '{final_status}'. No se realizaron cambios."
+            print(f"[LOG update_travel_request_status]: {unchanged_message}")
+            return unchanged_message
+        status_query_cache.invalidate()
+        success_message = f"Solicitud ID '{request_id}' actualizada a '{final_status}'."
+        print(f"[LOG update_travel_request_status]: {success_message}")
+        return success_message
     except Exception as e:
         error_message = f"Error técnico al actualizar estado de '{request_id}': {e}"
         print(f"[LOG update_travel_request_status - ERROR]: {error_message}")
         return error_message
 
+
+# --- Lógica de la Herramienta 4: Actualizar Estado de Varias Solicitudes (Devuelve JSON) ---
+def update_travel_requests_status_bulk(request_ids: list[str], new_status: str) -> str:
+    """Actualiza el estado de varias solicitudes de viaje con un único trabajo de BigQuery. Devuelve una cadena JSON con el resultado por ID."""
+    try:
+        validated_args = _BulkUpdateTravelRequestsArgsSchema(
+            request_ids=request_ids, new_status=new_status
+        )
+    except Exception as e:
+        return json.dumps({"error": f"Error de validación: {e}"})
+    final_status = _normalize_status(validated_args.new_status)
+    if not final_status:
+        return json.dumps(
+            {
+                "error": f"'{new_status}' no es un estado válido. Válidos: {', '.join(VALID_STATUSES)}."
+            }
+        )
+    unique_ids = list(
+        dict.fromkeys(request_id.strip() for request_id in validated_args.request_ids)
+    )
+
+    try:
+        previous_statuses = _apply_status_change(unique_ids, final_status)
+    except Exception as e:
+        print(f"[LOG update_travel_requests_status_bulk - ERROR]: {e}")
+        return json.dumps(
+            {"error": f"Error técnico al actualizar las solicitudes: {e}."}
+        )
+
+    results: list[dict[str, str | None]] = []
+    for request_id in unique_ids:
+        if request_id not in previous_statuses:
+            results.append({"request_id": request_id, "result": "no_encontrada"})
+        elif previous_statuses[request_id] == final_status:
+            results.append(
+                {
+                    "request_id": request_id,
+                    "result": "sin_cambios",
+                    "previous_status": final_status,
+                }
+            )
+        else:
+            results.append(
+                {
+                    "request_id": request_id,
+                    "result": "actualizada",
+                    "previous_status": previous_statuses[request_id],
+                }
+            )
+    updated_count = sum(1 for result in results if result["result"] == "actualizada")
+    if updated_count:
+        status_query_cache.invalidate()
+    print(
+        f"[LOG update_travel_requests_status_bulk]: {updated_count}/{len(unique_ids)} solicitudes actualizadas a '{final_status}'."
+    )
+    return json.dumps(
+        {"new_status": final_status, "updated": updated_count, "results": results}
+    )
+
+
+# --- Lógica de la Herramienta 5: Recuentos de Solicitudes (Devuelve JSON) ---
+def get_travel_request_counts(
+    group_by: list[str] | None = None,
+    statuses: list[str] | None = None,
+    destination_city: str | None = None,
+    month_from: str | None = None,
+    month_to: str | None = None,
+) -> str:
+    """Cuenta solicitudes de viaje agrupadas por estado ('status'), ciudad de destino ('destination_city') y/o mes de inicio del viaje ('month', yyyy-MM), con filtros opcionales. Responde desde un resumen en memoria, sin consultar BigQuery. Devuelve una cadena JSON."""
+    try:
+        validated_args = _TravelRequestCountsArgsSchema.model_validate(
+            {
+                "group_by": group_by or [],
+                "statuses": statuses,
+                "destination_city": destination_city,
+                "month_from": month_from,
+                "month_to": month_to,
+            }
+        )
+    except Exception as e:
+        return json.dumps({"error": f"Error de validación: {e}"})
+    final_statuses = None
+    if validated_args.statuses is not None:
+        normalized = [_normalize_status(status) for status in validated_args.statuses]
+        final_statuses = [status for status in normalized if status is not None]
+        if len(final_statuses) < len(normalized):
+            return json.dumps(
+                {
+                    "error": f"Estado no válido en {validated_args.statuses}. Válidos: {', '.join(VALID_STATUSES)}."
+                }
+            )
+    groups = status_summary.query(
+        validated_args.group_by,
+        statuses=final_statuses,
+        destination_city=validated_args.destination_city,
+        month_from=validated_args.month_from,
+        month_to=validated_args.month_to,
+    )
+    if groups is None:
+        return json.dumps(
+            {"error": "El resumen de recuentos no está disponible todavía."}
+        )
+    result: dict[str, Any] = {
+        "total": sum(group["count"] for group in groups),
+        "groups": groups[:TRAVEL_COUNTS_MAX_GROUPS] if validated_args.group_by else [],
+    }
+    if len(groups) > TRAVEL_COUNTS_MAX_GROUPS and validated_args.group_by:
+        result["truncated"] = True
+    return json.dumps(result, ensure_ascii=False)
+
+
+# --- Lógica de la Herramienta 6: Analítica de Viajes (Devuelve JSON) ---
+def get_travel_analytics(
+    dimensions: list[str] | None = None,
+    metrics: list[str] | None = None,
+    start_date_from: str | None = None,
+    start_date_to: str | None = None,
+    statuses: list[str] | None = None,
+) -> str:
+    """Calcula en BigQuery agregados de las solicitudes de viaje (número de solicitudes 'requests', empleados distintos 'employees', duración media 'avg_trip_days' o total 'total_trip_days' en días) agrupados por 'destination_city', 'origin_city', 'transport_mode', 'status', 'employee_id' y/o 'month', filtrando por fecha de inicio y estado. Devuelve una cadena JSON con 'columns' y 'rows'."""
+    try:
+        validated_args = _TravelAnalyticsArgsSchema.model_validate(
+            {
+                "dimensions": dimensions or [],
+                "metrics": metrics or ["requests"],
+                "start_date_from": start_date_from,
+                "start_date_to": start_date_to,
+                "statuses": statuses,
+            }
+        )
+    except Exception as e:
+        return json.dumps({"error": f"Error de validación: {e}"})
+    if (
+        validated_args.start_date_from
+        and validated_args.start_date_to
+        and validated_args.start_date_from > validated_args.start_date_to
+    ):
+        return json.dumps(
+            {"error": "'start_date_from' no puede ser posterior a 'start_date_to'."}
+        )
+    final_statuses = None
+    if validated_args.statuses is not None:
+        normalized = [_normalize_status(status) for status in validated_args.statuses]
+        final_statuses = [status for status in normalized if status is not None]
+        if len(final_statuses) < len(normalized):
+            return json.dumps(
+                {
+                    "error": f"Estado no válido en {validated_args.statuses}. Válidos: {', '.join(VALID_STATUSES)}."
+                }
+            )
+    spec = AnalyticsSpec(
+        dimensions=tuple(dict.fromkeys(validated_args.dimensions)),
+        metrics=tuple(dict.fromkeys(validated_args.metrics)),
+        start_from=validated_args.start_date_from,
+        start_to=validated_args.start_date_to,
+        statuses=tuple(sorted(set(final_statuses)))
+        if final_statuses is not None
+        else None,
+    )
+    # Las especificaciones equivalentes comparten entrada; cualquier escritura invalida la caché.
+    cache_key = ("analytics", spec)
+    cached = status_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        cache_version = status_query_cache.version()
+        # Se pide un grupo de más para saber si el resultado está truncado.
+        rows = _bigquery_travel_store.aggregate(spec, TRAVEL_COUNTS_MAX_GROUPS + 1)
+    except Exception as e:
+        print(f"[LOG get_travel_analytics - ERROR]: {e}")
+        return json.dumps({"error": f"Error técnico al calcular la analítica: {e}."})
+    columns = [*spec.dimensions, *spec.metrics]
+    result: dict[str, Any] = {
+        "columns": columns,
+        "rows": [
+            [row[column] for column in columns]
+            for row in rows[:TRAVEL_COUNTS_MAX_GROUPS]
+        ],
+    }
+    if len(rows) > TRAVEL_COUNTS_MAX_GROUPS:
+        result["truncated"] = True
+    response = json.dumps(result, ensure_ascii=False, default=str)
+    status_query_cache.set(cache_key, response, version=cache_version)
+    print(
+        f"[LOG get_travel_analytics]: {len(rows[:TRAVEL_COUNTS_MAX_GROUPS])} grupos para {spec}."
+    )
+    return response
+
+
+# --- Variantes asíncronas de las herramientas ---
+# Ejecutan los trabajos de BigQuery en un pool acotado para no bloquear el event loop
+# del servidor; mantienen el nombre y la firma de las funciones originales.
+request_travel_booking_logic_async = as_async_tool(request_travel_booking_logic)
+get_travel_requests_by_status_async = as_async_tool(
+    get_travel_requests_by_status,
+    timeout_message=lambda timeout: json.dumps(
+        {"error": f"La consulta superó el tiempo límite de {timeout:g} segundos."}
+    ),
+)
+update_travel_request_status_async = as_async_tool(update_travel_request_status)
+update_travel_requests_status_bulk_async = as_async_tool(
+    update_travel_requests_status_bulk,
+    timeout_message=lambda timeout: json.dumps(
+        {
+            "error": f"La actualización no terminó en {timeout:g} segundos y su resultado es "
+            "desconocido; puede haberse aplicado. Comprueba el estado de las solicitudes "
+            "antes de repetirla."
+        }
+    ),
+)
+get_travel_analytics_async = as_async_tool(
+    get_travel_analytics,
+    timeout_message=lambda timeout: json.dumps(
+        {"error": f"La analítica superó el tiempo límite de {timeout:g} segundos."}
+    ),
+)
+
+# --- Importación masiva de solicitudes (endpoint /travel_requests/import) ---
+# Las filas válidas se escriben en un único trabajo de carga, no con un INSERT por solicitud.
+travel_request_importer = LoadJobImporter(
+    f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{BIGQUERY_TABLE_ID}",
+    client_factory=lambda: get_bigquery_client(),
+    # Las réplicas de otras instancias se sincronizan por timestamp: las filas importadas
+    # llevan la hora en que terminó la carga, no la de su validación.
+    timestamp_column="timestamp",
+)
+
+
+def _prepare_imported_booking(record: dict[str, Any]) -> dict[str, Any]:
+    """Valida un registro importado con las mismas reglas que la herramienta de reserva y construye su fila."""
+    fields = {
+        field: str(record[field]).strip()
+        for field in _TravelBookingArgsSchema.model_fields
+        if record.get(field) is not None
+    }
+    try:
+        validated_args = _TravelBookingArgsSchema(**fields)
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+        ) from None
+    date_error = _booking_date_error(validated_args.start_date, validated_args.end_date)
+    if date_error:
+        raise ValueError(date_error)
+    return _new_booking_row(validated_args)
+
+
+def _on_imported_bookings(rows: list[dict[str, Any]]) -> None:
+    """Refleja las filas ya cargadas en el resumen de recuentos y, si existe, en la réplica local."""
+    for row in rows:
+        status_summary.record(row)
+    if isinstance(travel_store, ReplicatedTravelStore):
+        # Esta instancia las lee sin esperar a la siguiente sincronización.
+        travel_store.replica.upsert(rows)
+
+
+def import_travel_requests(stream: IO[bytes], fmt: str) -> ImportResult:
+    """
+    Importa un fichero CSV (con cabecera) o JSON Lines de solicitudes de viaje.
+
+    Cada registro se valida como en request_travel_booking_logic y las filas válidas se
+    añaden a la tabla en estado 'Registrada' con un único trabajo de carga.
+    """
+    result = travel_request_importer.run(
+        stream, fmt, _prepare_imported_booking, on_loaded=_on_imported_bookings
+    )
+    if result.loaded:
+        status_query_cache.invalidate()
+    return result
+
+
+# --- Ruta rápida: consultas de estado sin llamar al modelo ---
+# Los mensajes que son exactamente una consulta de estado conocida se responden con la
+# herramienta y una plantilla, sin las dos llamadas a Gemini (elegir herramienta y
+# redactar). Cualquier otra cosa, o un error de la herramienta, sigue el camino normal.
+_FAST_PATH_NEXT_PAGE_KEY = "fast_path_next_page"
+
+_FAST_PATH_STATUS_TERMS = {
+    "aprobada": ("aprobada", "Aprobada"),
+    "rechazada": ("rechazada", "Rechazada"),
+    "reservada": ("reservada", "Reservada"),
+    "completada": ("completada", "Completada"),
+    "cancelada": ("cancelada", "Cancelada"),
+    "registrada": ("registrada", "Registrada"),
+    "pendiente": ("pendiente", "pendiente"),
+}
+
+_FAST_PATH_STATUS_PATTERN = re.compile(
+    r"¿?(?:(?:cu[aá]les|qu[eé] solicitudes) (?:est[aá]n|hay) "
+    r"|(?:mu[eé]strame|lista|listar|ver|dame) (?:las )?(?:solicitudes )?"
+    r"|solicitudes |viajes )"
+    r"(?P<status>aprobada|rechazada|reservada|completada|cancelada|registrada|pendiente)s?"
+    r"(?: de aprobaci[oó]n)?\??",
+    re.IGNORECASE,
+)
+
+_FAST_PATH_REQUEST_PATTERN = re.compile(
+    r"¿?(?:(?:cu[aá]l es|dime|ver|consultar) )?(?:el )?estado de (?:la )?solicitud (?:id )?"
+    r"['\"«]?(?P<request_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})['\"»]?\??",
+    re.IGNORECASE,
+)
+
+_FAST_PATH_MORE_PATTERN = re.compile(
+    r"(?:(?:ver|mu[eé]strame|dame) )?m[aá]s(?: resultados| solicitudes)?\??",
+    re.IGNORECASE,
+)
+
+
+def _lookup_travel_request(request_id: str) -> str:
+    """Consulta una solicitud de viaje por su ID. Devuelve una cadena JSON."""
+    cache_key = ("request_id", request_id)
+    cached = status_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        cache_version = status_query_cache.version()
+        row = travel_store.get(request_id)
+        if row is None:
+            result = json.dumps(
+                {"message": f"No se encontró solicitud con ID '{request_id}'."}
+            )
+        else:
+            result = json.dumps(
+                {
+                    "request": {
+                        "request_id": str(row["request_id"]),
+                        "employee_name": f"{row['employee_first_name'] or ''} {row['employee_last_name'] or ''}".strip()
+                        or "N/A",
+                        "destination_city": str(row["destination_city"] or "N/A"),
+                        "start_date": str(row["start_date"])
+                        if row["start_date"]
+                        else "N/A",
+                        "end_date": str(row["end_date"]) if row["end_date"] else "N/A",
+                        "status": str(row["status"] or "N/A"),
+                    }
+                }
+            )
+        status_query_cache.set(cache_key, result, version=cache_version)
+        return result
+    except Exception as e:
+        print(f"[LOG _lookup_travel_request - ERROR]: {e}")
+        return json.dumps({"error": f"Error técnico al consultar la solicitud: {e}."})
+
+
+_lookup_travel_request_async = as_async_tool(
+    _lookup_travel_request,
+    timeout_message=lambda timeout: json.dumps(
+        {"error": f"La consulta superó el tiempo límite de {timeout:g} segundos."}
+    ),
+)
+
+
+def _render_status_listing(
+    result: dict[str, Any], label: str, shown_before: int = 0
+) -> str:
+    """Plantilla de respuesta para el resultado de get_travel_requests_by_status."""
+    count = result["count"]
+    requests = result["requests"]
+    if count == 1:
+        header = f"He encontrado 1 solicitud en estado '{label}':"
+    elif shown_before:
+        header = f"Aquí tienes las siguientes solicitudes en estado '{label}':"
+    else:
+        header = f"He encontrado {count} solicitudes en estado '{label}'. Aquí están:"
+    lines = [header]
+    for request in requests:
+        lines.append(
+            f"- ID: {request['request_id']}, Empleado: {request['employee_name']}, "
+            f"Destino: {request['destination_city']}, "
+            f"Fechas: {request['start_date']} a {request['end_date']}, Motivo: {request['reason']}"
+        )
+    if result.get("next_page_token"):
+        lines.append(
+            f"\nSe muestran {shown_before + len(requests)} de {count}. "
+            "Escribe «ver más» para ver las siguientes."
+        )
+    return "\n".join(lines)
+
+
+async def _fast_path_status_listing(
+    search_term: str,
+    label: str,
+    callback_context: CallbackContext,
+    page_token: str | None = None,
+    shown_before: int = 0,
+) -> str | None:
+    result = json.loads(
+        await get_travel_requests_by_status_async(
+            search_term=search_term, page_token=page_token
+        )
+    )
+    if "error" in result:
+        return None
+    if not result.get("count"):
+        callback_context.state[_FAST_PATH_NEXT_PAGE_KEY] = None
+        return (
+            result.get("message")
+            or f"No se encontraron solicitudes de viaje en estado '{label}'."
+        )
+    next_page_token = result.get("next_page_token")
+    callback_context.state[_FAST_PATH_NEXT_PAGE_KEY] = (
+        {
+            "search_term": search_term,
+            "label": label,
+            "page_token": next_page_token,
+            "shown": shown_before + len(result["requests"]),
+        }
+        if next_page_token
+        else None
+    )
+    return _render_status_listing(result, label, shown_before)
+
+
+async def _fast_path_by_status(
+    match: re.Match[str], callback_context: CallbackContext
+) -> str | None:
+    search_term, label = _FAST_PATH_STATUS_TERMS[match.group("status").lower()]
+    return await _fast_path_status_listing(search_term, label, callback_context)
+
+
+async def _fast_path_next_page(
+    match: re.Match[str], callback_context: CallbackContext
+) -> str | None:
+    pending = callback_context.state.get(_FAST_PATH_NEXT_PAGE_KEY)
+    if not pending:
+        return None
+    return await _fast_path_status_listing(
+        pending["search_term"],
+        pending["label"],
+        callback_context,
+        page_token=pending["page_token"],
+        shown_before=pending["shown"],
+    )
+
+
+async def _fast_path_by_id(
+    match: re.Match[str], callback_context: CallbackContext
+) -> str | None:
+    result = json.loads(
+        await _lookup_travel_request_async(request_id=match.group("request_id").lower())
+    )
+    if "error" in result:
+        return None
+    if "message" in result:
+        return result["message"]
+    request = result["request"]
+    return (
+        f"La solicitud {request['request_id']} ({request['employee_name']}, viaje a "
+        f"{request['destination_city']} del {request['start_date']} al {request['end_date']}) "
+        f"está en estado '{request['status']}'."
+    )
+
+
+fast_path_router = FastPathRouter(
+    [
+        Route("status_listing", _FAST_PATH_STATUS_PATTERN, _fast_path_by_status),
+        Route(
+            "status_listing_next_page", _FAST_PATH_MORE_PATTERN, _fast_path_next_page
+        ),
+        Route("request_status", _FAST_PATH_REQUEST_PATTERN, _fast_path_by_id),
+    ]
+)
+
+# --- Compactación del historial ---
+# Los resultados antiguos de herramientas se recortan y los turnos antiguos se resumen
+# para que cada llamada al modelo no crezca con la conversación. Estos hechos se
+# conservan siempre para poder terminar la reserva en curso.
+_REQUEST_ID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+_BOOKING_FIELDS = list(_TravelBookingArgsSchema.model_fields)
+
+
+def _booking_facts(contents: list[genai_types.Content]) -> list[str]:
+    """Extrae del historial completo los datos de reserva y los últimos IDs de solicitud."""
+    booking_args: dict[str, Any] = {}
+    booked_ids: list[str] = []
+    request_ids: list[str] = []
+    for content in contents:
+        for part in content.parts or []:
+            if (
+                part.function_call
+                and part.function_call.name == request_travel_booking_logic.__name__
+            ):
+                booking_args = dict(part.function_call.args or {})
+            texts = [part.text or ""]
+            if part.function_response:
+                response_text = json.dumps(
+                    part.function_response.response or {}, default=str
+                )
+                texts.append(response_text)
+                if part.function_response.name == request_travel_booking_logic.__name__:
+                    booked_ids += _REQUEST_ID_PATTERN.findall(response_text)
+            for text in texts:
+                for request_id in _REQUEST_ID_PATTERN.findall(text):
+                    if request_id in request_ids:
+                        request_ids.remove(request_id)
+                    request_ids.append(request_id)
+    facts = []
+    if booking_args:
+        fields = ", ".join(
+            f"{field}={booking_args[field]}"
+            for field in _BOOKING_FIELDS
+            if booking_args.get(field)
+        )
+        facts.append(
+            f"Datos de la última solicitud de reserva enviada a la herramienta: {fields}."
+        )
+    if booked_ids:
+        facts.append(
+            f"Solicitudes registradas en esta conversación: {', '.join(booked_ids[-5:])}."
+        )
+    if request_ids:
+        facts.append(
+            f"IDs de solicitud mencionados recientemente: {', '.join(request_ids[-5:])}."
+        )
+    return facts
+
+
+history_compactor = HistoryCompactor(fact_extractor=_booking_facts)
+
+# Métricas de latencia de modelo y herramientas expuestas en /metrics.
+agent_metrics = AgentMetrics()
+
 # --- Creación del Agente y Configuración del RunConfig ---
 
 # 1. Crear la instancia del Agente
 root_agent = Agent(
     name="root_agent",
     description="Agente para gestionar solicitudes de viaje: registrar, consultar y actualizar estados.",
-    instruction=TRAVEL_AGENT_INSTRUCTION,
+    instruction=travel_agent_dynamic_instruction,
     model=MODEL_ID,
+    before_model_callback=[
+        fast_path_router.before_model_callback,
+        history_compactor.before_model_callback,
+        prompt_cache.before_model_callback,
+        agent_metrics.before_model_callback,
+    ],
+    after_model_callback=[
+        agent_metrics.after_model_callback,
+        fast_path_router.after_model_callback,
+        prompt_cache.after_model_callback,
+    ],
+    before_tool_callback=agent_metrics.before_tool_callback,
+    after_tool_callback=agent_metrics.after_tool_callback,
     tools=[
-        *tools,
-        request_travel_booking_logic,
-        get_travel_requests_by_status,
-        update_travel_request_status
+        toolbox_toolset,
+        request_travel_booking_logic_async,
+        get_travel_requests_by_status_async,
+        update_travel_request_status_async,
+        update_travel_requests_status_bulk_async,
+        get_travel_analytics_async,
+        # Responde desde memoria, así que no necesita el pool de BigQuery.
+        get_travel_request_counts,
     ],
-)
\ No newline at end of file
+)
+
+
+# 2. Agente del modo live (WebSocket /live)
+# La Live API no pasa por los callbacks de modelo, así que la parte estática del prompt
+# se envía junto a la dinámica en lugar de servirse con context caching, y la ruta
+# rápida no se aplica: el modelo ya responde en streaming sobre la conexión abierta.
+# Tampoco se compacta el historial: la sesión se envía una sola vez al conectar.
+# Los callbacks de herramientas sí se ejecutan, así que las métricas de herramientas se
+# conservan; las de modelo las registra LiveBridge por turno (ver app/utils/live.py).
+def travel_agent_live_instruction(context: ReadonlyContext) -> str:
+    """Prompt completo del modo live: parte estática seguida de la dinámica del turno."""
+    return f"{TRAVEL_AGENT_STATIC_INSTRUCTION}\n\n{travel_agent_dynamic_instruction(context)}"
+
+
+live_agent = root_agent.clone(
+    update={
+        "model": LIVE_MODEL_ID,
+        "instruction": travel_agent_live_instruction,
+        "before_model_callback": None,
+        "after_model_callback": None,
+    }
+)
+live_run_config = RunConfig(response_modalities=["TEXT"])
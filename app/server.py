@@ -12,29 +12,123 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import dataclasses
+import logging
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response, UploadFile, WebSocket
 
-from fastapi import FastAPI
 # Modificaciones para habilitar CORS
 from fastapi.middleware.cors import CORSMiddleware
 from google.adk.cli.fast_api import get_fast_api_app
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
 from google.cloud import logging as google_cloud_logging
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider, export
+from opentelemetry.sdk.trace import TracerProvider
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, generate_latest
 
-from app.utils.tracing import CloudTraceLoggingSpanExporter
+from app.agent import (
+    BOOKING_WRITE_MODE,
+    LIVE_MODEL_ID,
+    booking_dedupe,
+    booking_writer,
+    import_travel_requests,
+    live_agent,
+    live_run_config,
+    sql_guard,
+    status_query_cache,
+    status_summary,
+    toolbox_toolset,
+    travel_store,
+)
+from app.utils.bigquery_client import close_bigquery_client
+from app.utils.bulk_import import FORMATS
+from app.utils.cache import GcsGeneration
+from app.utils.feedback_sink import FeedbackSink, cloud_logging_batch_writer
+from app.utils.live import LIVE_ENABLED, LiveBridge
+from app.utils.metrics import METRICS_ENABLED, ActiveStreamsMiddleware
+from app.utils.sampling import (
+    TailSamplingSpanProcessor,
+    build_sampler,
+    build_span_processor,
+)
+from app.utils.session_service import SESSION_SERVICE_URI, fast_api_session_service
+from app.utils.status_summary import TRAVEL_SUMMARY_ENABLED
+from app.utils.tracing import CloudTraceLoggingSpanExporter, MeteredBatchSpanProcessor
+from app.utils.travel_store import ReplicatedTravelStore
 from app.utils.typing import Feedback
 
 logging_client = google_cloud_logging.Client()
 logger = logging_client.logger(__name__)
+# Feedback is acknowledged once buffered and written to Cloud Logging in batches.
+feedback_sink = FeedbackSink(cloud_logging_batch_writer(logger))
 
-provider = TracerProvider()
-processor = export.BatchSpanProcessor(CloudTraceLoggingSpanExporter())
-provider.add_span_processor(processor)
+# Sampling and attribute filtering are configured with the TRACE_* variables.
+provider = TracerProvider(sampler=build_sampler())
+span_exporter = CloudTraceLoggingSpanExporter()
+processor = MeteredBatchSpanProcessor(span_exporter)
+sampling_processor = build_span_processor(processor)
+provider.add_span_processor(sampling_processor)
 trace.set_tracer_provider(provider)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm up lazily loaded resources and release shared ones on shutdown."""
+    # Load the toolbox manifest in the background so startup never waits on it.
+    warmup = asyncio.create_task(toolbox_toolset.get_tools())
+    if BOOKING_WRITE_MODE == "stream":
+        # Replays bookings acknowledged before a previous shutdown.
+        booking_writer.start()
+    feedback_sink.start()
+    if isinstance(travel_store, ReplicatedTravelStore):
+        # Reads go to BigQuery until the first sync of the local replica completes.
+        travel_store.start()
+    if TRAVEL_SUMMARY_ENABLED:
+        # Counts are served once the first full read of the table completes.
+        status_summary.start()
+    yield
+    warmup.cancel()
+    await asyncio.to_thread(booking_writer.close)
+    await asyncio.to_thread(feedback_sink.close)
+    logging.info(f"Feedback sink stats: {feedback_sink.stats()}")
+    if isinstance(travel_store, ReplicatedTravelStore):
+        await asyncio.to_thread(travel_store.close)
+        logging.info(f"Travel request replica stats: {travel_store.stats()}")
+    if TRAVEL_SUMMARY_ENABLED:
+        await asyncio.to_thread(status_summary.close)
+        logging.info(f"Travel summary stats: {status_summary.stats()}")
+    if isinstance(status_query_cache.shared, GcsGeneration):
+        # Publishes an invalidation still waiting for the next write interval.
+        await asyncio.to_thread(status_query_cache.shared.close)
+    close_bigquery_client()
+    logging.info(f"SQL guard stats: {sql_guard.stats()}")
+    logging.info(f"Booking dedupe stats: {booking_dedupe.stats()}")
+    if session_services:
+        logging.info(f"Session service stats: {session_services[0].stats()}")
+    # Exports the queued spans so that the dropped count below is exact.
+    await asyncio.to_thread(processor.force_flush)
+    logging.info(
+        f"Span export stats: {span_exporter.stats()}, "
+        f"dropped from queue: {processor.dropped_spans}"
+    )
+    if isinstance(sampling_processor, TailSamplingSpanProcessor):
+        logging.info(f"Tail sampling stats: {sampling_processor.stats()}")
+
+
 AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-app: FastAPI = get_fast_api_app(agents_dir=AGENT_DIR, web=True)
+# Sessions are persisted in SESSION_SERVICE_URI and the most recent ones kept in memory.
+with fast_api_session_service() as session_services:
+    app: FastAPI = get_fast_api_app(
+        agents_dir=AGENT_DIR,
+        session_service_uri=SESSION_SERVICE_URI,
+        web=True,
+        lifespan=lifespan,
+    )
 
 # Modificaciones para habilitar CORS
 origins = ["*"]
@@ -47,12 +141,20 @@ app.add_middleware(
 )
 
 
+# Counts open /run_sse responses and /live connections for the travel_agent_active_streams gauge.
+app.add_middleware(ActiveStreamsMiddleware, paths=("/run_sse", "/live"))
+if session_services:
+    Gauge(
+        "travel_agent_resident_sessions",
+        "Sessions kept in memory in front of the session store.",
+    ).set_function(lambda: session_services[0].stats()["resident_sessions"])
+
 app.title = "adk-travel-agent-cr"
 app.description = "API for interacting with the Agent adk-travel-agent-cr"
 
 
 @app.post("/feedback")
-def collect_feedback(feedback: Feedback) -> dict[str, str]:
+async def collect_feedback(feedback: Feedback) -> dict[str, str]:
     """Collect and log feedback.
 
     Args:
@@ -61,10 +163,98 @@ def collect_feedback(feedback: Feedback) -> dict[str, str]:
     Returns:
         Success message
     """
-    logger.log_struct(feedback.model_dump(), severity="INFO")
+    feedback_sink.submit(feedback.model_dump())
     return {"status": "success"}
 
 
+@app.post("/feedback/batch")
+async def collect_feedback_batch(feedbacks: list[Feedback]) -> dict[str, str | int]:
+    """Collect and log many feedback records at once.
+
+    Args:
+        feedbacks: The feedback records to log
+
+    Returns:
+        Success message and the number of accepted records
+    """
+    for feedback in feedbacks:
+        feedback_sink.submit(feedback.model_dump())
+    return {"status": "success", "accepted": len(feedbacks)}
+
+
+@app.post("/travel_requests/import")
+async def import_travel_requests_file(file: UploadFile) -> dict[str, object]:
+    """Import travel requests from a CSV (with a header row) or JSON Lines upload.
+
+    Every record is validated like a booking made through the agent, and the
+    valid ones are appended in a single BigQuery load job. The upload is read
+    row by row from the spooled request body, never held in memory.
+
+    Args:
+        file: The uploaded file; its extension (.csv, .jsonl or .ndjson) selects the format
+
+    Returns:
+        Loaded and rejected counts, the load job ID and per-line errors
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower().lstrip(".")
+    fmt = "jsonl" if extension == "ndjson" else extension
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=415, detail="Upload a .csv, .jsonl or .ndjson file"
+        )
+    try:
+        result = await asyncio.to_thread(import_travel_requests, file.file, fmt)
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=400, detail="The file is not UTF-8 encoded"
+        ) from e
+    except Exception as e:
+        # The error may name tables or quote rows; it is only logged.
+        logging.exception("Travel request import failed")
+        raise HTTPException(status_code=502, detail="The load job failed") from e
+    return {
+        "status": "success" if not result.rejected else "partial",
+        **dataclasses.asdict(result),
+    }
+
+
+if LIVE_ENABLED:
+    # Live sessions share the session store of the REST API, so a conversation can be
+    # resumed or inspected from either side; agentengine:// stores are not shared.
+    live_bridge = LiveBridge(
+        Runner(
+            app_name=os.path.basename(os.path.dirname(os.path.abspath(__file__))),
+            agent=live_agent,
+            session_service=session_services[0]
+            if session_services
+            else InMemorySessionService(),
+        ),
+        run_config=live_run_config,
+        model=LIVE_MODEL_ID,
+    )
+
+    @app.websocket("/live")
+    async def live(
+        websocket: WebSocket, user_id: str, session_id: str | None = None
+    ) -> None:
+        """Hold a streaming conversation with the live agent over a WebSocket.
+
+        Args:
+            websocket: The client connection
+            user_id: Owner of the session
+            session_id: Session to resume; a new one is created if omitted or unknown
+        """
+        await live_bridge.serve(websocket, user_id, session_id)
+
+
+if METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        """Expose tool, model, BigQuery and streaming metrics to Prometheus."""
+        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
 # Main execution
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,280 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import socket
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from prometheus_client import Gauge
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from app.utils.metrics import record_bigquery_jobs
+
+BIGQUERY_POOL_SIZE = int(os.environ.get("BIGQUERY_POOL_SIZE", "32"))
+BIGQUERY_POOL_BLOCK = os.environ.get("BIGQUERY_POOL_BLOCK", "false").lower() == "true"
+BIGQUERY_MAX_WORKERS = int(
+    os.environ.get("BIGQUERY_MAX_WORKERS", str(BIGQUERY_POOL_SIZE))
+)
+BIGQUERY_TOOL_TIMEOUT_SECONDS = float(
+    os.environ.get("BIGQUERY_TOOL_TIMEOUT_SECONDS", "60")
+)
+
+_lock = threading.Lock()
+_client: bigquery.Client | None = None
+_adapter: "_KeepAliveAdapter | None" = None
+_executor: ThreadPoolExecutor | None = None
+# Cancellations run on their own threads: the tool executor may be the very
+# thing that is saturated when a call times out.
+_cancel_executor: ThreadPoolExecutor | None = None
+_acquisitions = 0
+
+# Jobs started by the tool call currently running in this context, so that an
+# abandoned call (timeout or client disconnect) can cancel them server-side.
+_active_jobs: contextvars.ContextVar[list[bigquery.QueryJob] | None] = (
+    contextvars.ContextVar("_active_jobs", default=None)
+)
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keep-alive on every pooled connection."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = [
+            *HTTPConnection.default_socket_options,
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _build_client() -> tuple[bigquery.Client, _KeepAliveAdapter]:
+    """
+    Build a BigQuery client whose HTTP session uses a sized connection pool.
+
+    :return: The client and the adapter that owns its connection pool
+    """
+    credentials, project = google.auth.default(
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+    session = AuthorizedSession(credentials)
+    adapter = _KeepAliveAdapter(
+        pool_connections=BIGQUERY_POOL_SIZE,
+        pool_maxsize=BIGQUERY_POOL_SIZE,
+        pool_block=BIGQUERY_POOL_BLOCK,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    client = bigquery.Client(project=project, credentials=credentials, _http=session)
+    return client, adapter
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """
+    Return the process-wide BigQuery client, creating it on first use.
+
+    The client is thread-safe and is shared by every tool call, so credentials
+    are resolved once and HTTP connections are reused across requests.
+
+    :return: The shared BigQuery client
+    """
+    global _client, _adapter, _acquisitions
+    with _lock:
+        if _client is None:
+            _client, _adapter = _build_client()
+            logging.info(
+                f"BigQuery client created with a pool of {BIGQUERY_POOL_SIZE} "
+                "connections"
+            )
+        _acquisitions += 1
+        return _client
+
+
+def close_bigquery_client() -> None:
+    """Close the shared BigQuery client, its pooled connections and executor."""
+    global _client, _adapter, _executor, _cancel_executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        if _cancel_executor is not None:
+            _cancel_executor.shutdown(wait=True)
+        if _client is not None:
+            _client.close()
+            logging.info("BigQuery client closed")
+        _client = None
+        _adapter = None
+        _executor = None
+        _cancel_executor = None
+
+
+def track_job(job: bigquery.QueryJob) -> bigquery.QueryJob:
+    """
+    Register a job with the tool call running in the current context.
+
+    :param job: The job that was just submitted
+    :return: The same job, for call chaining
+    """
+    jobs = _active_jobs.get()
+    if jobs is not None:
+        jobs.append(job)
+    return job
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=BIGQUERY_MAX_WORKERS, thread_name_prefix="bigquery-tool"
+            )
+        return _executor
+
+
+def _get_cancel_executor() -> ThreadPoolExecutor:
+    global _cancel_executor
+    with _lock:
+        if _cancel_executor is None:
+            _cancel_executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="bigquery-cancel"
+            )
+        return _cancel_executor
+
+
+def _cancel_jobs(jobs: list[bigquery.QueryJob]) -> None:
+    for job in jobs:
+        try:
+            if not job.done():
+                job.cancel()
+                logging.info(f"Cancelled BigQuery job {job.job_id}")
+        except Exception as e:
+            logging.warning(f"Unable to cancel BigQuery job {job.job_id}: {e}")
+
+
+def _default_timeout_message(timeout: float) -> str:
+    return (
+        f"Error técnico: la operación no terminó en {timeout:g} segundos y su resultado es "
+        "desconocido; puede haberse aplicado. Comprueba su estado antes de repetirla."
+    )
+
+
+def as_async_tool(
+    func: Callable[..., str],
+    timeout: float | None = None,
+    timeout_message: Callable[[float], str] = _default_timeout_message,
+) -> Callable[..., Awaitable[str]]:
+    """
+    Wrap a blocking BigQuery tool so it can be awaited from the event loop.
+
+    The wrapped function runs in a bounded thread pool and keeps the name,
+    docstring and signature of the original, so ADK exposes the same tool
+    declaration to the model. When the call times out or the awaiting task is
+    cancelled (for example because the SSE client disconnected), every job
+    registered through :func:`track_job` is cancelled in BigQuery, from a small
+    pool of its own so that the cancellation does not queue behind the work
+    that timed out. A write may already have been applied when its job is
+    cancelled, so the default timeout message tells the model that the outcome
+    is unknown. The jobs of a completed call are recorded in the BigQuery job
+    metrics.
+
+    :param func: The synchronous tool function
+    :param timeout: Per-call timeout in seconds, BIGQUERY_TOOL_TIMEOUT_SECONDS by default
+    :param timeout_message: Builds the tool result returned on timeout
+    :return: An async function with the same signature as ``func``
+    """
+    call_timeout = BIGQUERY_TOOL_TIMEOUT_SECONDS if timeout is None else timeout
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        jobs: list[bigquery.QueryJob] = []
+        context = contextvars.copy_context()
+        context.run(_active_jobs.set, jobs)
+        executor = _get_executor()
+        future = asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+        try:
+            result = await asyncio.wait_for(future, call_timeout)
+        except asyncio.TimeoutError:
+            _get_cancel_executor().submit(_cancel_jobs, jobs)
+            logging.warning(f"Tool {func.__name__} timed out after {call_timeout}s")
+            return timeout_message(call_timeout)
+        except asyncio.CancelledError:
+            _get_cancel_executor().submit(_cancel_jobs, jobs)
+            raise
+        record_bigquery_jobs(func.__name__, jobs)
+        return result
+
+    return wrapper
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """
+    Report usage of the shared client's HTTP connection pool.
+
+    :return: A dictionary with pool configuration and per-host connection counts
+    """
+    with _lock:
+        stats: dict[str, Any] = {
+            "initialized": _client is not None,
+            "pool_maxsize": BIGQUERY_POOL_SIZE,
+            "pool_block": BIGQUERY_POOL_BLOCK,
+            "client_acquisitions": _acquisitions,
+            "hosts": {},
+        }
+        if _adapter is None:
+            return stats
+        pools = _adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            stats["hosts"][f"{key.key_scheme}://{key.key_host}"] = {
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": idle,
+            }
+        return stats
+
+
+def _pool_total(field: str) -> float:
+    return float(sum(host[field] for host in get_pool_stats()["hosts"].values()))
+
+
+# Pool statistics are read when /metrics is scraped, summed over hosts.
+Gauge(
+    "travel_agent_bigquery_client_acquisitions",
+    "Times the shared BigQuery client was handed out since it was created.",
+).set_function(lambda: get_pool_stats()["client_acquisitions"])
+Gauge(
+    "travel_agent_bigquery_pool_connections_created",
+    "HTTP connections opened by the shared BigQuery client's pool.",
+).set_function(lambda: _pool_total("connections_created"))
+Gauge(
+    "travel_agent_bigquery_pool_requests",
+    "HTTP requests sent through the shared BigQuery client's pool.",
+).set_function(lambda: _pool_total("requests"))
+Gauge(
+    "travel_agent_bigquery_pool_idle_connections",
+    "Open connections currently idle in the shared BigQuery client's pool.",
+).set_function(lambda: _pool_total("idle_connections"))
@@ -0,0 +1,302 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from google.cloud import bigquery
+
+from app.utils.bigquery_client import get_bigquery_client
+from app.utils.metrics import BOOKING_ROWS
+
+BOOKING_BATCH_SIZE = int(os.environ.get("BOOKING_BATCH_SIZE", "500"))
+BOOKING_FLUSH_INTERVAL_SECONDS = float(
+    os.environ.get("BOOKING_FLUSH_INTERVAL_SECONDS", "1.0")
+)
+# Must be on persistent storage (e.g. a mounted volume): an in-memory /tmp, as on
+# Cloud Run, is lost when the instance stops. There is deliberately no default.
+BOOKING_WAL_PATH = os.environ.get("BOOKING_WAL_PATH")
+# Rows BigQuery rejected, kept for inspection and replay; next to the WAL by default.
+BOOKING_DEAD_LETTER_PATH = os.environ.get("BOOKING_DEAD_LETTER_PATH")
+# Delay before retrying a batch after a transport error.
+BOOKING_RETRY_SECONDS = float(os.environ.get("BOOKING_RETRY_SECONDS", "2.0"))
+
+
+class BatchedRowWriter:
+    """
+    Queue rows in memory and stream them to BigQuery in micro-batches.
+
+    ``submit`` appends the row to a local write-ahead log and fsyncs it before
+    returning, so a caller can acknowledge the write immediately: rows that were
+    not flushed when the process stopped are replayed on the next start. A
+    background thread flushes the queue through the streaming insert API when it
+    reaches ``batch_size`` rows or every ``flush_interval`` seconds, using the
+    ``row_id_field`` value as insert ID so replays are de-duplicated. Rows that
+    BigQuery rejects were already acknowledged, so they are appended to a
+    dead-letter file, counted and logged before they leave the log. If the
+    dead-letter file cannot be written they stay in the log, out of the queue,
+    and are set aside again with the next batch or replayed on the next start.
+
+    Rows in the streaming buffer cannot be modified by DML statements for a
+    while after they are written, so this writer only suits tables whose fresh
+    rows are not updated straight away.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        row_id_field: str,
+        client_factory: Callable[[], bigquery.Client] = get_bigquery_client,
+        batch_size: int = BOOKING_BATCH_SIZE,
+        flush_interval: float = BOOKING_FLUSH_INTERVAL_SECONDS,
+        wal_path: str | None = BOOKING_WAL_PATH,
+        on_flush: Callable[[], None] | None = None,
+        dead_letter_path: str | None = BOOKING_DEAD_LETTER_PATH,
+    ) -> None:
+        """
+        Initialize the writer. No thread is started and nothing is read until first use.
+
+        :param table: Fully qualified destination table ID
+        :param row_id_field: Row field used as the streaming insert ID
+        :param client_factory: Returns the BigQuery client used for flushes
+        :param batch_size: Maximum number of rows per streaming insert
+        :param flush_interval: Maximum time in seconds a row waits in the queue
+        :param wal_path: Path of the write-ahead log file, on persistent storage;
+            required before the writer is started
+        :param on_flush: Called after each batch is written, e.g. to invalidate caches
+        :param dead_letter_path: File receiving rejected rows, ``<wal_path>.rejected``
+            by default
+        """
+        self.table = table
+        self.row_id_field = row_id_field
+        self.client_factory = client_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.wal_path = wal_path or ""
+        self.dead_letter_path = dead_letter_path or f"{self.wal_path}.rejected"
+        self.on_flush = on_flush
+        self._queue: deque[dict[str, Any]] = deque()
+        # Rejected rows, with their errors, that the dead-letter file did not take.
+        self._undead_lettered: list[tuple[dict[str, Any], Any]] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._stats: dict[str, float] = {
+            "submitted_rows": 0,
+            "flushed_rows": 0,
+            "failed_rows": 0,
+            "dead_letter_rows": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_latency_ms": 0.0,
+            "max_flush_latency_ms": 0.0,
+            "total_flush_latency_ms": 0.0,
+        }
+
+    def start(self) -> None:
+        """Replay rows left in the write-ahead log and start the flush thread."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            if not self.wal_path:
+                raise RuntimeError(
+                    "BOOKING_WAL_PATH must point to persistent storage to stream bookings"
+                )
+            self._closed = False
+            # The log still holds them, so they are replayed with the rest.
+            self._undead_lettered = []
+            self._replay_wal()
+            self._thread = threading.Thread(
+                target=self._run, name="booking-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, row: dict[str, Any]) -> None:
+        """
+        Durably enqueue a row for the next batch.
+
+        :param row: A JSON-serializable row matching the table schema
+        """
+        self.start()
+        line = json.dumps(row, default=str)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The booking writer is closed")
+            self._append_wal(line)
+            self._queue.append(row)
+            self._stats["submitted_rows"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> None:
+        """Synchronously write every queued row."""
+        while self._flush_batch():
+            pass
+
+    def close(self) -> None:
+        """Stop the flush thread after writing every queued row."""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Report queue depth and flush metrics.
+
+        :return: A dictionary of counters and latencies in milliseconds
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._queue)
+            stats["pending_dead_letter_rows"] = len(self._undead_lettered)
+        flushes = stats["flushes"]
+        stats["avg_flush_latency_ms"] = (
+            stats["total_flush_latency_ms"] / flushes if flushes else 0.0
+        )
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._closed and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            if not self._flush_batch():
+                with self._condition:
+                    if self._queue and not self._closed:
+                        self._condition.wait(BOOKING_RETRY_SECONDS)
+
+    def _flush_batch(self) -> bool:
+        """Write one batch. Return True if rows were written and more may remain."""
+        with self._flush_lock:
+            with self._condition:
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+            if not batch:
+                return False
+            start = time.perf_counter()
+            try:
+                errors = self.client_factory().insert_rows_json(
+                    self.table,
+                    batch,
+                    row_ids=[str(row[self.row_id_field]) for row in batch],
+                )
+            except Exception as e:
+                logging.warning(f"Streaming insert of {len(batch)} rows failed: {e}")
+                with self._condition:
+                    self._queue.extendleft(reversed(batch))
+                    self._stats["failed_flushes"] += 1
+                return False
+            latency_ms = (time.perf_counter() - start) * 1000
+            rejected = [(batch[error["index"]], error["errors"]) for error in errors]
+            for row, row_errors in rejected:
+                logging.error(
+                    f"Row {row[self.row_id_field]} rejected by BigQuery: {row_errors}"
+                )
+            pending = self._undead_lettered + rejected
+            dead_lettered = self._write_dead_letters(pending)
+            BOOKING_ROWS.labels(outcome="flushed").inc(len(batch) - len(errors))
+            BOOKING_ROWS.labels(outcome="rejected").inc(len(errors))
+            with self._condition:
+                if dead_lettered:
+                    self._undead_lettered = []
+                    self._stats["dead_letter_rows"] += len(pending)
+                else:
+                    # Kept in the log, but not retried, until they can be set aside.
+                    self._undead_lettered = pending
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += len(batch) - len(errors)
+                self._stats["failed_rows"] += len(errors)
+                self._stats["last_flush_latency_ms"] = latency_ms
+                self._stats["total_flush_latency_ms"] += latency_ms
+                self._stats["max_flush_latency_ms"] = max(
+                    self._stats["max_flush_latency_ms"], latency_ms
+                )
+                self._rewrite_wal()
+            if self.on_flush is not None:
+                self.on_flush()
+            return True
+
+    def _write_dead_letters(self, rejected: list[tuple[dict[str, Any], Any]]) -> bool:
+        """Append rejected rows with their errors to the dead-letter file; return success."""
+        if not rejected:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for row, row_errors in rejected:
+                    record = {
+                        "row": row,
+                        "errors": row_errors,
+                        "rejected_at": time.time(),
+                    }
+                    f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logging.error(
+                f"Unable to write {len(rejected)} rejected rows to {self.dead_letter_path}: {e}"
+            )
+            return False
+        return True
+
+    def _append_wal(self, line: str) -> None:
+        os.makedirs(os.path.dirname(self.wal_path) or ".", exist_ok=True)
+        with open(self.wal_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_wal(self) -> None:
+        """Replace the log with the rows not yet set aside. Caller holds the condition."""
+        rows = [*self._queue, *(row for row, _ in self._undead_lettered)]
+        if not rows:
+            if os.path.exists(self.wal_path):
+                os.truncate(self.wal_path, 0)
+            return
+        tmp_path = f"{self.wal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.wal_path)
+
+    def _replay_wal(self) -> None:
+        """Queue rows left in the log by a previous process. Caller holds the condition."""
+        try:
+            with open(self.wal_path, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        if rows:
+            logging.info(f"Replaying {len(rows)} unflushed rows from {self.wal_path}")
+            self._queue.extend(rows)
@@ -0,0 +1,239 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import IO, Any
+
+from google.cloud import bigquery
+
+from app.utils.bigquery_client import track_job
+
+# Per-row errors reported in an import result; the rest are only counted.
+BULK_IMPORT_MAX_ERRORS = int(os.environ.get("BULK_IMPORT_MAX_ERRORS", "1000"))
+BULK_IMPORT_TIMEOUT_SECONDS = float(
+    os.environ.get("BULK_IMPORT_TIMEOUT_SECONDS", "600")
+)
+
+FORMATS = ("csv", "jsonl")
+# Rows passed at a time to the on_loaded callback.
+_LOADED_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import: rows loaded, rows rejected and why."""
+
+    loaded: int = 0
+    rejected: int = 0
+    job_id: str | None = None
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    errors_truncated: bool = False
+
+
+def iter_records(
+    stream: IO[bytes], fmt: str
+) -> Iterator[tuple[int, dict[str, Any] | None, str | None]]:
+    """
+    Parse a CSV file with a header row or a JSON Lines file, one record at a time.
+
+    Empty CSV cells are read as missing values and blank JSON lines are skipped.
+
+    :param stream: The uploaded file, opened in binary mode
+    :param fmt: ``csv`` or ``jsonl``
+    :return: An iterator of ``(line number, record, parse error)``; exactly one of
+        record and parse error is set
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {FORMATS}")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                if None in record:
+                    yield reader.line_num, None, "More values than header columns"
+                    continue
+                values = {
+                    key: value
+                    for key, value in record.items()
+                    if value not in ("", None)
+                }
+                yield reader.line_num, values, None
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                parsed = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(parsed, dict):
+                yield line_number, None, "Expected a JSON object"
+                continue
+            yield line_number, parsed, None
+    finally:
+        # The upload is owned by the caller; do not close it with the wrapper.
+        text.detach()
+
+
+class LoadJobImporter:
+    """
+    Validate uploaded rows one by one and append the valid ones in a single load job.
+
+    Valid rows are staged as newline-delimited JSON in a temporary file, so
+    memory use does not grow with the size of the upload, and the file is sent
+    to BigQuery as one load job appending to the table. The job is atomic:
+    either every valid row is loaded or none is. Invalid rows are reported with
+    their line number, up to ``max_errors`` of them.
+
+    With ``timestamp_column``, the loaded rows are stamped with the time the
+    load job finished by one UPDATE right after it. A stamp taken while
+    validating could be minutes older than the commit, so readers that sync by
+    timestamp watermark would have already moved past it.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        client_factory: Callable[[], bigquery.Client],
+        max_errors: int = BULK_IMPORT_MAX_ERRORS,
+        timeout: float = BULK_IMPORT_TIMEOUT_SECONDS,
+        timestamp_column: str | None = None,
+    ) -> None:
+        """
+        Initialize the importer.
+
+        :param table: Fully qualified table ID
+        :param client_factory: Returns the BigQuery client used for the load job
+        :param max_errors: Per-row errors kept in the result
+        :param timeout: Seconds to wait for the load job
+        :param timestamp_column: TIMESTAMP column set to the time the rows were loaded
+        """
+        self.table = table
+        self.client_factory = client_factory
+        self.max_errors = max_errors
+        self.timeout = timeout
+        self.timestamp_column = timestamp_column
+
+    def run(
+        self,
+        stream: IO[bytes],
+        fmt: str,
+        prepare: Callable[[dict[str, Any]], dict[str, Any]],
+        on_loaded: Callable[[list[dict[str, Any]]], object] | None = None,
+    ) -> ImportResult:
+        """
+        Import an uploaded file.
+
+        :param stream: The uploaded file, opened in binary mode
+        :param fmt: ``csv`` or ``jsonl``
+        :param prepare: Turns a record into a table row, raising ValueError if invalid
+        :param on_loaded: Called with batches of the loaded rows once the load job
+            has succeeded, e.g. to update caches and replicas
+        :return: Counts, the load job ID and the per-row errors
+        """
+        result = ImportResult()
+        # Identifies the rows of this import until they are stamped with the load time.
+        staged_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with tempfile.TemporaryFile("w+b") as staging:
+            for line_number, record, error in iter_records(stream, fmt):
+                if record is not None:
+                    try:
+                        row = prepare(record)
+                    except ValueError as e:
+                        error = str(e)
+                    else:
+                        if self.timestamp_column is not None:
+                            row[self.timestamp_column] = staged_at
+                        staging.write(
+                            json.dumps(row, ensure_ascii=False, default=str).encode()
+                        )
+                        staging.write(b"\n")
+                        result.loaded += 1
+                        continue
+                result.rejected += 1
+                if len(result.errors) < self.max_errors:
+                    result.errors.append({"line": line_number, "error": error})
+                else:
+                    result.errors_truncated = True
+            if not result.loaded:
+                return result
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            )
+            job = self.client_factory().load_table_from_file(
+                staging, self.table, rewind=True, job_config=job_config
+            )
+            result.job_id = job.job_id
+            job.result(timeout=self.timeout)
+            logging.info(
+                f"Load job {job.job_id} appended {result.loaded} rows to {self.table} "
+                f"({result.rejected} rejected)"
+            )
+            loaded_at = self._stamp_loaded_rows(staged_at)
+            if on_loaded is not None:
+                staging.seek(0)
+                batch = []
+                for line in staging:
+                    row = json.loads(line)
+                    if self.timestamp_column is not None:
+                        row[self.timestamp_column] = loaded_at
+                    batch.append(row)
+                    if len(batch) >= _LOADED_BATCH_SIZE:
+                        on_loaded(batch)
+                        batch = []
+                if batch:
+                    on_loaded(batch)
+        return result
+
+    def _stamp_loaded_rows(self, staged_at: str) -> str:
+        """
+        Move the rows of an import from their staging stamp to the current time.
+
+        :param staged_at: The stamp written to every row of the import
+        :return: The stamp the rows now have, or ``staged_at`` if it was not changed
+        """
+        if self.timestamp_column is None:
+            return staged_at
+        loaded_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        query = f"""
+            UPDATE `{self.table}`
+            SET {self.timestamp_column} = @loaded_at
+            WHERE {self.timestamp_column} = @staged_at
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("loaded_at", "TIMESTAMP", loaded_at),
+                bigquery.ScalarQueryParameter("staged_at", "TIMESTAMP", staged_at),
+            ]
+        )
+        try:
+            track_job(
+                self.client_factory().query(query, job_config=job_config)
+            ).result()
+        except Exception as e:
+            # The rows are loaded; only replicas syncing by timestamp may miss them.
+            logging.warning(f"Unable to stamp the rows loaded into {self.table}: {e}")
+            return staged_at
+        return loaded_at
@@ -0,0 +1,247 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Protocol
+
+import google.cloud.storage as storage
+
+
+class SharedGeneration(Protocol):
+    """A generation counter shared between instances to propagate invalidations."""
+
+    def current(self) -> Any:
+        """Return the latest known generation."""
+        ...
+
+    def bump(self) -> None:
+        """Publish a new generation to every instance."""
+        ...
+
+
+class GcsGeneration:
+    """
+    A shared generation backed by the generation number of a Cloud Storage object.
+
+    A background thread wakes every ``poll_interval`` seconds: if any ``bump``
+    happened since its last pass it rewrites the object once, which gives it a
+    new generation, otherwise it reads the object metadata. Bumps are therefore
+    merged into at most one write per interval, which stays under the Cloud
+    Storage limit of one update per second per object, and neither ``bump`` nor
+    ``current`` does network I/O on the caller's thread. Other instances see an
+    invalidation within about two intervals.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        blob_name: str,
+        poll_interval: float = 5.0,
+        storage_client: storage.Client | None = None,
+    ) -> None:
+        """
+        Initialize the shared generation.
+
+        :param bucket_name: Bucket holding the generation object
+        :param blob_name: Name of the generation object
+        :param poll_interval: Seconds between background writes or metadata reads
+        :param storage_client: Google Cloud Storage client
+        """
+        self.bucket_name = bucket_name
+        self.blob_name = blob_name
+        self._storage_client = storage_client
+        self._blob: storage.Blob | None = None
+        self.poll_interval = poll_interval
+        self._generation: Any = None
+        self._pending = False
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def blob(self) -> storage.Blob:
+        """The generation object, created on first use to keep imports offline."""
+        if self._blob is None:
+            client = self._storage_client or storage.Client()
+            self._blob = client.bucket(self.bucket_name).blob(self.blob_name)
+        return self._blob
+
+    def current(self) -> Any:
+        self._ensure_started()
+        with self._lock:
+            return self._generation
+
+    def bump(self) -> None:
+        self._ensure_started()
+        with self._lock:
+            self._pending = True
+
+    def close(self) -> None:
+        """Stop the background thread, publishing a pending bump first."""
+        self._stopped.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        self._sync()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._stopped.is_set():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="cache-generation", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._sync()
+            if self._stopped.wait(self.poll_interval):
+                return
+
+    def _sync(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, False
+        try:
+            if pending:
+                self.blob.upload_from_string(str(time.time()), "text/plain")
+            else:
+                self.blob.reload()
+            generation = self.blob.generation
+        except Exception as e:
+            if pending:
+                logging.warning(f"Unable to publish shared cache invalidation: {e}")
+                with self._lock:
+                    self._pending = True
+            else:
+                logging.warning(f"Unable to read shared cache generation: {e}")
+            return
+        with self._lock:
+            self._generation = generation
+
+
+class TTLCache:
+    """
+    A thread-safe in-process cache with TTL expiry and LRU eviction.
+
+    Entries expire ``ttl_seconds`` after being stored and the least recently used
+    entry is evicted once ``maxsize`` entries are held. When a shared generation
+    is given, ``invalidate`` also notifies other instances, and a generation
+    change observed on read clears the local entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_seconds: float,
+        shared: SharedGeneration | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param maxsize: Maximum number of entries
+        :param ttl_seconds: Lifetime of an entry in seconds
+        :param shared: Optional generation shared with other instances
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generation: Any = None
+        # Incremented on every local clear so that a value computed before an
+        # invalidation is not stored after it.
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for ``key``, or ``default`` if absent or expired.
+
+        :param key: The cache key
+        :param default: Value returned on a miss
+        :return: The cached value or ``default``
+        """
+        if self.shared is not None:
+            generation = self.shared.current()
+            with self._lock:
+                if generation != self._generation:
+                    self._entries.clear()
+                    self._version += 1
+                    self._generation = generation
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def version(self) -> int:
+        """
+        Return a token to pass to ``set`` for values computed from this point on.
+
+        :return: The current invalidation version
+        """
+        with self._lock:
+            return self._version
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        """
+        Store ``value`` under ``key``, evicting the least recently used entry if full.
+
+        :param key: The cache key
+        :param value: The value to cache
+        :param version: Token from ``version()`` taken before computing the value;
+            the value is discarded if the cache was invalidated since
+        """
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, propagate: bool = True) -> None:
+        """
+        Drop every entry here and, if configured, on the other instances.
+
+        :param propagate: Whether to notify the other instances through the shared generation
+        """
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+            self._stats["invalidations"] += 1
+        if propagate and self.shared is not None:
+            self.shared.bump()
+            with self._lock:
+                self._generation = self.shared.current()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report hit/miss counters and the current size.
+
+        :return: A dictionary of counters
+        """
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
@@ -0,0 +1,177 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Maximum number of model turns timed concurrently; older ones are dropped.
+_MAX_PENDING_TURNS = 1024
+
+# A handler receives the regex match of the user message and returns the reply,
+# or None to let the model handle the turn (e.g. on a tool error).
+RouteHandler = Callable[[re.Match[str], CallbackContext], Awaitable[str | None]]
+
+
+@dataclass(frozen=True)
+class Route:
+    """A deterministic intent: a compiled pattern and the handler that answers it."""
+
+    name: str
+    pattern: re.Pattern[str]
+    handler: RouteHandler
+
+
+class FastPathRouter:
+    """
+    Answer unambiguous user messages without calling the model.
+
+    ``before_model_callback`` matches the latest user message of a turn against
+    each route's pattern with ``fullmatch``, so only messages that consist
+    entirely of a known intent are routed. The first matching route whose
+    handler returns a reply short-circuits the model call; otherwise the request
+    proceeds unchanged. Follow-up model calls inside a turn (after a tool
+    response) are never routed.
+
+    Routed turns are timed per route, and turns served by the model are timed
+    from their first model call to the final response, so both paths can be
+    compared in ``stats()``.
+    """
+
+    def __init__(self, routes: list[Route], enabled: bool = FAST_PATH_ENABLED) -> None:
+        """
+        Initialize the router.
+
+        :param routes: Routes tried in order
+        :param enabled: Whether routing is active; timings are recorded either way
+        """
+        self.routes = routes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[str, float] = OrderedDict()
+        self._turns = 0
+        self._route_stats = {
+            route.name: {"hits": 0, "declined": 0, "total_latency_ms": 0.0}
+            for route in routes
+        }
+        self._model_stats = {"turns": 0, "total_latency_ms": 0.0}
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        """Reply from a matching route, or start timing the model turn."""
+        text = _user_text(llm_request)
+        if text is None:
+            return None
+        start = time.perf_counter()
+        with self._lock:
+            self._turns += 1
+        if self.enabled:
+            normalized = " ".join(text.split())
+            for route in self.routes:
+                match = route.pattern.fullmatch(normalized)
+                if match is None:
+                    continue
+                reply = await route.handler(match, callback_context)
+                latency_ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    stats = self._route_stats[route.name]
+                    if reply is None:
+                        stats["declined"] += 1
+                        continue
+                    stats["hits"] += 1
+                    stats["total_latency_ms"] += latency_ms
+                logging.info(
+                    f"Fast path '{route.name}' answered in {latency_ms:.1f} ms"
+                )
+                return LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=reply)])
+                )
+        with self._lock:
+            self._pending[callback_context.invocation_id] = start
+            while len(self._pending) > _MAX_PENDING_TURNS:
+                self._pending.popitem(last=False)
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        """Record the latency of a model-served turn once its final reply arrives."""
+        if llm_response.partial or _has_function_call(llm_response):
+            return None
+        with self._lock:
+            start = self._pending.pop(callback_context.invocation_id, None)
+            if start is not None:
+                self._model_stats["turns"] += 1
+                self._model_stats["total_latency_ms"] += (
+                    time.perf_counter() - start
+                ) * 1000
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Report per-route hit rates and latencies next to those of model turns.
+
+        :return: A dictionary with ``turns``, ``routes`` and ``model`` entries
+        """
+        with self._lock:
+            turns = self._turns
+            routes = {}
+            for name, stats in self._route_stats.items():
+                hits = stats["hits"]
+                routes[name] = {
+                    **stats,
+                    "hit_rate": hits / turns if turns else 0.0,
+                    "avg_latency_ms": stats["total_latency_ms"] / hits if hits else 0.0,
+                }
+            model_turns = self._model_stats["turns"]
+            model = {
+                **self._model_stats,
+                "avg_latency_ms": self._model_stats["total_latency_ms"] / model_turns
+                if model_turns
+                else 0.0,
+            }
+        return {"turns": turns, "routes": routes, "model": model}
+
+
+def _user_text(llm_request: LlmRequest) -> str | None:
+    """Return the text of the latest content if it is a fresh user message."""
+    if not llm_request.contents:
+        return None
+    content = llm_request.contents[-1]
+    if content.role != "user" or not content.parts:
+        return None
+    if any(part.function_response for part in content.parts):
+        return None
+    text = "".join(part.text or "" for part in content.parts).strip()
+    return text or None
+
+
+def _has_function_call(llm_response: LlmResponse) -> bool:
+    if llm_response.content is None or not llm_response.content.parts:
+        return False
+    return any(part.function_call for part in llm_response.content.parts)
@@ -0,0 +1,259 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from google.cloud import logging as google_cloud_logging
+
+FEEDBACK_BUFFER_SIZE = int(os.environ.get("FEEDBACK_BUFFER_SIZE", "1000"))
+FEEDBACK_BATCH_SIZE = int(os.environ.get("FEEDBACK_BATCH_SIZE", "100"))
+FEEDBACK_FLUSH_INTERVAL_SECONDS = float(
+    os.environ.get("FEEDBACK_FLUSH_INTERVAL_SECONDS", "2.0")
+)
+FEEDBACK_SPILL_PATH = os.environ.get(
+    "FEEDBACK_SPILL_PATH",
+    os.path.join(tempfile.gettempdir(), "adk-travel-agent-cr", "feedback.spill"),
+)
+# Attempts per batch before it is spilled to disk; the delay doubles after each.
+FEEDBACK_MAX_RETRIES = int(os.environ.get("FEEDBACK_MAX_RETRIES", "3"))
+FEEDBACK_RETRY_SECONDS = float(os.environ.get("FEEDBACK_RETRY_SECONDS", "0.5"))
+
+
+def cloud_logging_batch_writer(
+    logger: google_cloud_logging.Logger,
+) -> Callable[[list[dict[str, Any]]], None]:
+    """
+    Build a batch writer that sends every record of a batch in one Cloud Logging call.
+
+    :param logger: The Cloud Logging logger receiving the records
+    :return: A function writing a list of records as structured log entries
+    """
+
+    def write(records: list[dict[str, Any]]) -> None:
+        with logger.batch() as batch:
+            for record in records:
+                batch.log_struct(record, severity="INFO")
+
+    return write
+
+
+class FeedbackSink:
+    """
+    Buffer feedback records in memory and write them in batches from a background thread.
+
+    ``submit`` never performs network I/O, so request handlers can acknowledge
+    feedback straight away. When the buffer holds ``max_buffer`` records, new
+    ones are appended to a spill file instead, and batches that still fail after
+    ``max_retries`` attempts are spilled too. Spilled records are read back once
+    the buffer drains, including by the next process. ``close`` writes or spills
+    everything that is still buffered. Records that cannot be spilled either,
+    because the file cannot be written, are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[list[dict[str, Any]]], None],
+        max_buffer: int = FEEDBACK_BUFFER_SIZE,
+        batch_size: int = FEEDBACK_BATCH_SIZE,
+        flush_interval: float = FEEDBACK_FLUSH_INTERVAL_SECONDS,
+        spill_path: str = FEEDBACK_SPILL_PATH,
+        max_retries: int = FEEDBACK_MAX_RETRIES,
+        retry_seconds: float = FEEDBACK_RETRY_SECONDS,
+    ) -> None:
+        """
+        Initialize the sink. No thread is started until first use.
+
+        :param write_batch: Writes a list of records, raising on failure
+        :param max_buffer: Maximum number of records held in memory
+        :param batch_size: Maximum number of records per write
+        :param flush_interval: Maximum time in seconds a record waits in the buffer
+        :param spill_path: File receiving records that do not fit in the buffer
+        :param max_retries: Attempts per batch before spilling it
+        :param retry_seconds: Delay before the first retry
+        """
+        self.write_batch = write_batch
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.max_retries = max_retries
+        self.retry_seconds = retry_seconds
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "spilled": 0,
+            "restored": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "dropped": 0,
+        }
+
+    def start(self) -> None:
+        """Start the flush thread."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._closed = False
+            self._thread = threading.Thread(
+                target=self._run, name="feedback-sink", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, record: dict[str, Any]) -> None:
+        """
+        Accept a record for the next batch without waiting for it to be written.
+
+        :param record: A JSON-serializable feedback record
+        """
+        self.start()
+        with self._condition:
+            self._stats["submitted"] += 1
+            if len(self._buffer) < self.max_buffer:
+                self._buffer.append(record)
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify()
+                return
+            self._spill([record])
+
+    def flush(self) -> None:
+        """
+        Synchronously write every buffered and spilled record.
+
+        Once a batch fails, the rest of the buffer is spilled without trying it.
+        """
+        while self._flush_batch():
+            pass
+        with self._condition:
+            if self._buffer:
+                remaining = list(self._buffer)
+                self._buffer.clear()
+                self._spill(remaining)
+
+    def close(self) -> None:
+        """Stop the flush thread after writing every buffered record."""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report buffer depth and write counters.
+
+        :return: A dictionary of counters
+        """
+        with self._condition:
+            return {**self._stats, "buffered": len(self._buffer)}
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._buffer and not self._closed:
+                    self._condition.wait(self.flush_interval)
+                if not self._closed and 0 < len(self._buffer) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self._flush_batch()
+
+    def _flush_batch(self) -> bool:
+        """Write one batch. Return True if a batch was written and more may remain."""
+        with self._flush_lock:
+            with self._condition:
+                if not self._buffer:
+                    self._restore_spill()
+                batch = [
+                    self._buffer.popleft()
+                    for _ in range(min(self.batch_size, len(self._buffer)))
+                ]
+            if not batch:
+                return False
+            delay = self.retry_seconds
+            for attempt in range(self.max_retries):
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    logging.warning(
+                        f"Writing {len(batch)} feedback records failed "
+                        f"(attempt {attempt + 1}/{self.max_retries}): {e}"
+                    )
+                    if attempt + 1 < self.max_retries:
+                        with self._condition:
+                            self._stats["retries"] += 1
+                        time.sleep(delay)
+                        delay *= 2
+                    continue
+                with self._condition:
+                    self._stats["batches"] += 1
+                    self._stats["written"] += len(batch)
+                return True
+            with self._condition:
+                self._stats["failed_batches"] += 1
+                self._spill(batch)
+            return False
+
+    def _spill(self, records: list[dict[str, Any]]) -> None:
+        """Append records to the spill file, or drop them. Caller holds the condition."""
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logging.error(f"Dropping {len(records)} feedback records: {e}")
+            self._stats["dropped"] += len(records)
+            return
+        self._stats["spilled"] += len(records)
+
+    def _restore_spill(self) -> None:
+        """Move spilled records back into the empty buffer. Caller holds the condition."""
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"Unable to read spilled feedback records: {e}")
+            return
+        restored, remaining = records[: self.max_buffer], records[self.max_buffer :]
+        if remaining:
+            tmp_path = f"{self.spill_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in remaining:
+                    f.write(json.dumps(record, default=str) + "\n")
+            os.replace(tmp_path, self.spill_path)
+        else:
+            os.remove(self.spill_path)
+        if restored:
+            logging.info(f"Restoring {len(restored)} spilled feedback records")
+            self._buffer.extend(restored)
+            self._stats["restored"] += len(restored)
@@ -0,0 +1,224 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+HISTORY_COMPACTION_ENABLED = (
+    os.environ.get("HISTORY_COMPACTION_ENABLED", "true").lower() == "true"
+)
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "8000"))
+# Most recent user turns that are always sent unchanged.
+HISTORY_KEEP_RECENT_TURNS = int(os.environ.get("HISTORY_KEEP_RECENT_TURNS", "4"))
+# Characters kept from each tool result outside the recent turns.
+HISTORY_TOOL_RESULT_MAX_CHARS = int(
+    os.environ.get("HISTORY_TOOL_RESULT_MAX_CHARS", "300")
+)
+# Characters of earlier user messages kept in the summary of dropped turns.
+HISTORY_SUMMARY_MAX_CHARS = int(os.environ.get("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+
+# Rough average for Gemini tokenizers on mixed Spanish text and JSON.
+_CHARS_PER_TOKEN = 4
+
+# Returns facts that must survive compaction, extracted from the full history.
+FactExtractor = Callable[[list[types.Content]], list[str]]
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """
+    Estimate the input tokens of ``contents`` without calling the API.
+
+    :param contents: Request contents
+    :return: Approximate number of tokens
+    """
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            if part.function_call:
+                chars += len(part.function_call.name or "")
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            if part.function_response:
+                chars += len(part.function_response.name or "")
+                chars += len(
+                    json.dumps(part.function_response.response or {}, default=str)
+                )
+    return chars // _CHARS_PER_TOKEN
+
+
+class HistoryCompactor:
+    """
+    Keep the history sent to the model within a token budget.
+
+    ``before_model_callback`` only rewrites the outgoing request; the session
+    keeps every event. When the estimated size exceeds ``token_budget``, tool
+    results outside the last ``keep_recent_turns`` user turns are truncated
+    first, keeping function calls paired with their responses. If the request
+    is still too large, those older turns are dropped and replaced by a single
+    summary holding the facts returned by ``fact_extractor`` and the most
+    recent earlier user messages, where details of an unfinished booking live.
+    """
+
+    def __init__(
+        self,
+        fact_extractor: FactExtractor | None = None,
+        enabled: bool = HISTORY_COMPACTION_ENABLED,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS,
+        tool_result_max_chars: int = HISTORY_TOOL_RESULT_MAX_CHARS,
+        summary_max_chars: int = HISTORY_SUMMARY_MAX_CHARS,
+    ) -> None:
+        """
+        Initialize the compactor.
+
+        :param fact_extractor: Returns facts to keep from the full history
+        :param enabled: Whether to compact at all
+        :param token_budget: Estimated tokens above which history is compacted
+        :param keep_recent_turns: Most recent user turns never compacted
+        :param tool_result_max_chars: Characters kept from older tool results
+        :param summary_max_chars: Characters of earlier user messages kept in the summary
+        """
+        self.fact_extractor = fact_extractor
+        self.enabled = enabled
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.tool_result_max_chars = tool_result_max_chars
+        self.summary_max_chars = summary_max_chars
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "compacted_requests": 0,
+            "dropped_turns": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "last_tokens_before": 0,
+            "last_tokens_after": 0,
+        }
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        """Compact ``llm_request.contents`` in place if it exceeds the budget."""
+        if not self.enabled:
+            return None
+        tokens_before = estimate_tokens(llm_request.contents)
+        tokens_after = tokens_before
+        dropped_turns = 0
+        if tokens_before > self.token_budget:
+            llm_request.contents, dropped_turns = self.compact(llm_request.contents)
+            tokens_after = estimate_tokens(llm_request.contents)
+            logging.info(
+                f"Compacted history from ~{tokens_before} to ~{tokens_after} tokens "
+                f"({dropped_turns} turns summarized)"
+            )
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["compacted_requests"] += int(tokens_after != tokens_before)
+            self._stats["dropped_turns"] += dropped_turns
+            self._stats["tokens_before"] += tokens_before
+            self._stats["tokens_after"] += tokens_after
+            self._stats["last_tokens_before"] = tokens_before
+            self._stats["last_tokens_after"] = tokens_after
+        return None
+
+    def compact(self, contents: list[types.Content]) -> tuple[list[types.Content], int]:
+        """
+        Return a compacted copy of ``contents`` and the number of turns dropped.
+
+        :param contents: Request contents, oldest first
+        :return: The compacted contents and how many user turns were summarized
+        """
+        turn_starts = [
+            i for i, content in enumerate(contents) if _is_user_message(content)
+        ]
+        if len(turn_starts) <= self.keep_recent_turns:
+            return contents, 0
+        split = (
+            turn_starts[-self.keep_recent_turns]
+            if self.keep_recent_turns
+            else len(contents)
+        )
+        older = [self._truncate_tool_results(content) for content in contents[:split]]
+        recent = contents[split:]
+        if estimate_tokens(older + recent) <= self.token_budget:
+            return older + recent, 0
+
+        facts = self.fact_extractor(contents) if self.fact_extractor else []
+        user_messages: list[str] = []
+        remaining = self.summary_max_chars
+        for content in reversed(contents[:split]):
+            if not _is_user_message(content) or remaining <= 0:
+                continue
+            text = " ".join(part.text or "" for part in content.parts or []).strip()
+            user_messages.append(text[:remaining])
+            remaining -= len(text)
+        lines = ["Resumen de la conversación anterior (mensajes antiguos compactados):"]
+        lines += [f"- {fact}" for fact in facts]
+        if user_messages:
+            lines.append(
+                "Mensajes anteriores del usuario, del más antiguo al más reciente:"
+            )
+            lines += [f"- {message}" for message in reversed(user_messages)]
+        summary = types.Content(role="user", parts=[types.Part(text="\n".join(lines))])
+        dropped_turns = sum(1 for start in turn_starts if start < split)
+        return [summary, *recent], dropped_turns
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report estimated tokens before and after compaction.
+
+        :return: A dictionary of counters
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _truncate_tool_results(self, content: types.Content) -> types.Content:
+        if not any(part.function_response for part in content.parts or []):
+            return content
+        parts = []
+        for part in content.parts or []:
+            response = part.function_response
+            if response is None:
+                parts.append(part)
+                continue
+            payload = json.dumps(
+                response.response or {}, ensure_ascii=False, default=str
+            )
+            if len(payload) > self.tool_result_max_chars:
+                response = types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={
+                        "compacted": True,
+                        "result_prefix": payload[: self.tool_result_max_chars],
+                    },
+                )
+            parts.append(types.Part(function_response=response))
+        return types.Content(role=content.role, parts=parts)
+
+
+def _is_user_message(content: types.Content) -> bool:
+    """True for contents typed by the user, as opposed to tool responses."""
+    return content.role == "user" and any(
+        part.text and not part.function_response for part in content.parts or []
+    )
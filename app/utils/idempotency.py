@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from typing import Any, TypeVar
+
+# Seconds during which a repeated booking returns the original result.
+BOOKING_DEDUPE_WINDOW_SECONDS = float(
+    os.environ.get("BOOKING_DEDUPE_WINDOW_SECONDS", "600")
+)
+BOOKING_DEDUPE_MAX_ENTRIES = int(os.environ.get("BOOKING_DEDUPE_MAX_ENTRIES", "10000"))
+
+T = TypeVar("T")
+
+
+def idempotency_key(scope: str, fields: Mapping[str, Any]) -> str:
+    """
+    Derive a key that is equal for the same request made twice in the same scope.
+
+    Text values are compared case-insensitively and with runs of whitespace
+    collapsed, so a rephrased retry of the same booking gets the same key.
+
+    :param scope: Where duplicates are looked for, e.g. a session
+    :param fields: The request arguments
+    :return: A hex digest of the scope and the normalized fields
+    """
+    normalized = {
+        name: " ".join(value.split()).casefold() if isinstance(value, str) else value
+        for name, value in fields.items()
+    }
+    payload = json.dumps([scope, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remember the results of recent operations so that repeating one returns them.
+
+    :meth:`run` computes the result of a key the first time it is seen and
+    returns the stored result for the next ``ttl_seconds``. Concurrent calls
+    with the same key wait for the first one instead of computing it again.
+    Entries expire in insertion order, so expired entries are dropped from the
+    oldest end on every call; at most ``maxsize`` entries are kept, the oldest
+    being evicted first.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = BOOKING_DEDUPE_MAX_ENTRIES,
+        ttl_seconds: float = BOOKING_DEDUPE_WINDOW_SECONDS,
+    ) -> None:
+        """
+        Initialize the store.
+
+        :param maxsize: Maximum number of remembered results
+        :param ttl_seconds: Seconds a result is remembered
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._pending: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stats = {"computed": 0, "replayed": 0, "expired": 0, "evictions": 0}
+
+    def run(
+        self,
+        key: str,
+        compute: Callable[[], T],
+        keep: Callable[[T], bool] = lambda _: True,
+    ) -> tuple[T, bool]:
+        """
+        Return the remembered result of ``key``, computing it if there is none.
+
+        :param key: The idempotency key, e.g. from :func:`idempotency_key`
+        :param compute: Performs the operation
+        :param keep: Whether a computed result is remembered; failures usually are not,
+            so that a retry performs the operation again
+        :return: The result and whether it was replayed rather than computed
+        """
+        while True:
+            with self._lock:
+                self._expire(time.monotonic())
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._stats["replayed"] += 1
+                    return entry[1], True
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+        result: Any = None
+        try:
+            result = compute()
+            return result, False
+        finally:
+            with self._lock:
+                self._stats["computed"] += 1
+                if result is not None and keep(result):
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self._stats["evictions"] += 1
+                del self._pending[key]
+            pending.set()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report how many results were computed, replayed, expired or evicted.
+
+        :return: A dictionary of counters and the current size
+        """
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now:
+                return
+            self._entries.popitem(last=False)
+            self._stats["expired"] += 1
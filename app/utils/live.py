@@ -0,0 +1,247 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+from google.adk.agents import LiveRequestQueue, RunConfig
+from google.adk.events.event import Event
+from google.adk.runners import Runner
+from google.genai import types
+
+from app.utils.metrics import MODEL_CALL_SECONDS, record_model_usage
+
+LIVE_ENABLED = os.environ.get("LIVE_ENABLED", "true").lower() == "true"
+
+# WebSocket close code for unexpected server errors.
+_INTERNAL_ERROR = 1011
+
+
+class LiveTurn:
+    """
+    Translate the live events of one connection into client messages.
+
+    Partial text is forwarded as soon as it arrives; the merged text the model
+    connection emits afterwards is only sent when nothing of it was streamed.
+    After the client interrupts, text of the turn in progress is dropped until
+    the model reports the turn as complete or interrupted.
+    """
+
+    def __init__(self) -> None:
+        self.active = False
+        self.suppressed = False
+        # perf_counter() when the user message of the turn in progress was sent.
+        self.started_at: float | None = None
+        self._streamed = False
+
+    def interrupt(self) -> bool:
+        """
+        Stop forwarding the answer in progress.
+
+        :return: Whether there was an answer in progress
+        """
+        if not self.active:
+            return False
+        self.suppressed = True
+        return True
+
+    def messages(self, event: Event) -> list[dict[str, Any]]:
+        """
+        Build the client messages for a live event.
+
+        :param event: An event yielded by ``Runner.run_live``
+        :return: Zero or more JSON-serializable messages
+        """
+        if event.author == "user":
+            # Input transcriptions echo what the client sent.
+            return []
+        messages: list[dict[str, Any]] = []
+        for call in event.get_function_calls():
+            messages.append(
+                {"type": "tool_call", "name": call.name, "args": call.args or {}}
+            )
+        for response in event.get_function_responses():
+            messages.append({"type": "tool_result", "name": response.name})
+        parts = event.content.parts if event.content and event.content.parts else []
+        text = "".join(part.text for part in parts if part.text and not part.thought)
+        if text and not messages:
+            if event.partial:
+                self._streamed = True
+                if not self.suppressed:
+                    messages.append({"type": "text", "text": text, "partial": True})
+            else:
+                if not self._streamed and not self.suppressed:
+                    messages.append({"type": "text", "text": text, "partial": False})
+                self._streamed = False
+        if event.error_code:
+            messages.append(
+                {"type": "error", "message": event.error_message or event.error_code}
+            )
+        if event.interrupted:
+            # Interrupted by a new user message, whose answer follows.
+            messages.append({"type": "interrupted"})
+            self.suppressed = False
+            self._streamed = False
+        if event.turn_complete:
+            messages.append({"type": "turn_complete"})
+            self.active = False
+            self.suppressed = False
+            self._streamed = False
+        return messages
+
+
+class LiveBridge:
+    """
+    Serve a bidirectional conversation over a WebSocket with ``Runner.run_live``.
+
+    Each connection keeps one session and one live model connection open for
+    all of its turns, so a turn costs a message on an open socket instead of a
+    new HTTP request, and text is sent to the client while it is generated.
+    Tool calls run inside the live flow without closing the stream. User
+    messages are appended to the session, which is therefore complete when a
+    client reconnects with its ``session_id`` or opens it through the REST API.
+
+    Client messages are JSON objects: ``{"type": "text", "text": ...}`` sends a
+    user turn, ``{"type": "interrupt"}`` stops the answer in progress and
+    ``{"type": "close"}`` ends the conversation. The server sends ``session``,
+    ``text`` (with ``partial``), ``tool_call``, ``tool_result``,
+    ``turn_complete``, ``interrupted`` and ``error`` messages.
+
+    The live flow runs the agent's tool callbacks but none of its model
+    callbacks, so when ``model`` is given the bridge records the duration of
+    each turn, tool calls included, and any token usage the model reports.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        run_config: RunConfig | None = None,
+        model: str | None = None,
+    ) -> None:
+        """
+        Initialize the bridge.
+
+        :param runner: Runner of the live agent; its session service stores the sessions
+        :param run_config: Live run configuration, text responses by default
+        :param model: Model label of the turn metrics; none are recorded without it
+        """
+        self.runner = runner
+        self.run_config = run_config or RunConfig(response_modalities=["TEXT"])
+        self.model = model
+
+    async def serve(
+        self, websocket: WebSocket, user_id: str, session_id: str | None = None
+    ) -> None:
+        """
+        Run a conversation until the client closes the socket or sends ``close``.
+
+        :param websocket: The client connection, not yet accepted
+        :param user_id: Owner of the session
+        :param session_id: Session to resume; a new one is created if absent or unknown
+        """
+        await websocket.accept()
+        session_service = self.runner.session_service
+        session = None
+        if session_id:
+            session = await session_service.get_session(
+                app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+            )
+        if session is None:
+            session = await session_service.create_session(
+                app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+            )
+        await websocket.send_json({"type": "session", "session_id": session.id})
+        queue = LiveRequestQueue()
+        turn = LiveTurn()
+
+        async def forward_events() -> None:
+            # The runner and this bridge append to the same session object, which
+            # keeps the database session service's staleness check satisfied.
+            async for event in self.runner.run_live(
+                session=session, live_request_queue=queue, run_config=self.run_config
+            ):
+                if self.model is not None:
+                    self._record_metrics(turn, event)
+                for message in turn.messages(event):
+                    await websocket.send_json(message)
+
+        async def receive_messages() -> None:
+            while True:
+                try:
+                    message = json.loads(await websocket.receive_text())
+                except json.JSONDecodeError:
+                    await websocket.send_json(
+                        {"type": "error", "message": "Invalid JSON"}
+                    )
+                    continue
+                kind = message.get("type") if isinstance(message, dict) else None
+                if kind == "close":
+                    return
+                if kind == "interrupt":
+                    if turn.interrupt():
+                        await websocket.send_json({"type": "interrupted"})
+                    continue
+                text = str(message.get("text") or "").strip() if kind == "text" else ""
+                if not text:
+                    await websocket.send_json(
+                        {
+                            "type": "error",
+                            "message": "Expected a text, interrupt or close message",
+                        }
+                    )
+                    continue
+                content = types.Content(role="user", parts=[types.Part(text=text)])
+                await session_service.append_event(
+                    session,
+                    Event(author="user", invocation_id=Event.new_id(), content=content),
+                )
+                turn.active = True
+                turn.started_at = time.perf_counter()
+                queue.send_content(content)
+
+        tasks = [
+            asyncio.create_task(forward_events()),
+            asyncio.create_task(receive_messages()),
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        queue.close()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            try:
+                task.result()
+            except WebSocketDisconnect:
+                logging.info(f"Live session {session.id} disconnected")
+                return
+            except Exception as e:
+                logging.exception(f"Live session {session.id} failed")
+                await websocket.close(code=_INTERNAL_ERROR, reason=str(e)[:120])
+                return
+        await websocket.close()
+
+    def _record_metrics(self, turn: LiveTurn, event: Event) -> None:
+        assert self.model is not None
+        if event.usage_metadata is not None:
+            record_model_usage(self.model, event.usage_metadata)
+        if event.turn_complete and turn.started_at is not None:
+            MODEL_CALL_SECONDS.labels(model=self.model).observe(
+                time.perf_counter() - turn.started_at
+            )
+            turn.started_at = None
@@ -0,0 +1,277 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from prometheus_client import Counter, Gauge, Histogram
+from toolbox_core.tool import ToolboxTool
+
+# Expose the Prometheus text format on /metrics. Recording is always on.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Latency buckets in seconds, from sub-10 ms cache hits to timed-out tool calls.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Maximum number of model and tool calls timed concurrently; older ones are dropped.
+_MAX_PENDING_CALLS = 1024
+
+# Every metric is registered in prometheus_client's default REGISTRY.
+TOOL_CALL_SECONDS = Histogram(
+    "travel_agent_tool_call_seconds",
+    "Duration of tool calls made by the agent.",
+    ("tool", "source", "outcome"),
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_CALL_SECONDS = Histogram(
+    "travel_agent_model_call_seconds",
+    "Duration of model calls, from the request to the final response.",
+    ("model",),
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_TOKENS = Counter(
+    "travel_agent_model_tokens",
+    "Tokens consumed by model calls; cached tokens are part of the prompt tokens.",
+    ("model", "kind"),
+)
+BIGQUERY_JOBS = Counter(
+    "travel_agent_bigquery_jobs",
+    "BigQuery jobs completed by tool calls.",
+    ("tool", "statement_type", "cache_hit"),
+)
+BIGQUERY_BYTES_PROCESSED = Counter(
+    "travel_agent_bigquery_bytes_processed",
+    "Bytes processed by BigQuery jobs of tool calls.",
+    ("tool",),
+)
+BIGQUERY_BYTES_BILLED = Counter(
+    "travel_agent_bigquery_bytes_billed",
+    "Bytes billed for BigQuery jobs of tool calls.",
+    ("tool",),
+)
+BIGQUERY_SLOT_MILLISECONDS = Counter(
+    "travel_agent_bigquery_slot_milliseconds",
+    "Slot time consumed by BigQuery jobs of tool calls.",
+    ("tool",),
+)
+BIGQUERY_JOB_SECONDS = Histogram(
+    "travel_agent_bigquery_job_seconds",
+    "Duration of BigQuery jobs of tool calls, from start to end on the server.",
+    ("tool",),
+    buckets=LATENCY_BUCKETS,
+)
+BOOKING_ROWS = Counter(
+    "travel_agent_booking_rows",
+    "Bookings written by the streaming writer, by outcome (flushed or rejected).",
+    ("outcome",),
+)
+ACTIVE_STREAMS = Gauge(
+    "travel_agent_active_streams",
+    "Streaming responses currently open.",
+    ("path",),
+)
+
+
+def record_bigquery_jobs(tool: str, jobs: Iterable[Any]) -> None:
+    """
+    Record the statistics of the finished jobs of a tool call.
+
+    Only jobs already known to be done are read, from the job resource the
+    client fetched while waiting for the result, so no API call is made.
+
+    :param tool: Name of the tool that ran the jobs
+    :param jobs: The jobs registered by the call
+    """
+    for job in jobs:
+        if getattr(job, "state", None) != "DONE":
+            continue
+        BIGQUERY_JOBS.labels(
+            tool=tool,
+            statement_type=getattr(job, "statement_type", None) or "unknown",
+            cache_hit=str(bool(getattr(job, "cache_hit", False))).lower(),
+        ).inc()
+        BIGQUERY_BYTES_PROCESSED.labels(tool=tool).inc(
+            getattr(job, "total_bytes_processed", None) or 0
+        )
+        BIGQUERY_BYTES_BILLED.labels(tool=tool).inc(
+            getattr(job, "total_bytes_billed", None) or 0
+        )
+        BIGQUERY_SLOT_MILLISECONDS.labels(tool=tool).inc(
+            getattr(job, "slot_millis", None) or 0
+        )
+        started, ended = getattr(job, "started", None), getattr(job, "ended", None)
+        if started is not None and ended is not None:
+            BIGQUERY_JOB_SECONDS.labels(tool=tool).observe(
+                (ended - started).total_seconds()
+            )
+
+
+def record_model_usage(model: str, usage: Any) -> None:
+    """
+    Add the token counts of a model response to ``MODEL_TOKENS``.
+
+    :param model: Model name used as label
+    :param usage: The response's ``usage_metadata``
+    """
+    MODEL_TOKENS.labels(model=model, kind="prompt").inc(usage.prompt_token_count or 0)
+    MODEL_TOKENS.labels(model=model, kind="cached").inc(
+        usage.cached_content_token_count or 0
+    )
+    MODEL_TOKENS.labels(model=model, kind="output").inc(
+        usage.candidates_token_count or 0
+    )
+
+
+def is_tool_error(response: Any) -> bool:
+    """
+    Tell whether a tool result reports an error.
+
+    Tools report errors either as text starting with "Error" or as a JSON
+    object, or a dict, with an ``error`` key.
+
+    :param response: The value returned by the tool
+    :return: Whether the result is an error
+    """
+    if isinstance(response, dict):
+        return "error" in response
+    if not isinstance(response, str):
+        return False
+    text = response.lstrip()
+    if text.startswith("Error"):
+        return True
+    if not text.startswith("{"):
+        return False
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and "error" in payload
+
+
+class AgentMetrics:
+    """
+    Agent callbacks that time model and tool calls.
+
+    ``before_model_callback`` should run last among the agent's before-model
+    callbacks, so that turns answered by an earlier callback (the fast path) are
+    not counted as model calls, and ``after_model_callback`` first. A call is
+    timed until its final (non-partial) response. Tools are labelled with their
+    source: ``toolbox`` for MCP Toolbox tools, ``function`` for the others. A
+    tool call that raises has no after callback and is eventually dropped from
+    the pending calls.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Start time and model of each call in flight.
+        self._pending: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        """Start timing a model call."""
+        self._start(
+            f"model:{callback_context.invocation_id}", llm_request.model or "unknown"
+        )
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        """Record the latency and token usage of a model call."""
+        if llm_response.partial:
+            return None
+        started = self._stop(f"model:{callback_context.invocation_id}")
+        if started is None:
+            return None
+        elapsed, model = started
+        MODEL_CALL_SECONDS.labels(model=model).observe(elapsed)
+        if llm_response.usage_metadata is not None:
+            record_model_usage(model, llm_response.usage_metadata)
+        return None
+
+    def before_tool_callback(
+        self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+    ) -> dict | None:
+        """Start timing a tool call."""
+        self._start(f"tool:{tool_context.function_call_id}", "")
+        return None
+
+    def after_tool_callback(
+        self,
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> dict | None:
+        """Record the latency of a tool call and whether it reported an error."""
+        started = self._stop(f"tool:{tool_context.function_call_id}")
+        if started is not None:
+            elapsed = started[0]
+            func = getattr(tool, "func", None)
+            is_toolbox = func is not None and isinstance(
+                inspect.unwrap(func), ToolboxTool
+            )
+            source = "toolbox" if is_toolbox else "function"
+            outcome = "error" if is_tool_error(tool_response) else "ok"
+            TOOL_CALL_SECONDS.labels(
+                tool=tool.name, source=source, outcome=outcome
+            ).observe(elapsed)
+        return None
+
+    def _start(self, key: str, model: str) -> None:
+        with self._lock:
+            self._pending[key] = (time.perf_counter(), model)
+            while len(self._pending) > _MAX_PENDING_CALLS:
+                self._pending.popitem(last=False)
+
+    def _stop(self, key: str) -> tuple[float, str] | None:
+        """Return the elapsed seconds and model of a timed call, if still pending."""
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is None:
+            return None
+        start, model = pending
+        return time.perf_counter() - start, model
+
+
+class ActiveStreamsMiddleware:
+    """
+    ASGI middleware counting the open responses of streaming endpoints.
+
+    A request is counted from the moment it reaches the application until its
+    response body is fully sent or the client goes away.
+    """
+
+    def __init__(self, app: Any, paths: Iterable[str] = ("/run_sse",)) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path")
+        if scope["type"] not in ("http", "websocket") or path not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        with ACTIVE_STREAMS.labels(path=path).track_inprogress():
+            await self.app(scope, receive, send)
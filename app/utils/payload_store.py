@@ -0,0 +1,278 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+import google.cloud.storage as storage
+from google.api_core.exceptions import PreconditionFailed
+
+# Maximum number of payloads waiting to be uploaded; further payloads are dropped.
+TRACE_OFFLOAD_QUEUE_SIZE = int(os.environ.get("TRACE_OFFLOAD_QUEUE_SIZE", "64"))
+# How long a missing bucket is remembered before checking again.
+TRACE_BUCKET_CHECK_SECONDS = float(os.environ.get("TRACE_BUCKET_CHECK_SECONDS", "300"))
+# Content hashes remembered as already stored, to skip repeated uploads.
+_UPLOADED_HASHES_MAX = 4096
+
+
+class PayloadStore(Protocol):
+    """Object storage for gzip-compressed payloads, addressed by name."""
+
+    def available(self) -> bool:
+        """Return whether payloads can currently be stored."""
+        ...
+
+    def upload(self, name: str, data: bytes) -> None:
+        """Store ``data`` under ``name`` unless an object with that name exists."""
+        ...
+
+    def uri(self, name: str) -> str:
+        """Return the storage URI of ``name``."""
+        ...
+
+    def url(self, name: str) -> str:
+        """Return a browser URL of ``name``."""
+        ...
+
+
+class GcsPayloadStore:
+    """A payload store backed by a Cloud Storage bucket."""
+
+    def __init__(
+        self,
+        storage_client: storage.Client,
+        bucket_name: str,
+        check_interval: float = TRACE_BUCKET_CHECK_SECONDS,
+    ) -> None:
+        """
+        Initialize the store.
+
+        :param storage_client: Google Cloud Storage client
+        :param bucket_name: Name of the bucket holding the payloads
+        :param check_interval: Seconds before a missing bucket is checked again
+        """
+        self.bucket_name = bucket_name
+        self.bucket = storage_client.bucket(bucket_name)
+        self.check_interval = check_interval
+        self._exists: bool | None = None
+        self._checked_at = 0.0
+
+    def available(self) -> bool:
+        # A present bucket is cached for good; a missing one is re-checked periodically.
+        if self._exists or (
+            self._exists is False
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return bool(self._exists)
+        self._checked_at = time.monotonic()
+        try:
+            self._exists = self.bucket.exists()
+        except Exception as e:
+            logging.warning(f"Unable to check bucket {self.bucket_name}: {e}")
+            self._exists = False
+        if not self._exists:
+            logging.warning(
+                f"Bucket {self.bucket_name} not found. "
+                "Unable to store span attributes in GCS."
+            )
+        return bool(self._exists)
+
+    def upload(self, name: str, data: bytes) -> None:
+        blob = self.bucket.blob(name)
+        blob.content_encoding = "gzip"
+        try:
+            # Objects are content-addressed, so an existing one already holds the data.
+            blob.upload_from_string(data, "application/json", if_generation_match=0)
+        except PreconditionFailed:
+            pass
+
+    def uri(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+    def url(self, name: str) -> str:
+        return f"https://storage.mtls.cloud.google.com/{self.bucket_name}/{name}"
+
+
+class LocalPayloadStore:
+    """A payload store writing to a local directory, for tests and local runs."""
+
+    def __init__(self, root: str) -> None:
+        """
+        Initialize the store.
+
+        :param root: Directory holding the payloads
+        """
+        self.root = root
+
+    def available(self) -> bool:
+        return True
+
+    def upload(self, name: str, data: bytes) -> None:
+        path = os.path.join(self.root, name)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def uri(self, name: str) -> str:
+        return f"file://{os.path.join(os.path.abspath(self.root), name)}"
+
+    def url(self, name: str) -> str:
+        return self.uri(name)
+
+
+class PayloadOffloader:
+    """
+    Upload large payloads in the background, compressed and deduplicated.
+
+    ``submit`` only hashes the payload and returns where it will be stored, so
+    callers never wait on object storage. Payloads are named after the SHA-256
+    of their content, so identical prompts or tool outputs are stored once, and
+    are gzip-compressed by a worker thread before upload. The queue is bounded:
+    when it is full the payload is dropped and counted rather than blocking the
+    caller or growing memory. Whether the store is available is checked by the
+    worker, since it may take a network call; payloads it cannot store are
+    counted as ``unavailable`` and their returned location is left dangling.
+    """
+
+    def __init__(
+        self,
+        store: PayloadStore,
+        prefix: str = "spans",
+        max_queue: int = TRACE_OFFLOAD_QUEUE_SIZE,
+    ) -> None:
+        """
+        Initialize the offloader. The worker thread starts on the first submit.
+
+        :param store: Destination of the payloads
+        :param prefix: Object name prefix
+        :param max_queue: Maximum number of payloads waiting for upload
+        """
+        self.store = store
+        self.prefix = prefix
+        self._queue: queue.Queue[tuple[str, bytes] | None] = queue.Queue(max_queue)
+        self._uploaded: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stats = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "uploaded": 0,
+            "dropped": 0,
+            "failed": 0,
+            "unavailable": 0,
+            "uploaded_bytes": 0,
+            "raw_bytes": 0,
+        }
+
+    def submit(self, payload: str) -> tuple[str, str] | None:
+        """
+        Queue ``payload`` for upload.
+
+        :param payload: The serialized payload
+        :return: The URI and URL it will be stored at, or None if it was dropped
+        """
+        data = payload.encode()
+        name = f"{self.prefix}/{hashlib.sha256(data).hexdigest()}.json.gz"
+        location = (self.store.uri(name), self.store.url(name))
+        with self._lock:
+            self._stats["submitted"] += 1
+            if name in self._uploaded:
+                self._uploaded.move_to_end(name)
+                self._stats["deduplicated"] += 1
+                return location
+            self._start()
+        try:
+            self._queue.put_nowait((name, data))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            logging.warning("Payload offload queue full, dropping span payload")
+            return None
+        return location
+
+    def flush(self) -> None:
+        """Block until every queued payload has been handled."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Upload the queued payloads and stop the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report upload counters and the current queue depth.
+
+        :return: A dictionary of counters; sizes are in bytes
+        """
+        with self._lock:
+            return {**self._stats, "queue_depth": self._queue.qsize()}
+
+    def _start(self) -> None:
+        """Start the worker thread if needed. Caller holds the lock."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="payload-offloader", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._upload(*item)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, name: str, data: bytes) -> None:
+        with self._lock:
+            if name in self._uploaded:
+                self._stats["deduplicated"] += 1
+                return
+        if not self.store.available():
+            with self._lock:
+                self._stats["unavailable"] += 1
+            return
+        compressed = gzip.compress(data)
+        try:
+            self.store.upload(name, compressed)
+        except Exception as e:
+            logging.warning(f"Unable to upload span payload {name}: {e}")
+            with self._lock:
+                self._stats["failed"] += 1
+            return
+        with self._lock:
+            self._uploaded[name] = None
+            while len(self._uploaded) > _UPLOADED_HASHES_MAX:
+                self._uploaded.popitem(last=False)
+            self._stats["uploaded"] += 1
+            self._stats["raw_bytes"] += len(data)
+            self._stats["uploaded_bytes"] += len(compressed)
@@ -0,0 +1,217 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from google import genai
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_TTL_SECONDS = int(os.environ.get("PROMPT_CACHE_TTL_SECONDS", "3600"))
+# Renew the cache TTL when it has less than this left.
+PROMPT_CACHE_RENEW_MARGIN_SECONDS = int(
+    os.environ.get("PROMPT_CACHE_RENEW_MARGIN_SECONDS", "300")
+)
+# Back-off after a failed cache creation (e.g. prompt below the minimum size).
+PROMPT_CACHE_RETRY_SECONDS = float(os.environ.get("PROMPT_CACHE_RETRY_SECONDS", "600"))
+
+
+class PromptCache:
+    """
+    Serve the static part of an agent's instructions through Gemini context caching.
+
+    ``before_model_callback`` creates, per model and tool set, a cached content
+    holding the static instruction and the tool declarations, renews its TTL
+    before it expires, and points each request at it. Gemini does not accept a
+    system instruction or tools next to a cached content, so the per-turn
+    instruction produced by ADK (the dynamic instruction provider) is sent as the
+    first content of the request instead. If caching is disabled or unavailable
+    the static instruction is simply prepended to the system instruction.
+
+    ``after_model_callback`` records cached versus uncached input tokens per turn.
+    """
+
+    def __init__(
+        self,
+        static_instruction: str,
+        enabled: bool = PROMPT_CACHE_ENABLED,
+        ttl_seconds: int = PROMPT_CACHE_TTL_SECONDS,
+        renew_margin_seconds: int = PROMPT_CACHE_RENEW_MARGIN_SECONDS,
+        client: genai.Client | None = None,
+    ) -> None:
+        """
+        Initialize the prompt cache. No API call is made until the first model turn.
+
+        :param static_instruction: Instruction text that is identical on every turn
+        :param enabled: Whether to use context caching at all
+        :param ttl_seconds: TTL of the cached content
+        :param renew_margin_seconds: Remaining lifetime below which the TTL is renewed
+        :param client: Gen AI client, created from the environment by default
+        """
+        self.static_instruction = static_instruction
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.renew_margin_seconds = renew_margin_seconds
+        self._client = client
+        self._caches: dict[str, types.CachedContent] = {}
+        self._failed_at: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self._stats: dict[str, float] = {
+            "turns": 0,
+            "cached_turns": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "last_prompt_tokens": 0,
+            "last_cached_tokens": 0,
+            "caches_created": 0,
+            "caches_renewed": 0,
+            "cache_errors": 0,
+        }
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._client = genai.Client()
+        return self._client
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        """Attach the cached static instruction to the request, or inline it."""
+        if llm_request.config is None:
+            llm_request.config = types.GenerateContentConfig()
+        config = llm_request.config
+        cache = await self._get_cache(llm_request) if self.enabled else None
+        if cache is None:
+            dynamic = config.system_instruction or ""
+            config.system_instruction = f"{self.static_instruction}\n\n{dynamic}"
+            return None
+        if config.system_instruction:
+            llm_request.contents.insert(
+                0,
+                types.Content(
+                    role="user",
+                    parts=[types.Part(text=str(config.system_instruction))],
+                ),
+            )
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+        config.cached_content = cache.name
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        """Record cached and uncached input tokens of the turn."""
+        usage = llm_response.usage_metadata
+        if usage is None or llm_response.partial:
+            return None
+        prompt_tokens = usage.prompt_token_count or 0
+        cached_tokens = usage.cached_content_token_count or 0
+        self._stats["turns"] += 1
+        self._stats["cached_turns"] += 1 if cached_tokens else 0
+        self._stats["prompt_tokens"] += prompt_tokens
+        self._stats["cached_tokens"] += cached_tokens
+        self._stats["last_prompt_tokens"] = prompt_tokens
+        self._stats["last_cached_tokens"] = cached_tokens
+        logging.info(
+            f"Model turn input tokens: {prompt_tokens} "
+            f"({cached_tokens} cached, {prompt_tokens - cached_tokens} uncached)"
+        )
+        return None
+
+    def stats(self) -> dict[str, float]:
+        """
+        Report token counters accumulated over model turns.
+
+        :return: A dictionary of counters
+        """
+        return dict(self._stats)
+
+    async def _get_cache(self, llm_request: LlmRequest) -> types.CachedContent | None:
+        model = llm_request.model or ""
+        config = llm_request.config
+        # ADK has turned the agent's tools into types.Tool declarations by now.
+        tools = [
+            tool
+            for tool in (config.tools if config else None) or []
+            if isinstance(tool, types.Tool)
+        ]
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    model,
+                    self.static_instruction,
+                    [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+                ],
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+        async with self._lock:
+            if time.time() - self._failed_at.get(key, 0) < PROMPT_CACHE_RETRY_SECONDS:
+                return None
+            try:
+                cache = self._caches.get(key)
+                if cache is None:
+                    cache = await self._create(key, model, tools)
+                elif self._remaining_seconds(cache) < self.renew_margin_seconds:
+                    cache = await self.client.aio.caches.update(
+                        name=cache.name or "",
+                        config=types.UpdateCachedContentConfig(
+                            ttl=f"{self.ttl_seconds}s"
+                        ),
+                    )
+                    self._stats["caches_renewed"] += 1
+            except Exception as e:
+                logging.warning(f"Prompt context caching unavailable: {e}")
+                self._caches.pop(key, None)
+                self._failed_at[key] = time.time()
+                self._stats["cache_errors"] += 1
+                return None
+            self._caches[key] = cache
+            return cache
+
+    async def _create(
+        self, key: str, model: str, tools: list[Any]
+    ) -> types.CachedContent:
+        cache = await self.client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"adk-travel-agent-cr-{key[:12]}",
+                system_instruction=self.static_instruction,
+                tools=tools or None,
+                ttl=f"{self.ttl_seconds}s",
+            ),
+        )
+        self._stats["caches_created"] += 1
+        logging.info(f"Created prompt context cache {cache.name}")
+        return cache
+
+    @staticmethod
+    def _remaining_seconds(cache: types.CachedContent) -> float:
+        if cache.expire_time is None:
+            return 0
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return (cache.expire_time - now).total_seconds()
@@ -0,0 +1,242 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+from collections import OrderedDict
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_ON,
+    ParentBased,
+    Sampler,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import StatusCode
+
+# Fraction of traces kept. In tail mode it applies to traces that are neither
+# errored nor slow.
+TRACE_SAMPLE_RATIO = float(os.environ.get("TRACE_SAMPLE_RATIO", "1.0"))
+# Decide after a trace ends, always keeping errored and slow traces.
+TRACE_TAIL_SAMPLING = os.environ.get("TRACE_TAIL_SAMPLING", "false").lower() == "true"
+TRACE_SLOW_SPAN_MS = float(os.environ.get("TRACE_SLOW_SPAN_MS", "1000"))
+# Span name prefixes checked against TRACE_SLOW_SPAN_MS; empty means every span.
+TRACE_SLOW_SPAN_PREFIXES = [
+    prefix.strip()
+    for prefix in os.environ.get("TRACE_SLOW_SPAN_PREFIXES", "execute_tool").split(",")
+    if prefix.strip()
+]
+# Traces buffered at once in tail mode; the oldest is decided early when exceeded.
+TRACE_TAIL_MAX_TRACES = int(os.environ.get("TRACE_TAIL_MAX_TRACES", "1000"))
+# Comma-separated attribute names kept on exported spans; a trailing "*" matches a
+# prefix. Unset keeps every attribute.
+TRACE_ATTRIBUTE_ALLOWLIST = os.environ.get("TRACE_ATTRIBUTE_ALLOWLIST")
+
+
+def build_sampler(
+    ratio: float = TRACE_SAMPLE_RATIO, tail_sampling: bool = TRACE_TAIL_SAMPLING
+) -> Sampler:
+    """
+    Build the head sampler of the tracer provider.
+
+    :param ratio: Fraction of new traces to sample
+    :param tail_sampling: Record every trace and let TailSamplingSpanProcessor decide
+    :return: A sampler that follows the parent's decision and samples root spans by ratio
+    """
+    if tail_sampling:
+        return ALWAYS_ON
+    return ParentBased(TraceIdRatioBased(ratio))
+
+
+def build_span_processor(
+    exporting_processor: SpanProcessor,
+    ratio: float = TRACE_SAMPLE_RATIO,
+    tail_sampling: bool = TRACE_TAIL_SAMPLING,
+    allowlist: str | None = TRACE_ATTRIBUTE_ALLOWLIST,
+) -> SpanProcessor:
+    """
+    Wrap the exporting processor with attribute filtering and tail sampling as configured.
+
+    :param exporting_processor: The processor that exports spans
+    :param ratio: Fraction of unremarkable traces kept in tail mode
+    :param tail_sampling: Whether to apply tail sampling
+    :param allowlist: Comma-separated attribute allow-list, or None to keep all
+    :return: The processor to register on the tracer provider
+    """
+    processor = exporting_processor
+    if allowlist is not None:
+        processor = AttributeFilterSpanProcessor(
+            processor, [name.strip() for name in allowlist.split(",") if name.strip()]
+        )
+    if tail_sampling:
+        processor = TailSamplingSpanProcessor(processor, ratio=ratio)
+    return processor
+
+
+class AttributeFilterSpanProcessor(SpanProcessor):
+    """Forward spans with only allow-listed attributes, e.g. to strip prompt bodies."""
+
+    def __init__(self, next_processor: SpanProcessor, allowlist: list[str]) -> None:
+        """
+        Initialize the processor.
+
+        :param next_processor: Processor receiving the filtered spans
+        :param allowlist: Attribute names to keep; a trailing "*" matches a prefix
+        """
+        self.next_processor = next_processor
+        self._names = {name for name in allowlist if not name.endswith("*")}
+        self._prefixes = tuple(name[:-1] for name in allowlist if name.endswith("*"))
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self.next_processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        attributes = {
+            key: value
+            for key, value in (span.attributes or {}).items()
+            if key in self._names or key.startswith(self._prefixes)
+        }
+        self.next_processor.on_end(
+            ReadableSpan(
+                name=span.name,
+                context=span.context,
+                parent=span.parent,
+                resource=span.resource,
+                attributes=attributes,
+                events=span.events,
+                links=span.links,
+                kind=span.kind,
+                status=span.status,
+                start_time=span.start_time,
+                end_time=span.end_time,
+                instrumentation_scope=span.instrumentation_scope,
+            )
+        )
+
+    def shutdown(self) -> None:
+        self.next_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.next_processor.force_flush(timeout_millis)
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Buffer the spans of each trace and decide whether to export it when it ends.
+
+    A trace is kept if any span has an error status or any span whose name
+    starts with one of ``slow_span_prefixes`` took longer than
+    ``slow_span_ms``; other traces are kept with probability ``ratio``. A trace
+    ends when its local root span ends. At most ``max_traces`` traces are
+    buffered; beyond that the oldest is decided with the spans seen so far.
+    """
+
+    def __init__(
+        self,
+        next_processor: SpanProcessor,
+        ratio: float = TRACE_SAMPLE_RATIO,
+        slow_span_ms: float = TRACE_SLOW_SPAN_MS,
+        slow_span_prefixes: list[str] | None = None,
+        max_traces: int = TRACE_TAIL_MAX_TRACES,
+    ) -> None:
+        """
+        Initialize the processor.
+
+        :param next_processor: Processor receiving the spans of kept traces
+        :param ratio: Fraction of traces kept when neither errored nor slow
+        :param slow_span_ms: Duration above which a matching span makes a trace slow
+        :param slow_span_prefixes: Span name prefixes checked for slowness; all if empty
+        :param max_traces: Maximum number of traces buffered at once
+        """
+        self.next_processor = next_processor
+        self.slow_span_ns = int(slow_span_ms * 1e6)
+        self.slow_span_prefixes = tuple(
+            TRACE_SLOW_SPAN_PREFIXES
+            if slow_span_prefixes is None
+            else slow_span_prefixes
+        )
+        self.max_traces = max_traces
+        self._bound = TraceIdRatioBased.get_bound_for_rate(ratio)
+        self._traces: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "kept_traces": 0,
+            "kept_for_error": 0,
+            "kept_for_latency": 0,
+            "dropped_traces": 0,
+        }
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        decided: list[list[ReadableSpan]] = []
+        with self._lock:
+            self._traces.setdefault(trace_id, []).append(span)
+            if span.parent is None or span.parent.is_remote:
+                decided.append(self._traces.pop(trace_id))
+            while len(self._traces) > self.max_traces:
+                decided.append(self._traces.popitem(last=False)[1])
+        for spans in decided:
+            if self._keep(spans):
+                for buffered in spans:
+                    self.next_processor.on_end(buffered)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report how many traces were kept and why, and how many were dropped.
+
+        :return: A dictionary of counters
+        """
+        with self._lock:
+            return {**self._stats, "buffered_traces": len(self._traces)}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pending = list(self._traces.values())
+            self._traces.clear()
+        for spans in pending:
+            if self._keep(spans):
+                for buffered in spans:
+                    self.next_processor.on_end(buffered)
+        self.next_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.next_processor.force_flush(timeout_millis)
+
+    def _keep(self, spans: list[ReadableSpan]) -> bool:
+        reason = None
+        if any(span.status.status_code == StatusCode.ERROR for span in spans):
+            reason = "kept_for_error"
+        elif any(
+            (
+                not self.slow_span_prefixes
+                or span.name.startswith(self.slow_span_prefixes)
+            )
+            and (span.end_time or 0) - (span.start_time or 0) > self.slow_span_ns
+            for span in spans
+        ):
+            reason = "kept_for_latency"
+        elif spans[0].context.trace_id & TraceIdRatioBased.TRACE_ID_LIMIT < self._bound:
+            reason = "kept_traces"
+        with self._lock:
+            if reason is None:
+                self._stats["dropped_traces"] += 1
+                return False
+            self._stats["kept_traces"] += 1
+            if reason != "kept_traces":
+                self._stats[reason] += 1
+        return True
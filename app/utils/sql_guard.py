@@ -0,0 +1,217 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from google.api_core.exceptions import BadRequest
+from google.cloud import bigquery
+
+from app.utils.cache import TTLCache
+from app.utils.metrics import is_tool_error
+
+# Queries whose dry run estimates more bytes than this are rejected.
+SQL_GUARD_MAX_BYTES = int(os.environ.get("SQL_GUARD_MAX_BYTES", str(1024**3)))
+# LIMIT appended to SELECT statements that have none.
+SQL_GUARD_MAX_ROWS = int(os.environ.get("SQL_GUARD_MAX_ROWS", "200"))
+
+# String literals and quoted identifiers are kept verbatim; comments and runs of
+# whitespace outside of them are collapsed into a single space.
+_SQL_TOKENS = re.compile(
+    r"(?P<literal>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)"
+    r"|(?P<space>(?:\s|--[^\n]*|#[^\n]*|/\*.*?\*/)+)",
+    re.DOTALL,
+)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+\d+(\s+OFFSET\s+\d+)?$", re.IGNORECASE)
+# Statement types whose results are cached and capped.
+_READ_STATEMENTS = frozenset({"SELECT"})
+
+ToolCallable = Callable[..., Awaitable[str]]
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize a statement so that equivalent spellings share a cache entry.
+
+    :param sql: The statement as written by the model
+    :return: The statement without comments, extra whitespace or trailing semicolons
+    """
+
+    def replace(match: re.Match[str]) -> str:
+        return match.group("literal") or " "
+
+    return _SQL_TOKENS.sub(replace, sql).strip().rstrip(";").strip()
+
+
+class SqlGuard:
+    """
+    Gate model-written SQL on its estimated cost and cache its results.
+
+    Every statement is dry-run before it reaches the wrapped tool. Statements
+    estimated above ``max_bytes`` are rejected with a message asking the model
+    to filter by ``timestamp`` and select fewer columns, since neither a LIMIT
+    nor any other rewrite reduces the bytes BigQuery scans. SELECT statements
+    without a trailing LIMIT get one, which bounds the rows returned to the
+    model, and their results are cached by normalized SQL in ``cache``; any
+    other statement (DML) invalidates it and calls ``on_write``, so state
+    derived from the table outside the cache can be refreshed too. Syntax errors found by the dry run
+    are returned to the model without running anything. If the dry run itself
+    cannot be made, the statement runs unguarded.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        client_factory: Callable[[], bigquery.Client],
+        max_bytes: int = SQL_GUARD_MAX_BYTES,
+        max_rows: int = SQL_GUARD_MAX_ROWS,
+        on_write: Callable[[], None] | None = None,
+    ) -> None:
+        """
+        Initialize the guard.
+
+        :param cache: Cache holding results; it should be invalidated on every write
+        :param client_factory: Returns the BigQuery client used for dry runs
+        :param max_bytes: Estimated bytes above which a statement is rejected
+        :param max_rows: LIMIT appended to SELECT statements without one
+        :param on_write: Called after every statement that is not a read
+        """
+        self.cache = cache
+        self.client_factory = client_factory
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.on_write = on_write
+        self._lock = threading.Lock()
+        self._stats = {
+            "queries": 0,
+            "cache_hits": 0,
+            "rejected": 0,
+            "invalid": 0,
+            "limited": 0,
+            "unguarded": 0,
+            "failed": 0,
+            "estimated_bytes": 0,
+        }
+
+    def wrap(self, tool: ToolCallable, sql_param: str = "sql") -> ToolCallable:
+        """
+        Guard a tool that executes the SQL passed in ``sql_param``.
+
+        :param tool: The async tool, e.g. the toolbox ``execute_sql_tool``
+        :param sql_param: Name of the argument holding the statement
+        :return: An async function with the same name, docstring and signature
+        """
+
+        @functools.wraps(tool)
+        async def guarded(*args: Any, **kwargs: Any) -> str:
+            sql = kwargs.get(sql_param)
+            if args or not isinstance(sql, str):
+                return await tool(*args, **kwargs)
+            return await self.execute(
+                sql, lambda statement: tool(**{**kwargs, sql_param: statement})
+            )
+
+        return guarded
+
+    async def execute(self, sql: str, run: Callable[[str], Awaitable[str]]) -> str:
+        """
+        Dry-run a statement and run it through ``run`` if it is within budget.
+
+        :param sql: The statement as written by the model
+        :param run: Executes the (possibly rewritten) statement
+        :return: The tool result, a cached result or an error message for the model
+        """
+        start = time.perf_counter()
+        normalized = normalize_sql(sql)
+        cache_key = ("sql", normalized)
+        self._count("queries")
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._count("cache_hits")
+            self._log("cache hit", None, start, normalized)
+            return cached
+        cache_version = self.cache.version()
+        try:
+            job = await asyncio.to_thread(self._dry_run, normalized)
+        except BadRequest as e:
+            self._count("invalid")
+            self._log("invalid", None, start, normalized)
+            return f"Error en la consulta SQL: {e.message}"
+        except Exception as e:
+            logging.warning(f"SQL dry run failed ({e}); running the query unguarded")
+            self._count("unguarded")
+            return await run(normalized)
+        estimated = job.total_bytes_processed or 0
+        self._count("estimated_bytes", estimated)
+        if estimated > self.max_bytes:
+            self._count("rejected")
+            self._log("rejected", estimated, start, normalized)
+            return (
+                "Error en la consulta SQL: la consulta procesaría "
+                f"{estimated / 1024**2:.0f} MB, por encima del límite de "
+                f"{self.max_bytes / 1024**2:.0f} MB. Filtra por la columna `timestamp` "
+                "o por fechas y selecciona solo las columnas necesarias en lugar de `*`."
+            )
+        if job.statement_type not in _READ_STATEMENTS:
+            result = await run(normalized)
+            self.cache.invalidate()
+            if self.on_write is not None:
+                self.on_write()
+            self._log(job.statement_type or "statement", estimated, start, normalized)
+            return result
+        statement = normalized
+        if not _TRAILING_LIMIT.search(statement):
+            statement = f"{statement}\nLIMIT {self.max_rows}"
+            self._count("limited")
+        result = await run(statement)
+        if is_tool_error(result):
+            # A timeout or a transient failure must not be replayed from the cache.
+            self._count("failed")
+            self._log("failed", estimated, start, normalized)
+            return result
+        self.cache.set(cache_key, result, version=cache_version)
+        self._log("executed", estimated, start, normalized)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report how many statements were served, rejected or rewritten.
+
+        :return: A dictionary of counters; ``estimated_bytes`` is the sum of dry runs
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _dry_run(self, sql: str) -> bigquery.QueryJob:
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        return self.client_factory().query(sql, job_config=job_config)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def _log(outcome: str, estimated: int | None, start: float, sql: str) -> None:
+        cost = "" if estimated is None else f", {estimated} bytes estimated"
+        logging.info(
+            f"SQL guard {outcome}{cost} in {(time.perf_counter() - start) * 1000:.1f} ms: "
+            f"{sql[:300]}"
+        )
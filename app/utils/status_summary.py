@@ -0,0 +1,350 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+TRAVEL_SUMMARY_ENABLED = (
+    os.environ.get("TRAVEL_SUMMARY_ENABLED", "true").lower() == "true"
+)
+# Interval between full reconciliations against the table.
+TRAVEL_SUMMARY_RECONCILE_SECONDS = float(
+    os.environ.get("TRAVEL_SUMMARY_RECONCILE_SECONDS", "3600")
+)
+# Minimum interval between reconciliations triggered by changes made elsewhere.
+TRAVEL_SUMMARY_MIN_RECONCILE_SECONDS = float(
+    os.environ.get("TRAVEL_SUMMARY_MIN_RECONCILE_SECONDS", "30")
+)
+# Requests written by this process whose key is kept to move them on a status change.
+TRAVEL_SUMMARY_MAX_TRACKED = int(os.environ.get("TRAVEL_SUMMARY_MAX_TRACKED", "10000"))
+
+DIMENSIONS = ("status", "destination_city", "month")
+
+
+class SummaryKey(NamedTuple):
+    """The dimensions a request is counted under; ``month`` is its start month, YYYY-MM."""
+
+    status: str
+    destination_city: str
+    month: str
+
+
+def summary_key(row: dict[str, Any]) -> SummaryKey:
+    """
+    Build the summary key of a travel request row.
+
+    :param row: A row with at least ``status``, ``destination_city`` and ``start_date``
+    :return: The key, with interned strings since few distinct values repeat
+    """
+    return SummaryKey(
+        sys.intern(str(row.get("status") or "")),
+        sys.intern(str(row.get("destination_city") or "")),
+        sys.intern(str(row.get("start_date") or "")[:7]),
+    )
+
+
+def group_key(group: dict[str, Any]) -> SummaryKey:
+    """
+    Build the summary key of a group counted by an aggregate query.
+
+    :param group: A row with one value per name in ``DIMENSIONS``
+    :return: The key, with interned strings
+    """
+    return SummaryKey(
+        *(sys.intern(str(group.get(dimension) or "")) for dimension in DIMENSIONS)
+    )
+
+
+class StatusSummary:
+    """
+    Counts of travel requests by status, destination city and start month.
+
+    Only the count of each group is held, plus the keys of at most
+    ``max_tracked`` requests recently written by this process, so memory grows
+    with the number of groups rather than with the table. Writes of this
+    process are applied as they happen through :meth:`record` and
+    :meth:`record_status_change`. A status change of a request that is not
+    tracked, a call to :meth:`mark_stale` or a new value of the shared
+    ``generation`` (published by every instance when it writes) makes the
+    reconciliation thread rebuild the counts with one aggregate query, at most
+    once every ``min_interval`` seconds. Counts are therefore at most about
+    ``min_interval`` seconds plus the generation's propagation delay behind
+    changes made elsewhere; changes that publish no generation are picked up by
+    the rebuild every ``reconcile_interval`` seconds. Writes recorded while a
+    rebuild runs are replayed on top of it; one that commits just before the
+    query starts may be counted twice until the next rebuild. Queries are
+    answered from memory and return None until the first rebuild has completed.
+    """
+
+    def __init__(
+        self,
+        load_counts: Callable[[], Iterable[tuple[SummaryKey, int]]],
+        reconcile_interval: float = TRAVEL_SUMMARY_RECONCILE_SECONDS,
+        min_interval: float = TRAVEL_SUMMARY_MIN_RECONCILE_SECONDS,
+        max_tracked: int = TRAVEL_SUMMARY_MAX_TRACKED,
+        generation: Callable[[], Any] | None = None,
+    ) -> None:
+        """
+        Initialize the summary. No thread is started until :meth:`start`.
+
+        :param load_counts: Counts every request in the table by summary key
+        :param reconcile_interval: Seconds between reconciliations when nothing changed elsewhere
+        :param min_interval: Minimum seconds between reconciliations
+        :param max_tracked: Maximum requests whose key is remembered
+        :param generation: Returns a value that changes when another instance writes
+        """
+        self.load_counts = load_counts
+        self.reconcile_interval = reconcile_interval
+        self.min_interval = min_interval
+        self.max_tracked = max_tracked
+        self.generation = generation
+        self._tracked: OrderedDict[str, SummaryKey] = OrderedDict()
+        self._counts: Counter[SummaryKey] = Counter()
+        # Count changes recorded during a reconciliation.
+        self._delta: Counter[SummaryKey] | None = None
+        self._stale = False
+        self._seen_generation: Any = None
+        self._reconciled_at: float | None = None
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {
+            "queries": 0,
+            "recorded_writes": 0,
+            "unknown_updates": 0,
+            "reconciliations": 0,
+            "failed_reconciliations": 0,
+            "corrected_groups": 0,
+        }
+
+    def start(self) -> None:
+        """Start the reconciliation thread; the first run builds the summary."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="travel-summary-reconcile", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the reconciliation thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def record(self, row: dict[str, Any]) -> None:
+        """
+        Count a request that was just written.
+
+        :param row: The full row, as inserted
+        """
+        key = summary_key(row)
+        with self._lock:
+            previous = self._tracked.get(row["request_id"])
+            if previous is not None:
+                self._add(previous, -1)
+            self._track(row["request_id"], key)
+            self._add(key, 1)
+            self._stats["recorded_writes"] += 1
+
+    def record_status_change(
+        self, previous: dict[str, str | None], new_status: str
+    ) -> None:
+        """
+        Move requests whose status just changed to the counts of ``new_status``.
+
+        :param previous: Previous status by request ID, as returned by the store
+        :param new_status: The status they now have
+        """
+        new_status = sys.intern(new_status)
+        with self._lock:
+            for request_id, status in previous.items():
+                if status == new_status:
+                    continue
+                key = self._tracked.get(request_id)
+                if key is None:
+                    # Its destination and month are unknown: rebuild the counts soon.
+                    self._stale = True
+                    self._stats["unknown_updates"] += 1
+                else:
+                    self._add(key, -1)
+                    self._track(request_id, key._replace(status=new_status))
+                    self._add(key._replace(status=new_status), 1)
+                self._stats["recorded_writes"] += 1
+
+    def mark_stale(self) -> None:
+        """Rebuild the counts at the next check, e.g. after a change made elsewhere."""
+        with self._lock:
+            self._stale = True
+
+    def query(
+        self,
+        group_by: Iterable[str],
+        statuses: Iterable[str] | None = None,
+        destination_city: str | None = None,
+        month_from: str | None = None,
+        month_to: str | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Count requests matching the filters, grouped by the given dimensions.
+
+        :param group_by: Any of ``DIMENSIONS``; none returns a single total, even if zero
+        :param statuses: Exact statuses to keep
+        :param destination_city: Destination to keep, compared case-insensitively
+        :param month_from: First start month to keep, YYYY-MM
+        :param month_to: Last start month to keep, YYYY-MM
+        :return: One ``{dimension: value, ..., "count": n}`` per group, largest
+            first, or None if the summary is not built yet
+        """
+        group_by = list(group_by)
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}")
+        status_set = set(statuses) if statuses is not None else None
+        city = destination_city.casefold() if destination_city else None
+        with self._lock:
+            if self._reconciled_at is None:
+                return None
+            self._stats["queries"] += 1
+            entries = list(self._counts.items())
+        groups: Counter[tuple[str, ...]] = Counter()
+        for key, count in entries:
+            if status_set is not None and key.status not in status_set:
+                continue
+            if city is not None and key.destination_city.casefold() != city:
+                continue
+            if month_from and key.month < month_from:
+                continue
+            if month_to and key.month > month_to:
+                continue
+            groups[tuple(getattr(key, dimension) for dimension in group_by)] += count
+        if not group_by:
+            return [{"count": groups[()]}]
+        return [
+            {**dict(zip(group_by, values, strict=True)), "count": count}
+            for values, count in sorted(
+                groups.items(), key=lambda item: (-item[1], item[0])
+            )
+        ]
+
+    def reconcile(self) -> int:
+        """
+        Rebuild the counts from the table, keeping writes recorded meanwhile.
+
+        :return: The number of groups whose count was corrected
+        """
+        with self._reconcile_lock:
+            with self._lock:
+                self._delta = Counter()
+                self._stale = False
+            generation = self.generation() if self.generation is not None else None
+            try:
+                counts: Counter[SummaryKey] = Counter()
+                for key, count in self.load_counts():
+                    counts[key] += count
+            except BaseException:
+                with self._lock:
+                    self._delta = None
+                    self._stale = True
+                raise
+            with self._lock:
+                counts.update(self._delta)
+                counts = Counter(
+                    {key: count for key, count in counts.items() if count > 0}
+                )
+                self._delta = None
+                corrected = 0
+                if self._reconciled_at is not None:
+                    corrected = sum(
+                        1
+                        for key in counts.keys() | self._counts.keys()
+                        if counts[key] != self._counts[key]
+                    )
+                self._counts = counts
+                self._seen_generation = generation
+                self._reconciled_at = time.monotonic()
+                self._stats["reconciliations"] += 1
+                self._stats["corrected_groups"] += corrected
+        if corrected:
+            logging.info(f"Travel summary reconciliation corrected {corrected} groups")
+        return corrected
+
+    def stats(self) -> dict[str, float]:
+        """
+        Report query and write counters, the summary size and its age.
+
+        :return: A dictionary of counters; age_seconds is -1 before the first reconciliation
+        """
+        with self._lock:
+            age = (
+                -1.0
+                if self._reconciled_at is None
+                else time.monotonic() - self._reconciled_at
+            )
+            return {
+                **self._stats,
+                "tracked_requests": len(self._tracked),
+                "groups": len(self._counts),
+                "age_seconds": round(age, 3),
+            }
+
+    def _add(self, key: SummaryKey, amount: int) -> None:
+        self._counts[key] += amount
+        if self._counts[key] <= 0:
+            del self._counts[key]
+        if self._delta is not None:
+            self._delta[key] += amount
+
+    def _track(self, request_id: str, key: SummaryKey) -> None:
+        self._tracked[request_id] = key
+        self._tracked.move_to_end(request_id)
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+
+    def _due(self) -> bool:
+        """Whether a reconciliation should run now."""
+        with self._lock:
+            if self._reconciled_at is None:
+                return True
+            age = time.monotonic() - self._reconciled_at
+            if age >= self.reconcile_interval:
+                return True
+            if age < self.min_interval:
+                return False
+            stale = self._stale
+        return stale or (
+            self.generation is not None and self.generation() != self._seen_generation
+        )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._due():
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logging.warning(f"Travel summary reconciliation failed: {e}")
+                    with self._lock:
+                        self._stats["failed_reconciliations"] += 1
+            self._stop.wait(self.min_interval)
@@ -0,0 +1,246 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import weakref
+from collections.abc import Awaitable, Callable
+from types import MappingProxyType
+from typing import Any
+
+from aiohttp import ClientSession, ClientTimeout
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.function_tool import FunctionTool
+from toolbox_core.protocol import ManifestSchema
+from toolbox_core.tool import ToolboxTool
+
+# Bump when the on-disk layout changes so old cache files are ignored.
+MANIFEST_CACHE_VERSION = 1
+
+TOOLBOX_CACHE_DIR = os.environ.get(
+    "TOOLBOX_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "adk-travel-agent-cr", "toolbox"),
+)
+TOOLBOX_CACHE_TTL_SECONDS = float(os.environ.get("TOOLBOX_CACHE_TTL_SECONDS", "3600"))
+TOOLBOX_FETCH_TIMEOUT_SECONDS = float(
+    os.environ.get("TOOLBOX_FETCH_TIMEOUT_SECONDS", "10")
+)
+# Minimum delay between fetch attempts while the toolbox is unreachable.
+TOOLBOX_RETRY_SECONDS = float(os.environ.get("TOOLBOX_RETRY_SECONDS", "30"))
+
+# Wraps a toolbox tool, keeping its name, docstring and signature.
+ToolWrapper = Callable[[Callable[..., Awaitable[str]]], Callable[..., Awaitable[str]]]
+
+
+class CachedToolboxToolset(BaseToolset):
+    """
+    A toolset that loads MCP Toolbox tools lazily and caches their manifest on disk.
+
+    Nothing is fetched at construction time. On the first ``get_tools`` call the
+    manifest is read from the versioned on-disk cache if present, so a process
+    can serve requests immediately, and a stale manifest is refreshed in the
+    background. When the toolbox server is unreachable the cached manifest is
+    kept (fallback mode); without any cache the toolset is empty until a fetch
+    succeeds. Tools named in ``tool_wrappers`` are exposed through their wrapper.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        toolset_name: str,
+        cache_dir: str = TOOLBOX_CACHE_DIR,
+        ttl_seconds: float = TOOLBOX_CACHE_TTL_SECONDS,
+        fetch_timeout: float = TOOLBOX_FETCH_TIMEOUT_SECONDS,
+        tool_wrappers: dict[str, ToolWrapper] | None = None,
+    ) -> None:
+        """
+        Initialize the toolset without contacting the toolbox server.
+
+        :param url: Base URL of the MCP Toolbox server
+        :param toolset_name: Name of the toolset to load
+        :param cache_dir: Directory holding the cached manifests
+        :param ttl_seconds: Age after which a manifest is refreshed in the background
+        :param fetch_timeout: Timeout in seconds for a manifest fetch
+        :param tool_wrappers: Wrappers applied to the tools with these names
+        """
+        super().__init__()
+        self.url = url.rstrip("/")
+        self.toolset_name = toolset_name
+        self.ttl_seconds = ttl_seconds
+        self.fetch_timeout = fetch_timeout
+        self.tool_wrappers = tool_wrappers or {}
+        url_hash = hashlib.sha256(self.url.encode()).hexdigest()[:12]
+        self.cache_path = os.path.join(
+            cache_dir, f"v{MANIFEST_CACHE_VERSION}", f"{url_hash}-{toolset_name}.json"
+        )
+        self._manifest: ManifestSchema | None = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._disk_checked = False
+        self._refresh_task: asyncio.Task | None = None
+        # aiohttp sessions are bound to an event loop, so tools are built per loop.
+        self._sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, ClientSession
+        ] = weakref.WeakKeyDictionary()
+        self._loop_tools: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, tuple[ManifestSchema, list[BaseTool]]
+        ] = weakref.WeakKeyDictionary()
+
+    async def get_tools(
+        self, readonly_context: ReadonlyContext | None = None
+    ) -> list[BaseTool]:
+        """
+        Return the toolbox tools, loading the manifest on first use.
+
+        :param readonly_context: Unused, tools are not filtered by context
+        :return: The list of toolbox tools, empty if no manifest is available yet
+        """
+        if not self._disk_checked:
+            self._disk_checked = True
+            self._load_from_disk()
+        if self._manifest is None:
+            if time.time() - self._last_attempt >= TOOLBOX_RETRY_SECONDS:
+                await self.refresh()
+        elif time.time() - self._fetched_at >= self.ttl_seconds:
+            self._schedule_refresh()
+        if self._manifest is None:
+            return []
+        return self._tools_for_running_loop(self._manifest)
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the manifest from the toolbox server and update the disk cache.
+
+        :return: True if a fresh manifest was fetched, False if the cached one was kept
+        """
+        self._last_attempt = time.time()
+        url = f"{self.url}/api/toolset/{self.toolset_name}"
+        try:
+            session = self._session_for_running_loop()
+            async with session.get(
+                url, timeout=ClientTimeout(total=self.fetch_timeout)
+            ) as response:
+                response.raise_for_status()
+                payload = await response.json()
+            manifest = ManifestSchema(**payload)
+        except Exception as e:
+            if self._manifest is not None:
+                logging.warning(
+                    f"Toolbox unreachable ({e}); keeping cached manifest for "
+                    f"'{self.toolset_name}'"
+                )
+            else:
+                logging.warning(
+                    f"Toolbox unreachable ({e}) and no cached manifest for "
+                    f"'{self.toolset_name}'; toolbox tools are unavailable"
+                )
+            return False
+        self._manifest = manifest
+        self._fetched_at = time.time()
+        self._write_to_disk(payload)
+        logging.info(
+            f"Loaded {len(manifest.tools)} tools from toolset '{self.toolset_name}'"
+        )
+        return True
+
+    async def close(self) -> None:
+        """Close the HTTP session owned by the current event loop."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        loop = asyncio.get_running_loop()
+        self._loop_tools.pop(loop, None)
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.time() - self._last_attempt < TOOLBOX_RETRY_SECONDS:
+            return
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    def _load_from_disk(self) -> None:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("version") != MANIFEST_CACHE_VERSION:
+                return
+            self._manifest = ManifestSchema(**entry["manifest"])
+            self._fetched_at = float(entry["fetched_at"])
+            logging.info(f"Loaded cached toolbox manifest from {self.cache_path}")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable toolbox cache {self.cache_path}: {e}")
+
+    def _write_to_disk(self, payload: dict[str, Any]) -> None:
+        entry = {
+            "version": MANIFEST_CACHE_VERSION,
+            "url": self.url,
+            "toolset": self.toolset_name,
+            "fetched_at": self._fetched_at,
+            "manifest": payload,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Unable to write toolbox cache {self.cache_path}: {e}")
+
+    def _session_for_running_loop(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = ClientSession()
+            self._sessions[loop] = session
+        return session
+
+    def _tools_for_running_loop(self, manifest: ManifestSchema) -> list[BaseTool]:
+        loop = asyncio.get_running_loop()
+        cached = self._loop_tools.get(loop)
+        if cached is not None and cached[0] is manifest:
+            return cached[1]
+        session = self._session_for_running_loop()
+        tools: list[BaseTool] = []
+        for name, schema in manifest.tools.items():
+            tool = ToolboxTool(
+                session=session,
+                base_url=self.url,
+                name=name,
+                description=schema.description,
+                params=tuple(p for p in schema.parameters if not p.authSources),
+                required_authn_params=MappingProxyType(
+                    {p.name: p.authSources for p in schema.parameters if p.authSources}
+                ),
+                required_authz_tokens=tuple(schema.authRequired),
+                auth_service_token_getters=MappingProxyType({}),
+                bound_params=MappingProxyType({}),
+                client_headers=MappingProxyType({}),
+            )
+            wrapper = self.tool_wrappers.get(name)
+            tools.append(FunctionTool(wrapper(tool) if wrapper else tool))
+        self._loop_tools[loop] = (manifest, tools)
+        return tools
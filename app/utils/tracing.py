@@ -14,14 +14,40 @@
 
 import json
 import logging
-from collections.abc import Sequence
+import os
+import threading
+import time
+from collections.abc import Mapping, Sequence
 from typing import Any
 
 import google.cloud.storage as storage
 from google.cloud import logging as google_cloud_logging
 from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
 from opentelemetry.sdk.trace import ReadableSpan
-from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.util import ns_to_iso_str
+from opentelemetry.trace import SpanContext, format_span_id, format_trace_id
+
+from app.utils.payload_store import (
+    GcsPayloadStore,
+    LocalPayloadStore,
+    PayloadOffloader,
+    PayloadStore,
+)
+
+# Attribute payloads above this size are moved to Cloud Storage (log entries are
+# limited to 256 KB).
+MAX_LOGGED_ATTRIBUTES_BYTES = 255 * 1024
+# Attributes longer than this are left out of the log entry of an offloaded span.
+MAX_RETAINED_ATTRIBUTE_CHARS = 1024
+# Cloud Logging accepts up to 10 MB per write request; larger batches are split.
+MAX_LOG_WRITE_BYTES = 9 * 1024 * 1024
+# Store large span payloads in this local directory instead of Cloud Storage.
+TRACE_PAYLOAD_DIR = os.environ.get("TRACE_PAYLOAD_DIR")
 
 
 class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
@@ -39,6 +65,7 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         storage_client: storage.Client | None = None,
         bucket_name: str | None = None,
         debug: bool = False,
+        payload_store: PayloadStore | None = None,
         **kwargs: Any,
     ) -> None:
         """
@@ -48,6 +75,8 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         :param storage_client: Google Cloud Storage client
         :param bucket_name: Name of the GCS bucket to store large payloads
         :param debug: Enable debug mode for additional logging
+        :param payload_store: Where large payloads are stored; the GCS bucket by
+            default, or TRACE_PAYLOAD_DIR if set
         :param kwargs: Additional arguments to pass to the parent class
         """
         super().__init__(**kwargs)
@@ -56,37 +85,53 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
             project=self.project_id
         )
         self.logger = self.logging_client.logger(__name__)
-        self.storage_client = storage_client or storage.Client(project=self.project_id)
         self.bucket_name = (
             bucket_name or f"{self.project_id}-adk-travel-agent-cr-logs-data"
         )
-        self.bucket = self.storage_client.bucket(self.bucket_name)
+        if payload_store is None and TRACE_PAYLOAD_DIR:
+            payload_store = LocalPayloadStore(TRACE_PAYLOAD_DIR)
+        if payload_store is None:
+            self.storage_client = storage_client or storage.Client(
+                project=self.project_id
+            )
+            payload_store = GcsPayloadStore(self.storage_client, self.bucket_name)
+        self.payload_offloader = PayloadOffloader(payload_store)
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, float] = {
+            "export_batches": 0,
+            "exported_spans": 0,
+            "dropped_spans": 0,
+            "trace_export_failures": 0,
+            "last_export_ms": 0.0,
+            "max_export_ms": 0.0,
+            "total_export_ms": 0.0,
+        }
 
     def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
         """
         Export the spans to Google Cloud Logging and Cloud Trace.
 
+        Each span is converted to a dictionary once, and the entries of the whole
+        batch are written with a single Cloud Logging request (split only if it
+        would exceed the request size limit).
+
         :param spans: A sequence of spans to export
         :return: The result of the export operation
         """
+        start = time.perf_counter()
+        batch = self.logger.batch()
+        batch_bytes = 0
+        batch_spans = 0
+        dropped = 0
         for span in spans:
-            span_context = span.get_span_context()
-            trace_id = format(span_context.trace_id, "x")
-            span_id = format(span_context.span_id, "x")
-            span_dict = json.loads(span.to_json())
-
-            span_dict["trace"] = f"projects/{self.project_id}/traces/{trace_id}"
-            span_dict["span_id"] = span_id
-
-            span_dict = self._process_large_attributes(
-                span_dict=span_dict, span_id=span_id
-            )
-
+            span_dict, size = self._span_entry(span)
             if self.debug:
                 print(span_dict)
-
-            # Log the span data to Google Cloud Logging
-            self.logger.log_struct(
+            if batch_spans and batch_bytes + size > MAX_LOG_WRITE_BYTES:
+                dropped += self._commit(batch, batch_spans)
+                batch = self.logger.batch()
+                batch_bytes = batch_spans = 0
+            batch.log_struct(
                 span_dict,
                 labels={
                     "type": "agent_telemetry",
@@ -94,58 +139,223 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
                 },
                 severity="INFO",
             )
+            batch_bytes += size
+            batch_spans += 1
+        if batch_spans:
+            dropped += self._commit(batch, batch_spans)
+
         # Export spans to Google Cloud Trace using the parent class method
-        return super().export(spans)
+        result = super().export(spans)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self._stats["export_batches"] += 1
+            self._stats["exported_spans"] += len(spans)
+            self._stats["dropped_spans"] += dropped
+            self._stats["trace_export_failures"] += int(
+                result != SpanExportResult.SUCCESS
+            )
+            self._stats["last_export_ms"] = elapsed_ms
+            self._stats["max_export_ms"] = max(self._stats["max_export_ms"], elapsed_ms)
+            self._stats["total_export_ms"] += elapsed_ms
+        if self.debug:
+            logging.info(
+                f"Exported {len(spans)} spans in {elapsed_ms:.1f} ms ({dropped} not logged)"
+            )
+        return result
+
+    def stats(self) -> dict[str, float]:
+        """
+        Report export durations and spans that could not be logged.
+
+        :return: A dictionary of counters and durations in milliseconds
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["export_batches"]
+        stats["avg_export_ms"] = stats["total_export_ms"] / batches if batches else 0.0
+        return stats
 
     def store_in_gcs(self, content: str, span_id: str) -> str:
         """
-        Initiate storing large content in Google Cloud Storage/
+        Initiate storing large content in Google Cloud Storage.
+
+        The upload happens in the background; the object is gzip-compressed and
+        named after a hash of its content, so identical payloads are stored once.
 
         :param content: The content to store
         :param span_id: The ID of the span
-        :return: The  GCS URI of the stored content
+        :return: The GCS URI the content will be stored at
         """
-        if not self.storage_client.bucket(self.bucket_name).exists():
-            logging.warning(
-                f"Bucket {self.bucket_name} not found. "
-                "Unable to store span attributes in GCS."
-            )
-            return "GCS bucket not found"
+        location = self.payload_offloader.submit(content)
+        if location is None:
+            return "Payload not stored"
+        return location[0]
 
-        blob_name = f"spans/{span_id}.json"
-        blob = self.bucket.blob(blob_name)
+    def shutdown(self) -> None:
+        """Upload pending payloads before shutting down."""
+        self.payload_offloader.close()
+        super().shutdown()
 
-        blob.upload_from_string(content, "application/json")
-        return f"gs://{self.bucket_name}/{blob_name}"
-
-    def _process_large_attributes(self, span_dict: dict, span_id: str) -> dict:
+    def _span_entry(self, span: ReadableSpan) -> tuple[dict[str, Any], int]:
         """
-        Process large attribute values by storing them in GCS if they exceed the size
-        limit of Google Cloud Logging.
+        Build the log entry of a span, moving oversized attributes to GCS.
 
-        :param span_dict: The span data dictionary
-        :param trace_id: The trace ID
-        :param span_id: The span ID
-        :return: The updated span dictionary
-        """
-        attributes = span_dict["attributes"]
-        if len(json.dumps(attributes).encode()) > 255 * 1024:  # 250 KB
-            # Separate large payload from other attributes
-            attributes_payload = dict(attributes.items())
-            attributes_retain = dict(attributes.items())
-
-            # Store large payload in GCS
-            gcs_uri = self.store_in_gcs(json.dumps(attributes_payload), span_id)
-            attributes_retain["uri_payload"] = gcs_uri
-            attributes_retain["url_payload"] = (
-                f"https://storage.mtls.cloud.google.com/"
-                f"{self.bucket_name}/spans/{span_id}.json"
-            )
+        The attributes are serialized once, both to measure them and, when they
+        are too large, as the content uploaded to GCS.
 
-            span_dict["attributes"] = attributes_retain
+        :param span: The span to log
+        :return: The log entry and the approximate size of its attributes in bytes
+        """
+        span_context = span.get_span_context()
+        trace_id = format(span_context.trace_id, "x") if span_context else ""
+        span_id = format(span_context.span_id, "x") if span_context else ""
+        attributes = _json_attributes(span.attributes)
+        attributes_json = json.dumps(attributes, default=str)
+        size = len(attributes_json.encode())
+        if size > MAX_LOGGED_ATTRIBUTES_BYTES:
+            # Store large payload in GCS, without waiting for the upload
+            location = self.payload_offloader.submit(attributes_json)
+            # Keep only the small attributes in the log entry; the full set is in the payload.
+            attributes = {
+                **{
+                    key: value
+                    for key, value in attributes.items()
+                    if len(str(value)) <= MAX_RETAINED_ATTRIBUTE_CHARS
+                },
+                "uri_payload": location[0] if location else "Payload not stored",
+                "url_payload": location[1] if location else "",
+            }
             logging.info(
                 "Length of payload span above 250 KB, storing attributes in GCS "
                 "to avoid large log entry errors"
             )
+            size = 0
+        # Same fields as ReadableSpan.to_json(), without the JSON round trip.
+        span_dict: dict[str, Any] = {
+            "name": span.name,
+            "context": _format_context(span.context) if span.context else None,
+            "kind": str(span.kind),
+            "parent_id": f"0x{format_span_id(span.parent.span_id)}"
+            if span.parent is not None
+            else None,
+            "start_time": ns_to_iso_str(span.start_time) if span.start_time else None,
+            "end_time": ns_to_iso_str(span.end_time) if span.end_time else None,
+            "status": {
+                "status_code": span.status.status_code.name,
+                **(
+                    {"description": span.status.description}
+                    if span.status.description
+                    else {}
+                ),
+            },
+            "attributes": attributes,
+            "events": [
+                {
+                    "name": event.name,
+                    "timestamp": ns_to_iso_str(event.timestamp),
+                    "attributes": _json_attributes(event.attributes),
+                }
+                for event in span.events
+            ],
+            "links": [
+                {
+                    "context": _format_context(link.context),
+                    "attributes": _json_attributes(link.attributes),
+                }
+                for link in span.links
+            ],
+            "resource": {
+                "attributes": _json_attributes(span.resource.attributes),
+                "schema_url": span.resource.schema_url,
+            },
+            "trace": f"projects/{self.project_id}/traces/{trace_id}",
+            "span_id": span_id,
+        }
+        return span_dict, size + 1024
+
+    def _commit(self, batch: Any, span_count: int) -> int:
+        """Write a batch of log entries. Return the number of spans not logged."""
+        try:
+            batch.commit()
+        except Exception as e:
+            logging.warning(f"Unable to log {span_count} spans to Cloud Logging: {e}")
+            return span_count
+        return 0
+
+
+class _CountingSpanExporter(SpanExporter):
+    """Forwards to another exporter and counts the spans handed to it."""
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+        self.exported_spans = 0
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock:
+            self.exported_spans += len(spans)
+        return self.exporter.export(spans)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+
+class MeteredBatchSpanProcessor(BatchSpanProcessor):
+    """
+    A BatchSpanProcessor that counts spans dropped because its queue was full.
+
+    The queue discards its oldest span without notice once full, so drops are
+    derived from the sampled spans received minus the spans that reached the
+    exporter, using only public hooks. Spans still queued or being exported
+    count as not exported until ``force_flush`` or ``shutdown`` returns.
+    """
+
+    def __init__(self, span_exporter: SpanExporter, *args: Any, **kwargs: Any) -> None:
+        self._counting_exporter = _CountingSpanExporter(span_exporter)
+        super().__init__(self._counting_exporter, *args, **kwargs)
+        self.received_spans = 0
+        self._received_lock = threading.Lock()
+
+    @property
+    def dropped_spans(self) -> int:
+        """Sampled spans received but not exported; exact after a flush."""
+        return self.received_spans - self._counting_exporter.exported_spans
+
+    def on_end(self, span: ReadableSpan) -> None:
+        # Unsampled spans are ignored by the processor as well.
+        if span.context is not None and span.context.trace_flags.sampled:
+            with self._received_lock:
+                self.received_spans += 1
+        super().on_end(span)
+
+
+def _json_attributes(attributes: Mapping[str, Any] | None) -> dict[str, Any]:
+    """
+    Copy span attributes into JSON values.
+
+    Sequence attributes are tuples, which the gRPC Cloud Logging transport rejects
+    when it converts the entry to a protobuf ``Struct``.
+
+    :param attributes: Attributes of a span, event, link or resource
+    :return: The attributes with sequences as lists and other values as JSON scalars
+    """
+    return {key: _json_value(value) for key, value in (attributes or {}).items()}
+
+
+def _json_value(value: Any) -> Any:
+    if value is None or isinstance(value, str | bool | int | float):
+        return value
+    if isinstance(value, Sequence):
+        return [_json_value(item) for item in value]
+    return str(value)
+
 
-        return span_dict
+def _format_context(context: SpanContext) -> dict[str, str]:
+    return {
+        "trace_id": f"0x{format_trace_id(context.trace_id)}",
+        "span_id": f"0x{format_span_id(context.span_id)}",
+        "trace_state": repr(context.trace_state),
+    }
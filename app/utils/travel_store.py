@@ -0,0 +1,789 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple, Protocol
+
+from google.cloud import bigquery
+
+from app.utils.bigquery_client import get_bigquery_client, track_job
+
+TRAVEL_REPLICA_ENABLED = (
+    os.environ.get("TRAVEL_REPLICA_ENABLED", "false").lower() == "true"
+)
+TRAVEL_REPLICA_PATH = os.environ.get(
+    "TRAVEL_REPLICA_PATH",
+    os.path.join(tempfile.gettempdir(), "adk-travel-agent-cr", "travel_requests.db"),
+)
+TRAVEL_REPLICA_SYNC_SECONDS = float(os.environ.get("TRAVEL_REPLICA_SYNC_SECONDS", "5"))
+# Reads fall back to BigQuery when the last successful sync started longer ago.
+TRAVEL_REPLICA_MAX_STALENESS_SECONDS = float(
+    os.environ.get("TRAVEL_REPLICA_MAX_STALENESS_SECONDS", "30")
+)
+# Each sync re-reads rows this far behind the watermark, to pick up rows whose
+# timestamp was set before they became visible (e.g. concurrent DML jobs).
+TRAVEL_REPLICA_SYNC_OVERLAP_SECONDS = float(
+    os.environ.get("TRAVEL_REPLICA_SYNC_OVERLAP_SECONDS", "60")
+)
+# Interval between full copies of the table, which pick up the rows that incremental
+# syncs cannot see: rows visible later than the overlap and changes keeping their timestamp.
+TRAVEL_REPLICA_FULL_SYNC_SECONDS = float(
+    os.environ.get("TRAVEL_REPLICA_FULL_SYNC_SECONDS", "3600")
+)
+
+COLUMNS = [
+    "request_id",
+    "timestamp",
+    "employee_first_name",
+    "employee_last_name",
+    "employee_id",
+    "origin_city",
+    "destination_city",
+    "start_date",
+    "end_date",
+    "transport_mode",
+    "car_type",
+    "reason",
+    "status",
+]
+# Columns returned by status listings and ID lookups.
+SUMMARY_COLUMNS = [
+    "request_id",
+    "timestamp",
+    "employee_first_name",
+    "employee_last_name",
+    "destination_city",
+    "start_date",
+    "end_date",
+    "reason",
+    "status",
+]
+# Grouping expressions and aggregates accepted by BigQueryTravelStore.aggregate, by name.
+ANALYTICS_DIMENSIONS = {
+    "destination_city": "destination_city",
+    "origin_city": "origin_city",
+    "transport_mode": "transport_mode",
+    "status": "status",
+    "employee_id": "employee_id",
+    "month": "FORMAT_DATE('%Y-%m', start_date)",
+}
+ANALYTICS_METRICS = {
+    "requests": "COUNT(*)",
+    "employees": "COUNT(DISTINCT employee_id)",
+    "avg_trip_days": "ROUND(AVG(DATE_DIFF(end_date, start_date, DAY) + 1), 1)",
+    "total_trip_days": "SUM(DATE_DIFF(end_date, start_date, DAY) + 1)",
+}
+
+
+class TravelStoreError(Exception):
+    """The storage backend rejected a write."""
+
+
+class StatusFilter(NamedTuple):
+    """Statuses to match, compared case-insensitively if ``case_insensitive``."""
+
+    statuses: tuple[str, ...]
+    case_insensitive: bool = False
+
+
+class StatusPage(NamedTuple):
+    """One page of a status listing; a field is None when it was not requested."""
+
+    rows: list[dict[str, Any]] | None
+    total: int | None
+
+
+class AnalyticsSpec(NamedTuple):
+    """An aggregate over travel requests whose start date is in a range."""
+
+    dimensions: tuple[str, ...]
+    metrics: tuple[str, ...]
+    start_from: datetime.date | None = None
+    start_to: datetime.date | None = None
+    statuses: tuple[str, ...] | None = None
+
+
+class TravelRequestStore(Protocol):
+    """Storage of travel requests behind the agent tools."""
+
+    def insert(self, row: dict[str, Any]) -> int:
+        """
+        Insert a travel request.
+
+        :param row: Values for every column in COLUMNS
+        :return: The number of rows inserted
+        :raises TravelStoreError: If the backend rejected the row
+        """
+        ...
+
+    def find_by_status(
+        self,
+        status_filter: StatusFilter,
+        cursor: tuple[str, str] | None,
+        limit: int,
+        page: bool = True,
+        count: bool = True,
+    ) -> StatusPage:
+        """
+        List requests matching ``status_filter``, newest first.
+
+        :param status_filter: The statuses to match
+        :param cursor: (timestamp, request_id) of the last row of the previous page
+        :param limit: Maximum number of rows in the page
+        :param page: Whether to fetch the page rows
+        :param count: Whether to count every matching request
+        :return: The page rows (SUMMARY_COLUMNS) and the total
+        """
+        ...
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        """
+        Look up a request by ID.
+
+        :param request_id: The request ID
+        :return: The request (SUMMARY_COLUMNS), or None if not found
+        """
+        ...
+
+    def apply_status_change(
+        self, request_ids: list[str], new_status: str, timestamp: str
+    ) -> dict[str, str | None]:
+        """
+        Set the status of the given requests that are not already in ``new_status``.
+
+        :param request_ids: The requests to update
+        :param new_status: The new status
+        :param timestamp: ISO 8601 time of the change
+        :return: The previous status of every request found
+        """
+        ...
+
+
+def normalize_timestamp(value: Any) -> str:
+    """
+    Format a timestamp as ISO 8601 in UTC with microseconds, which sorts chronologically.
+
+    :param value: A datetime or an ISO 8601 string
+    :return: The normalized string
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+
+class BigQueryTravelStore:
+    """The BigQuery table of travel requests, the system of record."""
+
+    def __init__(
+        self,
+        table: str,
+        client_factory: Callable[[], bigquery.Client] = get_bigquery_client,
+    ) -> None:
+        """
+        Initialize the store.
+
+        :param table: Fully qualified table ID
+        :param client_factory: Returns the BigQuery client used for every job
+        """
+        self.table = table
+        self.client_factory = client_factory
+
+    def insert(self, row: dict[str, Any]) -> int:
+        query = f"""
+            INSERT INTO `{self.table}` ({", ".join(COLUMNS)})
+            VALUES ({", ".join(f"@{column}" for column in COLUMNS)})
+        """
+        types = {"timestamp": "TIMESTAMP", "start_date": "DATE", "end_date": "DATE"}
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter(
+                    column, types.get(column, "STRING"), row.get(column)
+                )
+                for column in COLUMNS
+            ]
+        )
+        query_job = track_job(self.client_factory().query(query, job_config=job_config))
+        query_job.result()
+        if query_job.errors:
+            raise TravelStoreError(
+                "; ".join(str(error["message"]) for error in query_job.errors)
+            )
+        return query_job.num_dml_affected_rows or 0
+
+    def find_by_status(
+        self,
+        status_filter: StatusFilter,
+        cursor: tuple[str, str] | None,
+        limit: int,
+        page: bool = True,
+        count: bool = True,
+    ) -> StatusPage:
+        client = self.client_factory()
+        condition, params = self._status_condition(status_filter)
+        count_job = None
+        if count:
+            # A separate COUNT(*) only reads the filtered column.
+            count_job = track_job(
+                client.query(
+                    f"SELECT COUNT(*) AS total FROM `{self.table}` WHERE {condition}",
+                    job_config=bigquery.QueryJobConfig(query_parameters=params),
+                )
+            )
+        rows = None
+        if page:
+            page_params: list[
+                bigquery.ArrayQueryParameter | bigquery.ScalarQueryParameter
+            ] = list(params)
+            cursor_clause = ""
+            if cursor is not None:
+                cursor_clause = (
+                    "AND (timestamp < @cursor_ts "
+                    "OR (timestamp = @cursor_ts AND request_id < @cursor_id))"
+                )
+                page_params += [
+                    bigquery.ScalarQueryParameter("cursor_ts", "TIMESTAMP", cursor[0]),
+                    bigquery.ScalarQueryParameter("cursor_id", "STRING", cursor[1]),
+                ]
+            page_params.append(
+                bigquery.ScalarQueryParameter("page_limit", "INT64", limit)
+            )
+            # Only the columns needed for the summary are projected.
+            query = f"""
+                SELECT {", ".join(SUMMARY_COLUMNS)}
+                FROM `{self.table}`
+                WHERE ({condition}) {cursor_clause}
+                ORDER BY timestamp DESC, request_id DESC
+                LIMIT @page_limit
+            """
+            job_config = bigquery.QueryJobConfig(query_parameters=page_params)
+            query_job = track_job(client.query(query, job_config=job_config))
+            rows = [dict(row.items()) for row in query_job.result()]
+        total = next(iter(count_job.result())).total if count_job is not None else None
+        return StatusPage(rows, total)
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        query = f"""
+            SELECT {", ".join(SUMMARY_COLUMNS)}
+            FROM `{self.table}`
+            WHERE request_id = @request_id
+            LIMIT 1
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("request_id", "STRING", request_id)
+            ]
+        )
+        rows = list(
+            track_job(
+                self.client_factory().query(query, job_config=job_config)
+            ).result()
+        )
+        return dict(rows[0].items()) if rows else None
+
+    def apply_status_change(
+        self, request_ids: list[str], new_status: str, timestamp: str
+    ) -> dict[str, str | None]:
+        """
+        Set the status of the given requests in a single BigQuery job.
+
+        The script saves the previous status of each request, updates only those
+        not already in ``new_status`` and returns the previous statuses, so one
+        round trip tells "not found" apart from "already in that status". The
+        read and the update run in one transaction: a concurrent change to the
+        same rows makes the job fail instead of reporting statuses that were
+        not the ones overwritten, and a failed job changes nothing.
+        """
+        query = f"""
+            BEGIN TRANSACTION;
+            CREATE TEMP TABLE previous_status AS
+                SELECT request_id, status FROM `{self.table}`
+                WHERE request_id IN UNNEST(@request_ids_param);
+            UPDATE `{self.table}`
+            SET status = @new_status_param, timestamp = @current_timestamp_param
+            WHERE request_id IN UNNEST(@request_ids_param) AND IFNULL(status, '') != @new_status_param;
+            COMMIT TRANSACTION;
+            SELECT request_id, status FROM previous_status;
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "request_ids_param", "STRING", request_ids
+                ),
+                bigquery.ScalarQueryParameter("new_status_param", "STRING", new_status),
+                bigquery.ScalarQueryParameter(
+                    "current_timestamp_param", "TIMESTAMP", timestamp
+                ),
+            ]
+        )
+        query_job = track_job(self.client_factory().query(query, job_config=job_config))
+        return {row.request_id: row.status for row in query_job.result()}
+
+    def rows_since(self, since: str | None) -> Iterator[dict[str, Any]]:
+        """
+        Stream every column of the requests changed at or after ``since``, oldest first.
+
+        :param since: ISO 8601 timestamp, or None for the whole table
+        :return: An iterator of rows, fetched page by page
+        """
+        query = f"""
+            SELECT {", ".join(COLUMNS)}
+            FROM `{self.table}`
+            WHERE @since IS NULL OR timestamp >= @since
+            ORDER BY timestamp
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("since", "TIMESTAMP", since)
+            ]
+        )
+        query_job = track_job(self.client_factory().query(query, job_config=job_config))
+        for row in query_job.result():
+            yield dict(row.items())
+
+    def aggregate(self, spec: AnalyticsSpec, limit: int) -> list[dict[str, Any]]:
+        """
+        Compute an aggregate in one parameterized query.
+
+        Only names from ANALYTICS_DIMENSIONS and ANALYTICS_METRICS reach the SQL
+        text; filter values are query parameters. Groups are ordered by month
+        when it is a dimension, then by the first metric, largest first.
+
+        :param spec: Dimensions, metrics and filters
+        :param limit: Maximum number of groups returned
+        :return: One row per group, keyed by dimension and metric names
+        """
+        unknown = [name for name in spec.dimensions if name not in ANALYTICS_DIMENSIONS]
+        unknown += [name for name in spec.metrics if name not in ANALYTICS_METRICS]
+        if unknown or not spec.metrics:
+            raise ValueError(f"Unknown or missing dimensions or metrics: {unknown}")
+        select = [f"{ANALYTICS_DIMENSIONS[name]} AS {name}" for name in spec.dimensions]
+        select += [f"{ANALYTICS_METRICS[name]} AS {name}" for name in spec.metrics]
+        conditions = ["TRUE"]
+        params: list[bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter] = [
+            bigquery.ScalarQueryParameter("group_limit", "INT64", limit)
+        ]
+        if spec.start_from is not None:
+            conditions.append("start_date >= @start_from")
+            params.append(
+                bigquery.ScalarQueryParameter("start_from", "DATE", spec.start_from)
+            )
+        if spec.start_to is not None:
+            conditions.append("start_date <= @start_to")
+            params.append(
+                bigquery.ScalarQueryParameter("start_to", "DATE", spec.start_to)
+            )
+        if spec.statuses is not None:
+            conditions.append("status IN UNNEST(@statuses)")
+            params.append(
+                bigquery.ArrayQueryParameter("statuses", "STRING", list(spec.statuses))
+            )
+        order = [f"{spec.metrics[0]} DESC"]
+        if "month" in spec.dimensions:
+            order.insert(0, "month")
+        group_by = ""
+        if spec.dimensions:
+            group_by = "GROUP BY " + ", ".join(
+                str(i + 1) for i in range(len(spec.dimensions))
+            )
+        query = f"""
+            SELECT {", ".join(select)}
+            FROM `{self.table}`
+            WHERE {" AND ".join(conditions)}
+            {group_by}
+            ORDER BY {", ".join(order)}
+            LIMIT @group_limit
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        query_job = track_job(self.client_factory().query(query, job_config=job_config))
+        return [dict(row.items()) for row in query_job.result()]
+
+    @staticmethod
+    def _status_condition(
+        status_filter: StatusFilter,
+    ) -> tuple[str, list[bigquery.ArrayQueryParameter]]:
+        if status_filter.case_insensitive:
+            values = [status.lower() for status in status_filter.statuses]
+            condition = "LOWER(status) IN UNNEST(@statuses)"
+        else:
+            values = list(status_filter.statuses)
+            condition = "status IN UNNEST(@statuses)"
+        return condition, [bigquery.ArrayQueryParameter("statuses", "STRING", values)]
+
+
+class SqliteTravelStore:
+    """
+    Travel requests in an embedded SQLite database, used as a local replica.
+
+    Timestamps are stored with :func:`normalize_timestamp` and dates as ISO
+    strings, so ordering matches BigQuery. A single connection is shared under a
+    lock; an index on (status, timestamp, request_id) serves status listings.
+    """
+
+    def __init__(self, path: str = TRAVEL_REPLICA_PATH) -> None:
+        """
+        Open or create the database.
+
+        :param path: Database file, or ":memory:"
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # SQLite's LOWER only folds ASCII; statuses contain accented letters.
+        self._connection.create_function(
+            "py_lower", 1, lambda v: v.lower() if v else v, deterministic=True
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS travel_requests ("
+                + ", ".join(
+                    f"{column} TEXT{' PRIMARY KEY' if column == 'request_id' else ''}"
+                    for column in COLUMNS
+                )
+                + ")"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS travel_requests_status "
+                "ON travel_requests (status, timestamp, request_id)"
+            )
+
+    def insert(self, row: dict[str, Any]) -> int:
+        return self.upsert([row])
+
+    def upsert(self, rows: list[dict[str, Any]]) -> int:
+        """
+        Insert rows or overwrite stored rows whose status or timestamp differ.
+
+        :param rows: Rows with every column in COLUMNS
+        :return: The number of rows inserted or changed
+        """
+        updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+        values = [
+            [
+                normalize_timestamp(row[column])
+                if column == "timestamp"
+                else str(row[column])
+                if column in ("start_date", "end_date") and row.get(column)
+                else row.get(column)
+                for column in COLUMNS
+            ]
+            for row in rows
+        ]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                f"INSERT INTO travel_requests ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)}) "
+                f"ON CONFLICT (request_id) DO UPDATE SET {updates} "
+                "WHERE excluded.timestamp IS NOT travel_requests.timestamp "
+                "OR excluded.status IS NOT travel_requests.status",
+                values,
+            )
+            return self._connection.total_changes - before
+
+    def find_by_status(
+        self,
+        status_filter: StatusFilter,
+        cursor: tuple[str, str] | None,
+        limit: int,
+        page: bool = True,
+        count: bool = True,
+    ) -> StatusPage:
+        column = "py_lower(status)" if status_filter.case_insensitive else "status"
+        statuses = [
+            status.lower() if status_filter.case_insensitive else status
+            for status in status_filter.statuses
+        ]
+        condition = f"{column} IN ({', '.join('?' for _ in statuses)})"
+        rows = total = None
+        with self._lock:
+            if count:
+                (total,) = self._connection.execute(
+                    f"SELECT COUNT(*) FROM travel_requests WHERE {condition}", statuses
+                ).fetchone()
+            if page:
+                params: list[Any] = list(statuses)
+                cursor_clause = ""
+                if cursor is not None:
+                    cursor_ts = normalize_timestamp(cursor[0])
+                    cursor_clause = (
+                        "AND (timestamp < ? OR (timestamp = ? AND request_id < ?))"
+                    )
+                    params += [cursor_ts, cursor_ts, cursor[1]]
+                result = self._connection.execute(
+                    f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM travel_requests "
+                    f"WHERE ({condition}) {cursor_clause} "
+                    "ORDER BY timestamp DESC, request_id DESC LIMIT ?",
+                    [*params, limit],
+                )
+                rows = [
+                    dict(zip(SUMMARY_COLUMNS, row, strict=True))
+                    for row in result.fetchall()
+                ]
+        return StatusPage(rows, total)
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM travel_requests WHERE request_id = ?",
+                [request_id],
+            ).fetchone()
+        return dict(zip(SUMMARY_COLUMNS, row, strict=True)) if row else None
+
+    def apply_status_change(
+        self, request_ids: list[str], new_status: str, timestamp: str
+    ) -> dict[str, str | None]:
+        placeholders = ", ".join("?" for _ in request_ids)
+        with self._lock, self._connection:
+            previous = dict(
+                self._connection.execute(
+                    f"SELECT request_id, status FROM travel_requests WHERE request_id IN ({placeholders})",
+                    request_ids,
+                ).fetchall()
+            )
+            self._connection.execute(
+                f"UPDATE travel_requests SET status = ?, timestamp = ? "
+                f"WHERE request_id IN ({placeholders}) AND IFNULL(status, '') != ?",
+                [new_status, normalize_timestamp(timestamp), *request_ids, new_status],
+            )
+        return previous
+
+    def max_timestamp(self) -> str | None:
+        """Return the newest stored timestamp, the watermark of incremental syncs."""
+        with self._lock:
+            (value,) = self._connection.execute(
+                "SELECT MAX(timestamp) FROM travel_requests"
+            ).fetchone()
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class ReplicatedTravelStore:
+    """
+    Serve reads from a local replica of BigQuery kept in sync by timestamp watermark.
+
+    Writes go to BigQuery first, which stays authoritative, and are then applied
+    to the replica so this instance reads its own writes. A background thread
+    copies rows changed since the newest replicated timestamp (minus
+    ``sync_overlap`` seconds) every ``sync_interval`` seconds; the replica file
+    keeps the watermark across restarts. Reads are served by the replica only
+    while the last successful sync started less than ``max_staleness`` seconds
+    ago, and by BigQuery otherwise.
+
+    That bound only holds for changes that set ``timestamp`` to about the time
+    they become visible. A row that shows up with an older timestamp (a
+    replayed or long-retried streaming write) or a change that keeps its
+    timestamp is only copied by a full sync. One runs on the first sync of the
+    process, every ``full_sync_interval`` seconds, and on the next sync after
+    ``request_full_sync``.
+    """
+
+    def __init__(
+        self,
+        primary: BigQueryTravelStore,
+        replica: SqliteTravelStore,
+        sync_interval: float = TRAVEL_REPLICA_SYNC_SECONDS,
+        max_staleness: float = TRAVEL_REPLICA_MAX_STALENESS_SECONDS,
+        sync_overlap: float = TRAVEL_REPLICA_SYNC_OVERLAP_SECONDS,
+        full_sync_interval: float = TRAVEL_REPLICA_FULL_SYNC_SECONDS,
+        on_change: Callable[[], None] | None = None,
+    ) -> None:
+        """
+        Initialize the store. No thread is started until first use.
+
+        :param primary: The system of record
+        :param replica: The local replica
+        :param sync_interval: Seconds between incremental syncs
+        :param max_staleness: Maximum age in seconds of the data served by the replica
+        :param sync_overlap: Seconds re-read behind the watermark on each sync
+        :param full_sync_interval: Seconds between syncs copying the whole table
+        :param on_change: Called when a sync brought changes from other writers,
+            e.g. to invalidate caches
+        """
+        self.primary = primary
+        self.replica = replica
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.sync_overlap = sync_overlap
+        self.full_sync_interval = full_sync_interval
+        self.on_change = on_change
+        self._synced_at: float | None = None
+        self._full_synced_at: float | None = None
+        self._full_sync_requested = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {
+            "replica_reads": 0,
+            "primary_reads": 0,
+            "syncs": 0,
+            "full_syncs": 0,
+            "failed_syncs": 0,
+            "synced_rows": 0,
+            "changed_rows": 0,
+        }
+
+    def start(self) -> None:
+        """Start the sync thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="travel-replica-sync", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop the sync thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def request_full_sync(self) -> None:
+        """Make the next sync copy the whole table, e.g. after DML keeping timestamps."""
+        with self._lock:
+            self._full_sync_requested = True
+
+    def sync(self, full: bool = False) -> int:
+        """
+        Copy the rows changed in BigQuery since the replica's watermark.
+
+        :param full: Copy every row, whatever its timestamp; also done when a full
+            sync is due or was requested
+        :return: The number of replica rows inserted or changed
+        """
+        with self._sync_lock:
+            started_at = time.monotonic()
+            with self._lock:
+                full = (
+                    full
+                    or self._full_sync_requested
+                    or self._full_synced_at is None
+                    or started_at - self._full_synced_at >= self.full_sync_interval
+                )
+                self._full_sync_requested = False
+            watermark = None if full else self.replica.max_timestamp()
+            since = None
+            if watermark is not None:
+                since = normalize_timestamp(
+                    datetime.datetime.fromisoformat(watermark)
+                    - datetime.timedelta(seconds=self.sync_overlap)
+                )
+            batch: list[dict[str, Any]] = []
+            synced = changed = 0
+            try:
+                for row in self.primary.rows_since(since):
+                    batch.append(row)
+                    if len(batch) >= 1000:
+                        changed += self.replica.upsert(batch)
+                        synced += len(batch)
+                        batch = []
+                if batch:
+                    changed += self.replica.upsert(batch)
+                    synced += len(batch)
+            except Exception:
+                if full:
+                    self.request_full_sync()
+                raise
+            with self._lock:
+                self._synced_at = started_at
+                self._stats["syncs"] += 1
+                if full:
+                    self._full_synced_at = started_at
+                    self._stats["full_syncs"] += 1
+                self._stats["synced_rows"] += synced
+                self._stats["changed_rows"] += changed
+        if changed and self.on_change is not None:
+            self.on_change()
+        return changed
+
+    def insert(self, row: dict[str, Any]) -> int:
+        inserted = self.primary.insert(row)
+        if inserted:
+            self.replica.upsert([row])
+        return inserted
+
+    def find_by_status(
+        self,
+        status_filter: StatusFilter,
+        cursor: tuple[str, str] | None,
+        limit: int,
+        page: bool = True,
+        count: bool = True,
+    ) -> StatusPage:
+        return self._reader().find_by_status(status_filter, cursor, limit, page, count)
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        return self._reader().get(request_id)
+
+    def apply_status_change(
+        self, request_ids: list[str], new_status: str, timestamp: str
+    ) -> dict[str, str | None]:
+        previous = self.primary.apply_status_change(request_ids, new_status, timestamp)
+        changed = [
+            request_id
+            for request_id, status in previous.items()
+            if status != new_status
+        ]
+        if changed:
+            self.replica.apply_status_change(changed, new_status, timestamp)
+        return previous
+
+    def stats(self) -> dict[str, float]:
+        """
+        Report where reads were served from, sync counters and current staleness.
+
+        :return: A dictionary of counters; staleness_seconds is -1 before the first sync
+        """
+        with self._lock:
+            staleness = (
+                -1.0 if self._synced_at is None else time.monotonic() - self._synced_at
+            )
+            return {**self._stats, "staleness_seconds": round(staleness, 3)}
+
+    def _reader(self) -> SqliteTravelStore | BigQueryTravelStore:
+        self.start()
+        with self._lock:
+            fresh = (
+                self._synced_at is not None
+                and time.monotonic() - self._synced_at <= self.max_staleness
+            )
+            self._stats["replica_reads" if fresh else "primary_reads"] += 1
+        return self.replica if fresh else self.primary
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logging.warning(f"Travel request replica sync failed: {e}")
+                with self._lock:
+                    self._stats["failed_syncs"] += 1
+            self._stop.wait(self.sync_interval)
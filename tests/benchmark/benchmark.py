@@ -0,0 +1,393 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline benchmark of the travel-request tools and the agent loop.
+
+Runs against a local SQLite stand-in for BigQuery and a scripted fake model, so
+no Google Cloud access is needed. See tests/benchmark/README.md.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+from unittest import mock
+
+# The prompt cache would call Vertex AI; the fake model does not need it.
+os.environ.setdefault("PROMPT_CACHE_ENABLED", "false")
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app import agent
+from tests.benchmark.fake_model import ScriptedLlm
+from tests.benchmark.local_bigquery import LocalBigQueryClient
+
+# Metrics compared against the baseline, and whether higher values are better.
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p90_ms": False,
+    "throughput_per_s": True,
+    "alloc_kib_per_op": False,
+}
+
+Operation = Callable[[], Awaitable[Any]]
+
+
+def summarize(latencies: list[float], wall_seconds: float) -> dict[str, float]:
+    """
+    Summarize operation latencies measured in seconds.
+
+    :param latencies: Latency of every operation
+    :param wall_seconds: Elapsed time of the whole run
+    :return: Percentiles and mean in milliseconds, and throughput per second
+    """
+    ordered = sorted(latency * 1000 for latency in latencies)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {
+        "ops": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1], 3),
+        "throughput_per_s": round(len(ordered) / wall_seconds, 1),
+    }
+
+
+async def run_concurrently(
+    operation: Operation, iterations: int, concurrency: int
+) -> dict[str, float]:
+    """Run ``operation`` ``iterations`` times with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def timed() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(iterations)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def measure_allocations(operation: Operation, iterations: int) -> float:
+    """Return the mean peak memory allocated by one sequential operation, in KiB."""
+    tracemalloc.start()
+    peaks = []
+    try:
+        for _ in range(iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await operation()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return round(statistics.fmean(peaks) / 1024, 1)
+
+
+def build_tool_operations(request_ids: list[str]) -> dict[str, Operation]:
+    """Build one operation per tool hot path, calling the async variants the agent uses."""
+    rng = random.Random(1)
+    start_date = datetime.date.today() + datetime.timedelta(days=30)
+
+    async def booking() -> Any:
+        return await agent.request_travel_booking_logic_async(
+            employee_first_name="Lucía",
+            employee_last_name="García",
+            employee_id="EMP-1042",
+            origin_city="Madrid",
+            destination_city="Barcelona",
+            start_date=start_date.isoformat(),
+            end_date=(start_date + datetime.timedelta(days=2)).isoformat(),
+            transport_mode="Tren",
+            reason="Reunión trimestral",
+        )
+
+    async def listing() -> Any:
+        agent.status_query_cache.invalidate()
+        return await agent.get_travel_requests_by_status_async(search_term="aprobada")
+
+    async def cached_listing() -> Any:
+        return await agent.get_travel_requests_by_status_async(search_term="aprobada")
+
+    async def update() -> Any:
+        return await agent.update_travel_request_status_async(
+            request_id=rng.choice(request_ids),
+            new_status=rng.choice(["Aprobada", "Rechazada", "Pendiente de Aprobación"]),
+        )
+
+    return {
+        "request_travel_booking_logic": booking,
+        "get_travel_requests_by_status": listing,
+        "get_travel_requests_by_status[cached]": cached_listing,
+        "update_travel_request_status": update,
+    }
+
+
+def build_agent_operation(request_ids: list[str], model_latency_ms: float) -> Operation:
+    """
+    Build an operation that runs one four-turn conversation through a ``Runner``.
+
+    The turns register a trip, list requests, update one and ask an
+    unambiguous status question that the fast path answers without the model.
+    """
+    start_date = datetime.date.today() + datetime.timedelta(days=30)
+    script: dict[str, tuple[str, dict[str, Any]]] = {
+        "Quiero registrar un viaje a Barcelona": (
+            agent.request_travel_booking_logic.__name__,
+            {
+                "employee_first_name": "Lucía",
+                "employee_last_name": "García",
+                "employee_id": "EMP-1042",
+                "origin_city": "Madrid",
+                "destination_city": "Barcelona",
+                "start_date": start_date.isoformat(),
+                "end_date": (start_date + datetime.timedelta(days=2)).isoformat(),
+                "transport_mode": "Tren",
+                "reason": "Reunión trimestral",
+            },
+        ),
+        "Lista las solicitudes registradas, por favor": (
+            agent.get_travel_requests_by_status.__name__,
+            {"search_term": "Registrada"},
+        ),
+    }
+    update_turns = []
+    for request_id in request_ids[:20]:
+        text = f"Aprueba la solicitud {request_id}, por favor"
+        script[text] = (
+            agent.update_travel_request_status.__name__,
+            {"request_id": request_id, "new_status": "Aprobada"},
+        )
+        update_turns.append(text)
+
+    benchmark_agent = agent.root_agent.clone(
+        update={
+            "model": ScriptedLlm(script=script, latency_ms=model_latency_ms),
+            # The toolbox toolset needs the MCP Toolbox server.
+            "tools": [
+                tool
+                for tool in agent.root_agent.tools
+                if tool is not agent.toolbox_toolset
+            ],
+        }
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=benchmark_agent, app_name="benchmark", session_service=session_service
+    )
+    rng = random.Random(2)
+
+    async def conversation() -> None:
+        user_id = f"user_{uuid.uuid4()}"
+        session = await session_service.create_session(
+            app_name="benchmark", user_id=user_id
+        )
+        turns = [
+            "Quiero registrar un viaje a Barcelona",
+            "Lista las solicitudes registradas, por favor",
+            rng.choice(update_turns),
+            "¿Cuáles están aprobadas?",
+        ]
+        for text in turns:
+            async for _ in runner.run_async(
+                user_id=user_id,
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+            ):
+                pass
+
+    return conversation
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every benchmark at every concurrency level and return the report."""
+    client = LocalBigQueryClient(latency_ms=args.bigquery_latency_ms)
+    request_ids = client.seed(args.rows)
+    results: dict[str, dict[str, float]] = {}
+    # The tools log every call with print(); keep the output to the results.
+    with (
+        mock.patch.object(agent, "get_bigquery_client", return_value=client),
+        open(os.devnull, "w") as devnull,
+        contextlib.redirect_stdout(devnull),
+    ):
+        operations = build_tool_operations(request_ids)
+        operations["agent_conversation"] = build_agent_operation(
+            request_ids, args.model_latency_ms
+        )
+        for name, operation in operations.items():
+            # Warm up caches, the thread pool and lazily built objects.
+            await operation()
+            alloc_kib = await measure_allocations(operation, args.alloc_iterations)
+            for concurrency in args.concurrency:
+                iterations = (
+                    args.iterations // 4
+                    if name == "agent_conversation"
+                    else args.iterations
+                )
+                summary = await run_concurrently(
+                    operation, max(iterations, 1), concurrency
+                )
+                results[f"{name}@{concurrency}"] = {
+                    **summary,
+                    "alloc_kib_per_op": alloc_kib,
+                }
+                print(
+                    f"{name:<40} c={concurrency:<3} p50={summary['p50_ms']:>9.3f} ms "
+                    f"p99={summary['p99_ms']:>9.3f} ms {summary['throughput_per_s']:>9.1f}/s "
+                    f"{alloc_kib:>8.1f} KiB/op",
+                    file=sys.stderr,
+                )
+    stats = client.stats()
+    client.close()
+    return {
+        "config": {
+            "rows": args.rows,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "bigquery_latency_ms": args.bigquery_latency_ms,
+            "model_latency_ms": args.model_latency_ms,
+        },
+        "local_bigquery": stats,
+        "results": results,
+    }
+
+
+def compare_to_baseline(
+    report: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    List the metrics that regressed by more than ``threshold`` against the baseline.
+
+    :param report: The report of this run
+    :param baseline: A previously saved report
+    :param threshold: Allowed relative regression, e.g. 0.2 for 20%
+    :return: One line per regression; empty if none
+    """
+    regressions = []
+    for key, metrics in sorted(report["results"].items()):
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, default=10_000, help="Rows seeded in the local table"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=200,
+        help="Operations per tool and concurrency level",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 8, 32],
+        help="Comma-separated concurrency levels",
+    )
+    parser.add_argument(
+        "--alloc-iterations",
+        type=int,
+        default=20,
+        help="Sequential operations traced for allocations",
+    )
+    parser.add_argument(
+        "--bigquery-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated BigQuery round trip per job",
+    )
+    parser.add_argument(
+        "--model-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated model latency per call",
+    )
+    parser.add_argument(
+        "--output",
+        default="tests/benchmark/.results/report.json",
+        help="Where to write this run's report",
+    )
+    parser.add_argument(
+        "--baseline", help="Report to compare against; the run fails on regressions"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Allowed relative regression"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write this run's report to --baseline instead of comparing",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmarks(args))
+    paths = [args.output] + (
+        [args.baseline] if args.baseline and args.update_baseline else []
+    )
+    for path in paths:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if not args.baseline or args.update_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        # A missing baseline must not pass as "no regressions".
+        print(f"No baseline at {args.baseline}; record one with --update-baseline.")
+        return 1
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != report["config"]:
+        print("Warning: the baseline was recorded with a different configuration.")
+    regressions = compare_to_baseline(report, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
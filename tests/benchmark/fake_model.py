@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import Field
+
+# Characters of the tool result echoed in the scripted reply.
+_REPLY_MAX_CHARS = 200
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Fake model that answers user messages from a fixed script.
+
+    A user message found in ``script`` is answered with a call to the scripted
+    tool and arguments; the tool result is then answered with a short text reply
+    quoting it, as the real model would after a tool call. Any other message gets
+    a fixed text reply. ``latency_ms`` is awaited before every response.
+    """
+
+    model: str = "scripted-model"
+    script: dict[str, tuple[str, dict[str, Any]]] = Field(default_factory=dict)
+    latency_ms: float = 0.0
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return ["scripted-model"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        parts = (llm_request.contents[-1].parts or []) if llm_request.contents else []
+        function_responses = [
+            part.function_response for part in parts if part.function_response
+        ]
+        if function_responses:
+            result = json.dumps(
+                function_responses[0].response, ensure_ascii=False, default=str
+            )
+            yield _text_response(f"Hecho. {result[:_REPLY_MAX_CHARS]}")
+            return
+        text = "".join(part.text or "" for part in parts).strip()
+        if text in self.script:
+            name, args = self.script[text]
+            yield LlmResponse(
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(name=name, args=args)
+                        )
+                    ],
+                )
+            )
+            return
+        yield _text_response("¿En qué más puedo ayudarte?")
+
+
+def _text_response(text: str) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)])
+    )
@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency of conversations over /run_sse against the WebSocket /live endpoint.
+
+Runs the same multi-turn conversations against a running server through both
+transports and reports time to first text and time to the end of each turn.
+See tests/benchmark/README.md.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any
+
+import httpx
+from websockets.asyncio.client import connect
+
+from tests.benchmark.benchmark import summarize
+
+DEFAULT_TURNS = [
+    "Hola, ¿qué puedes hacer por mí?",
+    "¿Cuántas solicitudes hay aprobadas?",
+    "Lista las solicitudes registradas, por favor",
+]
+
+# One entry per turn: seconds to the first text and to the end of the turn.
+TurnTimings = list[tuple[float, float]]
+
+
+async def sse_conversation(
+    client: httpx.AsyncClient, app_name: str, turns: list[str]
+) -> TurnTimings:
+    """Run a conversation with one streaming /run_sse request per turn."""
+    user_id = f"bench_{uuid.uuid4().hex[:8]}"
+    response = await client.post(f"/apps/{app_name}/users/{user_id}/sessions", json={})
+    response.raise_for_status()
+    session_id = response.json()["id"]
+    timings = []
+    for text in turns:
+        body = {
+            "app_name": app_name,
+            "user_id": user_id,
+            "session_id": session_id,
+            "new_message": {"role": "user", "parts": [{"text": text}]},
+            "streaming": True,
+        }
+        start = time.perf_counter()
+        first_text = None
+        async with client.stream("POST", "/run_sse", json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first_text is not None or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:") :])
+                parts = (event.get("content") or {}).get("parts") or []
+                if any(part.get("text") for part in parts):
+                    first_text = time.perf_counter() - start
+        end = time.perf_counter() - start
+        timings.append((end if first_text is None else first_text, end))
+    return timings
+
+
+async def live_conversation(ws_url: str, turns: list[str]) -> tuple[float, TurnTimings]:
+    """Run a conversation over one /live connection; also return the connection setup time."""
+    start = time.perf_counter()
+    async with connect(
+        f"{ws_url}/live?user_id=bench_{uuid.uuid4().hex[:8]}"
+    ) as websocket:
+        json.loads(await websocket.recv())
+        connect_seconds = time.perf_counter() - start
+        timings = []
+        for text in turns:
+            start = time.perf_counter()
+            first_text = None
+            await websocket.send(json.dumps({"type": "text", "text": text}))
+            while True:
+                message = json.loads(await websocket.recv())
+                if message["type"] == "text" and first_text is None:
+                    first_text = time.perf_counter() - start
+                if message["type"] in ("turn_complete", "error"):
+                    break
+            end = time.perf_counter() - start
+            timings.append((end if first_text is None else first_text, end))
+        await websocket.send(json.dumps({"type": "close"}))
+    return connect_seconds, timings
+
+
+def summarize_turns(
+    timings: list[TurnTimings], wall_seconds: float
+) -> dict[str, dict[str, float]]:
+    """Summarize the first-text and end-of-turn latencies of every turn."""
+    turns = [turn for conversation in timings for turn in conversation]
+    return {
+        "first_text": summarize([first for first, _ in turns], wall_seconds),
+        "turn": summarize([end for _, end in turns], wall_seconds),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run ``--conversations`` conversations over each transport, ``--concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    ws_url = "ws" + args.url[len("http") :]
+    report: dict[str, Any] = {
+        "config": {
+            "url": args.url,
+            "conversations": args.conversations,
+            "concurrency": args.concurrency,
+            "turns": args.turns,
+        },
+        "results": {},
+    }
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+
+        async def sse() -> TurnTimings:
+            async with semaphore:
+                return await sse_conversation(client, args.app_name, args.turns)
+
+        async def live() -> tuple[float, TurnTimings]:
+            async with semaphore:
+                return await live_conversation(ws_url, args.turns)
+
+        # Warm up both paths, e.g. the toolbox manifest and the live model connection.
+        await sse()
+        await live()
+        start = time.perf_counter()
+        sse_timings = await asyncio.gather(*(sse() for _ in range(args.conversations)))
+        report["results"]["run_sse"] = summarize_turns(
+            sse_timings, time.perf_counter() - start
+        )
+        start = time.perf_counter()
+        live_results = await asyncio.gather(
+            *(live() for _ in range(args.conversations))
+        )
+        wall_seconds = time.perf_counter() - start
+        report["results"]["live"] = {
+            **summarize_turns([timings for _, timings in live_results], wall_seconds),
+            "connect": summarize(
+                [seconds for seconds, _ in live_results], wall_seconds
+            ),
+        }
+    for transport, metrics in report["results"].items():
+        for metric, summary in metrics.items():
+            print(
+                f"{transport:<8} {metric:<11} p50={summary['p50_ms']:>9.1f} ms "
+                f"p90={summary['p90_ms']:>9.1f} ms p99={summary['p99_ms']:>9.1f} ms",
+                file=sys.stderr,
+            )
+    return report
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", default="http://127.0.0.1:8000", help="Base URL of the running server"
+    )
+    parser.add_argument(
+        "--app-name", default="app", help="ADK app name used by /run_sse"
+    )
+    parser.add_argument(
+        "--conversations", type=int, default=20, help="Conversations per transport"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Conversations in flight at once"
+    )
+    parser.add_argument(
+        "--turns",
+        nargs="+",
+        default=DEFAULT_TURNS,
+        help="User messages of each conversation",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120.0, help="HTTP timeout in seconds"
+    )
+    parser.add_argument(
+        "--output",
+        default="tests/benchmark/.results/live_latency.json",
+        help="Where to write the report",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import itertools
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from typing import IO, Any, cast
+
+from google.cloud import bigquery
+
+TABLE_NAME = "travel_requests"
+COLUMNS = [
+    "request_id",
+    "timestamp",
+    "employee_first_name",
+    "employee_last_name",
+    "employee_id",
+    "origin_city",
+    "destination_city",
+    "start_date",
+    "end_date",
+    "transport_mode",
+    "car_type",
+    "reason",
+    "status",
+]
+SEED_STATUSES = [
+    "Registrada",
+    "Pendiente de Aprobación",
+    "Aprobada",
+    "Rechazada",
+    "Reservada",
+    "Completada",
+    "Cancelada",
+]
+SEED_CITIES = [
+    "Madrid",
+    "Barcelona",
+    "Sevilla",
+    "Valencia",
+    "Bilbao",
+    "Málaga",
+    "Zaragoza",
+]
+SEED_NAMES = [
+    ("Lucía", "García"),
+    ("Javier", "Martín"),
+    ("Carmen", "López"),
+    ("Pablo", "Ruiz"),
+]
+
+_TABLE_REF = re.compile(r"`[^`]+`")
+_UNNEST = re.compile(r"UNNEST\(@(\w+)\)")
+_PARAM = re.compile(r"@(\w+)")
+_FORMAT_DATE = re.compile(r"FORMAT_DATE\(", re.IGNORECASE)
+_TEMP_TABLE = re.compile(r"CREATE TEMP TABLE (\w+)", re.IGNORECASE)
+
+
+class LocalRow(dict[str, Any]):
+    """A result row readable by attribute, like ``google.cloud.bigquery.Row``."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+
+class LocalQueryJob:
+    """The finished job returned by :meth:`LocalBigQueryClient.query`."""
+
+    def __init__(self, rows: list[LocalRow], num_dml_affected_rows: int | None) -> None:
+        self.job_id = f"local-{uuid.uuid4()}"
+        self.errors: list[dict[str, Any]] | None = None
+        self.num_dml_affected_rows = num_dml_affected_rows
+        self._rows = rows
+
+    def result(self, timeout: float | None = None) -> list[LocalRow]:
+        return self._rows
+
+    def done(self) -> bool:
+        return True
+
+    def cancel(self) -> bool:
+        return False
+
+
+class LocalBigQueryClient:
+    """
+    Stand-in for ``bigquery.Client`` backed by an embedded SQLite database.
+
+    Only the subset of GoogleSQL used by the travel-request tools is translated:
+    backquoted table references, named ``@parameters``, ``IN UNNEST(@array)``,
+    ``FORMAT_DATE`` and multi-statement scripts with transactions and temporary
+    tables. Timestamps are stored as ISO 8601 strings, which sort like the
+    timestamps they represent. Statements run under one lock; ``latency_ms``
+    adds a round-trip delay outside of it so that concurrent callers overlap as
+    they would against BigQuery.
+    """
+
+    def __init__(self, path: str = ":memory:", latency_ms: float = 0.0) -> None:
+        """
+        Initialize the client and create the travel requests table.
+
+        :param path: SQLite database path; in memory by default
+        :param latency_ms: Simulated round-trip time added to every job
+        """
+        self.latency_ms = latency_ms
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._queries = 0
+        with self._lock:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ("
+                + ", ".join(
+                    f"{column} TEXT{' PRIMARY KEY' if column == 'request_id' else ''}"
+                    for column in COLUMNS
+                )
+                + ")"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE_NAME}_status_timestamp "
+                f"ON {TABLE_NAME} (status, timestamp, request_id)"
+            )
+
+    def factory(self) -> Callable[[], bigquery.Client]:
+        """Return a ``client_factory`` serving this client where a ``bigquery.Client`` is expected."""
+        return lambda: cast(bigquery.Client, self)
+
+    def seed(self, rows: int, seed: int = 0) -> list[str]:
+        """
+        Insert deterministic travel requests spread over the past year.
+
+        :param rows: Number of rows to insert
+        :param seed: Random seed, so that runs are comparable
+        :return: The inserted request IDs
+        """
+        rng = random.Random(seed)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        records = []
+        for _ in range(rows):
+            first_name, last_name = rng.choice(SEED_NAMES)
+            origin, destination = rng.sample(SEED_CITIES, 2)
+            start = now.date() + datetime.timedelta(days=rng.randint(-180, 180))
+            records.append(
+                {
+                    "request_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "timestamp": (
+                        now - datetime.timedelta(seconds=rng.randint(0, 31_536_000))
+                    ).isoformat(),
+                    "employee_first_name": first_name,
+                    "employee_last_name": last_name,
+                    "employee_id": f"EMP-{rng.randint(1000, 9999)}",
+                    "origin_city": origin,
+                    "destination_city": destination,
+                    "start_date": start.isoformat(),
+                    "end_date": (
+                        start + datetime.timedelta(days=rng.randint(1, 7))
+                    ).isoformat(),
+                    "transport_mode": rng.choice(["Avión", "Tren", "Coche"]),
+                    "car_type": None,
+                    "reason": "Visita a cliente",
+                    "status": rng.choice(SEED_STATUSES),
+                }
+            )
+        self.insert_rows_json(TABLE_NAME, records)
+        return [record["request_id"] for record in records]
+
+    def query(
+        self, query: str, job_config: bigquery.QueryJobConfig | None = None
+    ) -> LocalQueryJob:
+        """
+        Run a query or script and return the finished job.
+
+        :param query: GoogleSQL text as sent by the tools
+        :param job_config: Job configuration carrying the query parameters
+        :return: A job whose result holds the rows of the last SELECT
+        """
+        sql, params = self._translate(query, job_config)
+        statements = [statement for statement in sql.split(";") if statement.strip()]
+        rows: list[LocalRow] = []
+        affected = None
+        with self._lock:
+            self._queries += 1
+            try:
+                for statement in statements:
+                    cursor = self._connection.execute(statement, params)
+                    if cursor.description is not None:
+                        columns = [column[0] for column in cursor.description]
+                        rows = [
+                            LocalRow(zip(columns, row, strict=True))
+                            for row in cursor.fetchall()
+                        ]
+                    elif cursor.rowcount >= 0:
+                        affected = (affected or 0) + cursor.rowcount
+                self._connection.commit()
+            except Exception:
+                # A failed script leaves nothing behind, as in BigQuery.
+                self._connection.rollback()
+                raise
+            finally:
+                for temp_table in _TEMP_TABLE.findall(sql):
+                    self._connection.execute(f"DROP TABLE IF EXISTS temp.{temp_table}")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return LocalQueryJob(rows, affected)
+
+    def insert_rows_json(
+        self,
+        table: str,
+        json_rows: list[dict[str, Any]],
+        row_ids: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Insert rows as the streaming API would, ignoring already-inserted IDs.
+
+        :return: An empty error list
+        """
+        with self._lock:
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO {TABLE_NAME} ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [[row.get(column) for column in COLUMNS] for row in json_rows],
+            )
+            self._connection.commit()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return []
+
+    def load_table_from_file(
+        self,
+        file_obj: IO[bytes],
+        destination: str,
+        rewind: bool = False,
+        job_config: bigquery.LoadJobConfig | None = None,
+    ) -> LocalQueryJob:
+        """
+        Append newline-delimited JSON rows, as a load job would, in one transaction.
+
+        :return: The finished job
+        """
+        if rewind:
+            file_obj.seek(0)
+        rows = [json.loads(line) for line in file_obj if line.strip()]
+        with self._lock:
+            self._connection.executemany(
+                f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [[row.get(column) for column in COLUMNS] for row in rows],
+            )
+            self._connection.commit()
+        return LocalQueryJob([], None)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Report how many jobs were run and how many rows the table holds.
+
+        :return: A dictionary of counters
+        """
+        with self._lock:
+            (rows,) = self._connection.execute(
+                f"SELECT COUNT(*) FROM {TABLE_NAME}"
+            ).fetchone()
+            return {"queries": self._queries, "rows": rows}
+
+    def close(self) -> None:
+        self._connection.close()
+
+    @staticmethod
+    def _translate(
+        query: str, job_config: bigquery.QueryJobConfig | None
+    ) -> tuple[str, dict[str, Any]]:
+        """Rewrite GoogleSQL into SQLite with named parameters."""
+        params: dict[str, Any] = {}
+        arrays: dict[str, list[Any]] = {}
+        for parameter in job_config.query_parameters if job_config else []:
+            if isinstance(parameter, bigquery.ArrayQueryParameter):
+                arrays[parameter.name] = list(parameter.values)
+            elif isinstance(parameter.value, datetime.date):
+                # Stored like the seeded rows, so that equality matches too.
+                params[parameter.name] = parameter.value.isoformat()
+            else:
+                params[parameter.name] = parameter.value
+        counter = itertools.count()
+
+        def expand(match: re.Match[str]) -> str:
+            names = []
+            for value in arrays[match.group(1)]:
+                name = f"{match.group(1)}_{next(counter)}"
+                params[name] = value
+                names.append(f":{name}")
+            return f"({', '.join(names) or 'NULL'})"
+
+        sql = _TABLE_REF.sub(TABLE_NAME, query)
+        sql = _UNNEST.sub(expand, sql)
+        # Same argument order, and the same %Y-%m style formats.
+        sql = _FORMAT_DATE.sub("strftime(", sql)
+        sql = _PARAM.sub(r":\1", sql)
+        return sql, params
@@ -168,6 +168,7 @@ def test_chat_stream(server_fixture: subprocess.Popen[str]) -> None:
         ):
             has_text_content = True
             break
+    assert has_text_content, "No text content found in the streamed events"
 
 
 def test_chat_stream_error_handling(server_fixture: subprocess.Popen[str]) -> None:
@@ -202,3 +203,20 @@ def test_collect_feedback(server_fixture: subprocess.Popen[str]) -> None:
         FEEDBACK_URL, json=feedback_data, headers=HEADERS, timeout=10
     )
     assert response.status_code == 200
+
+
+def test_collect_feedback_batch(server_fixture: subprocess.Popen[str]) -> None:
+    """
+    Test the batch feedback endpoint (/feedback/batch) to ensure it accepts
+    many feedback records in one request.
+    """
+    feedback_data = [
+        {"score": score, "invocation_id": str(uuid.uuid4()), "text": "Batch"}
+        for score in range(5)
+    ]
+
+    response = requests.post(
+        FEEDBACK_URL + "/batch", json=feedback_data, headers=HEADERS, timeout=10
+    )
+    assert response.status_code == 200
+    assert response.json()["accepted"] == len(feedback_data)
@@ -12,80 +12,260 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
 import json
 import os
+import random
+import re
 import time
 import uuid
+from typing import Any, cast
 
-import requests
-from locust import HttpUser, between, task
+from locust import HttpUser, between, events, task
+from locust.clients import ResponseContextManager
+from locust.env import Environment
 
 ENDPOINT = "/run_sse"
+APP_NAME = "app"
+# Percentiles written to the JSON report.
+REPORT_PERCENTILES = (0.5, 0.9, 0.95, 0.99)
 
+_REQUEST_ID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
 
-class ChatStreamUser(HttpUser):
-    """Simulates a user interacting with the chat stream API."""
+EMPLOYEES = [
+    ("Lucía", "García Pérez", "EMP-1042"),
+    ("Javier", "Martín Ruiz", "EMP-2210"),
+    ("Carmen", "López Sánchez", "EMP-3371"),
+    ("Alejandro", "Fernández Gómez", "EMP-4187"),
+]
+ROUTES = [
+    ("Madrid", "Barcelona", "Tren", "Reunión trimestral con el equipo comercial"),
+    ("Sevilla", "Madrid", "Avión", "Formación en la sede central"),
+    ("Valencia", "Bilbao", "Coche", "Visita a cliente"),
+    ("Barcelona", "Málaga", "Avión", "Congreso del sector turístico"),
+]
+STATUS_QUERIES = [
+    "¿Cuáles están aprobadas?",
+    "Muéstrame las solicitudes pendientes de aprobación",
+    "¿Qué solicitudes hay registradas?",
+    "Dame las solicitudes rechazadas",
+]
+SQL_QUESTIONS = [
+    "¿Cuántas solicitudes de viaje a Madrid se han registrado este año?",
+    "¿Qué empleado ha solicitado más viajes en avión?",
+    "¿Cuál es el destino más frecuente de las solicitudes aprobadas?",
+    "¿Cuántos viajes en coche de alquiler hay previstos para el próximo mes?",
+]
 
-    wait_time = between(1, 3)  # Wait 1-3 seconds between tasks
 
-    @task
-    def chat_stream(self) -> None:
-        """Simulates a chat stream interaction."""
-        headers = {"Content-Type": "application/json"}
+class TravelAgentUser(HttpUser):
+    """Simulates an employee working with the travel agent through the SSE API."""
+
+    wait_time = between(1, 3)  # Wait 1-3 seconds between scenarios
+
+    def on_start(self) -> None:
+        self.headers = {"Content-Type": "application/json"}
         if os.environ.get("_ID_TOKEN"):
-            headers["Authorization"] = f"Bearer {os.environ['_ID_TOKEN']}"
-        # Create session first
-        user_id = f"user_{uuid.uuid4()}"
+            self.headers["Authorization"] = f"Bearer {os.environ['_ID_TOKEN']}"
+        self.user_id = f"user_{uuid.uuid4()}"
+        # Request IDs seen in earlier replies, used by the status update scenario.
+        self.known_request_ids: list[str] = []
+
+    @task(3)
+    def status_listing(self) -> None:
+        """Lists requests by status and asks for the next page."""
+        session_id = self._create_session("status_listing")
+        self._send("status_listing", session_id, random.choice(STATUS_QUERIES))
+        self._send("status_listing", session_id, "Muéstrame más")
+
+    @task(2)
+    def multi_turn_booking(self) -> None:
+        """Registers a trip over several turns, giving the details step by step."""
+        first_name, last_name, employee_id = random.choice(EMPLOYEES)
+        origin, destination, transport, reason = random.choice(ROUTES)
+        start = datetime.date.today() + datetime.timedelta(days=random.randint(20, 90))
+        end = start + datetime.timedelta(days=random.randint(1, 5))
+        session_id = self._create_session("multi_turn_booking")
+        turns = [
+            f"Hola, quiero registrar un viaje de {origin} a {destination}.",
+            f"Soy {first_name} {last_name}, mi ID de empleado es {employee_id}.",
+            f"Salgo el {start.isoformat()} y vuelvo el {end.isoformat()}.",
+            f"Iré en {transport.lower()}"
+            + (", con coche de alquiler" if transport == "Coche" else "")
+            + f". El motivo es: {reason}.",
+            "Sí, confirmo la solicitud.",
+        ]
+        for text in turns:
+            self._send("multi_turn_booking", session_id, text)
+
+    @task(2)
+    def status_update(self) -> None:
+        """Looks up a known request and changes its status."""
+        session_id = self._create_session("status_update")
+        if not self.known_request_ids:
+            self._send("status_update", session_id, "¿Qué solicitudes hay registradas?")
+        if not self.known_request_ids:
+            return
+        request_id = random.choice(self.known_request_ids)
+        self._send("status_update", session_id, f"Estado de la solicitud {request_id}")
+        new_status = random.choice(["Pendiente de Aprobación", "Aprobada", "Rechazada"])
+        self._send(
+            "status_update",
+            session_id,
+            f"Cambia el estado de la solicitud {request_id} a {new_status}",
+        )
+
+    @task(1)
+    def ad_hoc_sql(self) -> None:
+        """Asks a question that the agent answers with generated SQL."""
+        session_id = self._create_session("ad_hoc_sql")
+        self._send("ad_hoc_sql", session_id, random.choice(SQL_QUESTIONS))
+
+    def _create_session(self, scenario: str) -> str:
+        """Create a session through the locust client so it is part of the stats."""
         session_id = f"session_{uuid.uuid4()}"
-        session_data = {"state": {"preferred_language": "English", "visit_count": 5}}
-        requests.post(
-            f"{self.client.base_url}/apps/app/users/{user_id}/sessions/{session_id}",
-            headers=headers,
-            json=session_data,
-            timeout=10,
+        self.client.post(
+            f"/apps/{APP_NAME}/users/{self.user_id}/sessions/{session_id}",
+            name=f"{scenario} create_session",
+            headers=self.headers,
+            json={"state": {}},
         )
+        return session_id
 
-        # Send chat message
+    def _send(self, scenario: str, session_id: str, text: str) -> None:
+        """
+        Send one user message and record streaming latencies of the reply.
+
+        Besides the request itself, the following are reported per scenario:
+        ``time_to_first_event``, ``time_to_first_text``, every ``inter_event_gap``
+        and the ``end`` of the stream.
+        """
         data = {
-            "app_name": "app",
-            "user_id": user_id,
+            "app_name": APP_NAME,
+            "user_id": self.user_id,
             "session_id": session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{"text": "What's the weather in San Francisco?"}],
-            },
+            "new_message": {"role": "user", "parts": [{"text": text}]},
             "streaming": True,
         }
-        start_time = time.time()
-
-        with self.client.post(
-            ENDPOINT,
-            name=f"{ENDPOINT} message",
-            headers=headers,
-            json=data,
-            catch_response=True,
-            stream=True,
-            params={"alt": "sse"},
+        start_time = time.perf_counter()
+        first_text_time = None
+        last_event_time = None
+        events_count = 0
+        response_length = 0
+        reply = []
+
+        with cast(
+            ResponseContextManager,
+            self.client.post(
+                ENDPOINT,
+                name=f"{scenario} {ENDPOINT} message",
+                headers=self.headers,
+                json=data,
+                catch_response=True,
+                stream=True,
+                params={"alt": "sse"},
+            ),
         ) as response:
-            if response.status_code == 200:
-                events = []
-                for line in response.iter_lines():
-                    if line:
-                        # SSE format is "data: {json}"
-                        line_str = line.decode("utf-8")
-                        if line_str.startswith("data: "):
-                            event_json = line_str[6:]  # Remove "data: " prefix
-                            event = json.loads(event_json)
-                            events.append(event)
-                end_time = time.time()
-                total_time = end_time - start_time
-                self.environment.events.request.fire(
-                    request_type="POST",
-                    name=f"{ENDPOINT} end",
-                    response_time=total_time * 1000,  # Convert to milliseconds
-                    response_length=len(json.dumps(events)),
-                    response=response,
-                    context={},
-                )
-            else:
+            if response.status_code != 200:
                 response.failure(f"Unexpected status code: {response.status_code}")
+                return
+            for line in response.iter_lines():
+                # SSE format is "data: {json}"
+                if not line or not line.startswith(b"data: "):
+                    continue
+                now = time.perf_counter()
+                event = json.loads(line[6:])
+                events_count += 1
+                response_length += len(line)
+                if last_event_time is None:
+                    self._fire(scenario, "time_to_first_event", now - start_time)
+                else:
+                    self._fire(scenario, "inter_event_gap", now - last_event_time)
+                last_event_time = now
+                if "error" in event or "errorMessage" in event:
+                    response.failure(event.get("error") or event.get("errorMessage"))
+                    return
+                texts = [
+                    part["text"]
+                    for part in event.get("content", {}).get("parts", [])
+                    if part.get("text")
+                ]
+                if texts and first_text_time is None:
+                    first_text_time = now
+                    self._fire(scenario, "time_to_first_text", now - start_time)
+                if texts and not event.get("partial"):
+                    reply.extend(texts)
+            if not events_count:
+                response.failure("The stream ended without events")
+                return
+            self._fire(
+                scenario, "end", time.perf_counter() - start_time, response_length
+            )
+        for request_id in _REQUEST_ID_PATTERN.findall(" ".join(reply)):
+            if request_id not in self.known_request_ids:
+                self.known_request_ids.append(request_id)
+        del self.known_request_ids[:-50]
+
+    def _fire(
+        self, scenario: str, metric: str, seconds: float, response_length: int = 0
+    ) -> None:
+        self.environment.events.request.fire(
+            request_type="SSE",
+            name=f"{scenario} {metric}",
+            response_time=seconds * 1000,  # Convert to milliseconds
+            response_length=response_length,
+            exception=None,
+            context={},
+        )
+
+
+@events.init_command_line_parser.add_listener
+def _add_report_option(parser: Any) -> None:
+    parser.add_argument(
+        "--json-report",
+        type=str,
+        env_var="LOAD_TEST_JSON_REPORT",
+        default="",
+        help="Write per-scenario latency percentiles to this JSON file at the end of the run",
+    )
+
+
+@events.quitting.add_listener
+def _write_json_report(environment: Environment, **kwargs: Any) -> None:
+    """Write a machine-readable summary that can be diffed between releases."""
+    path = getattr(environment.parsed_options, "json_report", "")
+    if not path:
+        return
+    stats = environment.stats
+    entries = {}
+    for entry in sorted(stats.entries.values(), key=lambda e: (e.method, e.name)):
+        entries[f"{entry.method} {entry.name}"] = {
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "avg_ms": round(entry.avg_response_time, 1),
+            "min_ms": round(entry.min_response_time or 0, 1),
+            "max_ms": round(entry.max_response_time, 1),
+            **{
+                f"p{int(p * 100)}_ms": entry.get_response_time_percentile(p)
+                for p in REPORT_PERCENTILES
+            },
+            "rps": round(entry.total_rps, 3),
+        }
+    report = {
+        "host": environment.host,
+        "users": getattr(environment.parsed_options, "num_users", None),
+        "duration_seconds": round(stats.last_request_timestamp - stats.start_time, 1)
+        if stats.last_request_timestamp
+        else 0,
+        "total": {
+            "requests": stats.total.num_requests,
+            "failures": stats.total.num_failures,
+        },
+        "entries": entries,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from unittest import mock
+
+from app import agent
+
+
+def test_equivalent_specs_share_one_query_and_return_a_compact_table() -> None:
+    """Spellings that resolve to the same spec are served from the cache."""
+    agent.status_query_cache.invalidate(propagate=False)
+    rows = [
+        {"transport_mode": "Avión", "requests": 12, "avg_trip_days": 3.5},
+        {"transport_mode": "Tren", "requests": 7, "avg_trip_days": 2.0},
+    ]
+    with mock.patch.object(
+        agent._bigquery_travel_store, "aggregate", return_value=rows
+    ) as aggregate:
+        first = agent.get_travel_analytics(
+            ["transport_mode"], ["requests", "avg_trip_days"], statuses=["aprobada"]
+        )
+        second = agent.get_travel_analytics(
+            ["transport_mode", "transport_mode"],
+            ["requests", "avg_trip_days"],
+            statuses=["Aprobada", "aprobada"],
+        )
+
+    assert first == second
+    assert json.loads(first) == {
+        "columns": ["transport_mode", "requests", "avg_trip_days"],
+        "rows": [["Avión", 12, 3.5], ["Tren", 7, 2.0]],
+    }
+    aggregate.assert_called_once()
+
+
+def test_invalid_specs_are_rejected_before_querying() -> None:
+    """Unknown metrics, bad statuses and inverted ranges never reach BigQuery."""
+    with mock.patch.object(agent._bigquery_travel_store, "aggregate") as aggregate:
+        unknown = agent.get_travel_analytics(["destination_city"], ["salary"])
+        status = agent.get_travel_analytics(statuses=["Perdida"])
+        dates = agent.get_travel_analytics(
+            start_date_from="2025-06-01", start_date_to="2025-01-01"
+        )
+
+    assert all("error" in json.loads(result) for result in (unknown, status, dates))
+    aggregate.assert_not_called()
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+from google.adk.tools.function_tool import FunctionTool
+
+from app.utils import bigquery_client
+from app.utils.bigquery_client import as_async_tool, track_job
+
+TOOL_LATENCY_SECONDS = 0.2
+PARALLEL_CONVERSATIONS = 8
+
+
+def slow_lookup(request_id: str) -> str:
+    """Simula una consulta a BigQuery que bloquea el hilo."""
+    time.sleep(TOOL_LATENCY_SECONDS)
+    return f"Solicitud {request_id}"
+
+
+def stuck_update(request_id: str) -> str:
+    """Simula un trabajo DML que no termina."""
+    job = mock.Mock(job_id=f"job-{request_id}")
+    job.done.return_value = False
+    track_job(job)
+    stuck_update.jobs.append(job)  # type: ignore[attr-defined]
+    time.sleep(1)
+    return "done"
+
+
+stuck_update.jobs = []  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_parallel_conversations_do_not_serialize() -> None:
+    """N concurrent tool calls finish in roughly the time of one."""
+    tool = as_async_tool(slow_lookup)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(tool(request_id=str(i)) for i in range(PARALLEL_CONVERSATIONS))
+    )
+    elapsed = time.perf_counter() - start
+
+    assert results == [f"Solicitud {i}" for i in range(PARALLEL_CONVERSATIONS)]
+    assert elapsed < TOOL_LATENCY_SECONDS * PARALLEL_CONVERSATIONS / 2
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive() -> None:
+    """Other coroutines keep running while a tool call is in flight."""
+    tool = as_async_tool(slow_lookup)
+    ticks = 0
+
+    async def heartbeat() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    await tool(request_id="1")
+    beat.cancel()
+
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_tracked_jobs() -> None:
+    """A timed-out call returns the timeout message and cancels its jobs."""
+    tool = as_async_tool(stuck_update, timeout=0.1, timeout_message=lambda t: "timeout")
+
+    assert await tool(request_id="abc") == "timeout"
+    await asyncio.sleep(0.1)
+    stuck_update.jobs[-1].cancel.assert_called_once()  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_jobs_while_the_tool_pool_is_saturated() -> None:
+    """Cancellation does not wait behind the stuck work, and the outcome is reported as unknown."""
+    # The only worker stays busy with the stuck call until well after the timeout.
+    saturated = ThreadPoolExecutor(max_workers=1)
+    with mock.patch.object(bigquery_client, "_get_executor", return_value=saturated):
+        tool = as_async_tool(stuck_update, timeout=0.1)
+        result = await tool(request_id="saturated")
+        await asyncio.sleep(0.1)
+
+    assert "desconocido" in result
+    stuck_update.jobs[-1].cancel.assert_called_once()  # type: ignore[attr-defined]
+    saturated.shutdown(wait=True)
+
+
+def test_wrapper_keeps_tool_declaration() -> None:
+    """ADK exposes the async variant under the original name and parameters."""
+    declaration = FunctionTool(as_async_tool(slow_lookup))._get_declaration()
+
+    assert declaration is not None
+    assert declaration.name == "slow_lookup"
+    assert declaration.parameters is not None
+    assert list(declaration.parameters.properties or {}) == ["request_id"]
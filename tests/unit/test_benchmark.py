@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+from unittest import mock
+
+from app import agent
+from tests.benchmark.benchmark import compare_to_baseline
+from tests.benchmark.local_bigquery import LocalBigQueryClient
+
+ROW_COUNT = 50
+
+
+def test_tools_run_against_the_local_stand_in() -> None:
+    """Booking, paginated listing and status updates work on the SQLite stand-in."""
+    client = LocalBigQueryClient()
+    request_ids = client.seed(ROW_COUNT)
+    start = datetime.date.today() + datetime.timedelta(days=10)
+    agent.status_query_cache.invalidate()
+
+    with mock.patch.object(agent, "get_bigquery_client", return_value=client):
+        booked = agent.request_travel_booking_logic(
+            "Lucía",
+            "García",
+            "EMP-1042",
+            "Madrid",
+            "Bilbao",
+            start.isoformat(),
+            (start + datetime.timedelta(days=1)).isoformat(),
+            "Tren",
+            "Visita a cliente",
+        )
+        seen = []
+        page_token = None
+        while True:
+            page = json.loads(
+                agent.get_travel_requests_by_status("registrada", page_token=page_token)
+            )
+            seen += [request["request_id"] for request in page["requests"]]
+            page_token = page.get("next_page_token")
+            if not page_token:
+                break
+        updated = agent.update_travel_request_status(request_ids[0], "Cancelada")
+        unchanged = agent.update_travel_request_status(request_ids[0], "Cancelada")
+        missing = agent.update_travel_request_status("no-existe", "Cancelada")
+
+    assert "¡Solicitud registrada (DML)!" in booked
+    assert len(seen) == len(set(seen)) == page["count"]
+    assert any(request_id in booked for request_id in seen)
+    assert "actualizada a 'Cancelada'" in updated
+    assert "No se realizaron cambios" in unchanged
+    assert "No se encontró" in missing
+    assert client.stats()["rows"] == ROW_COUNT + 1
+
+
+def test_regressions_over_the_threshold_are_reported() -> None:
+    """Slower latency or lower throughput beyond the threshold is a regression."""
+    baseline = {"results": {"tool@1": {"p50_ms": 10.0, "throughput_per_s": 100.0}}}
+    within = {"results": {"tool@1": {"p50_ms": 11.0, "throughput_per_s": 95.0}}}
+    slower = {"results": {"tool@1": {"p50_ms": 15.0, "throughput_per_s": 60.0}}}
+
+    assert compare_to_baseline(within, baseline, threshold=0.25) == []
+    assert len(compare_to_baseline(slower, baseline, threshold=0.25)) == 2
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils import bigquery_client
+
+
+@pytest.fixture
+def build_client() -> Iterator[mock.Mock]:
+    bigquery_client.close_bigquery_client()
+    with mock.patch.object(bigquery_client, "_build_client") as build:
+        build.side_effect = lambda: (mock.Mock(), bigquery_client._KeepAliveAdapter())
+        yield build
+    bigquery_client.close_bigquery_client()
+
+
+def test_client_is_shared_and_rebuilt_after_close(build_client: mock.Mock) -> None:
+    """Every caller gets the same client until it is closed, which closes it once."""
+    first = bigquery_client.get_bigquery_client()
+    assert bigquery_client.get_bigquery_client() is first
+    assert build_client.call_count == 1
+
+    bigquery_client.close_bigquery_client()
+    first.close.assert_called_once_with()  # type: ignore[attr-defined]
+    assert not bigquery_client.get_pool_stats()["initialized"]
+
+    assert bigquery_client.get_bigquery_client() is not first
+    assert build_client.call_count == 2
+
+
+def test_pool_statistics_are_exposed_as_metrics(build_client: mock.Mock) -> None:
+    """The pool statistics are read when the registry is collected."""
+    before = bigquery_client.get_pool_stats()["client_acquisitions"]
+    bigquery_client.get_bigquery_client()
+    bigquery_client.get_bigquery_client()
+
+    stats = bigquery_client.get_pool_stats()
+
+    assert stats["initialized"] and stats["hosts"] == {}
+    assert stats["client_acquisitions"] == before + 2
+    assert (
+        REGISTRY.get_sample_value("travel_agent_bigquery_client_acquisitions")
+        == before + 2
+    )
+    assert (
+        REGISTRY.get_sample_value("travel_agent_bigquery_pool_connections_created") == 0
+    )
+    assert REGISTRY.get_sample_value("travel_agent_bigquery_pool_idle_connections") == 0
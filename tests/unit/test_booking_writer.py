@@ -0,0 +1,160 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.booking_writer import BatchedRowWriter
+
+
+def make_writer(client: Any, wal_path: Path, batch_size: int = 3) -> BatchedRowWriter:
+    return BatchedRowWriter(
+        "project.dataset.travel_requests",
+        row_id_field="request_id",
+        client_factory=lambda: client,
+        batch_size=batch_size,
+        flush_interval=60,
+        wal_path=str(wal_path),
+    )
+
+
+def rejected_rows() -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "travel_agent_booking_rows_total", {"outcome": "rejected"}
+        )
+        or 0.0
+    )
+
+
+def test_rows_are_flushed_in_batches_on_close(tmp_path: Path) -> None:
+    """Queued rows are written in batches of at most batch_size on shutdown."""
+    client = mock.Mock()
+    client.insert_rows_json.return_value = []
+    writer = make_writer(client, tmp_path / "bookings.wal", batch_size=3)
+
+    for i in range(5):
+        writer.submit({"request_id": f"id-{i}", "status": "Registrada"})
+    writer.close()
+
+    batches = [call.args[1] for call in client.insert_rows_json.call_args_list]
+    assert sum(len(batch) for batch in batches) == 5
+    assert max(len(batch) for batch in batches) <= 3
+    assert writer.stats()["flushed_rows"] == 5
+    assert writer.stats()["queue_depth"] == 0
+    assert (tmp_path / "bookings.wal").read_text() == ""
+
+
+def test_unflushed_rows_are_replayed_after_restart(tmp_path: Path) -> None:
+    """Rows acknowledged before a failed flush are written by the next process."""
+    wal_path = tmp_path / "bookings.wal"
+    broken = mock.Mock()
+    broken.insert_rows_json.side_effect = ConnectionError("unreachable")
+    writer = make_writer(broken, wal_path)
+    writer.submit({"request_id": "id-1", "status": "Registrada"})
+    writer.flush()
+    assert writer.stats()["failed_flushes"] == 1
+
+    client = mock.Mock()
+    client.insert_rows_json.return_value = []
+    restarted = make_writer(client, wal_path)
+    restarted.start()
+    restarted.close()
+
+    client.insert_rows_json.assert_called_once_with(
+        "project.dataset.travel_requests",
+        [{"request_id": "id-1", "status": "Registrada"}],
+        row_ids=["id-1"],
+    )
+
+
+def test_rejected_rows_are_dead_lettered_not_dropped(tmp_path: Path) -> None:
+    """Rows BigQuery rejects are kept with their errors and counted."""
+    wal_path = tmp_path / "bookings.wal"
+    client = mock.Mock()
+    client.insert_rows_json.return_value = [
+        {"index": 1, "errors": [{"reason": "invalid"}]}
+    ]
+    writer = make_writer(client, wal_path)
+    rejected_before = rejected_rows()
+
+    writer.submit({"request_id": "id-1", "status": "Registrada"})
+    writer.submit({"request_id": "id-2", "status": 7})
+    writer.flush()
+
+    [line] = (tmp_path / "bookings.wal.rejected").read_text().splitlines()
+    assert json.loads(line)["row"] == {"request_id": "id-2", "status": 7}
+    assert json.loads(line)["errors"] == [{"reason": "invalid"}]
+    assert writer.stats()["dead_letter_rows"] == 1
+    assert rejected_rows() == rejected_before + 1
+    assert wal_path.read_text() == ""
+
+
+def test_rejected_rows_stay_in_the_log_when_they_cannot_be_set_aside(
+    tmp_path: Path,
+) -> None:
+    """If the dead-letter file is unwritable the rejected row stays logged, unretried."""
+    wal_path = tmp_path / "bookings.wal"
+    client = mock.Mock()
+    client.insert_rows_json.return_value = [
+        {"index": 0, "errors": [{"reason": "invalid"}]}
+    ]
+    writer = make_writer(client, wal_path)
+    # A directory cannot be opened for appending.
+    writer.dead_letter_path = str(tmp_path)
+
+    writer.submit({"request_id": "id-1", "status": 7})
+    writer.close()
+
+    client.insert_rows_json.assert_called_once()
+    assert writer.stats()["queue_depth"] == 0
+    assert writer.stats()["pending_dead_letter_rows"] == 1
+    assert json.loads(wal_path.read_text())["request_id"] == "id-1"
+
+    restarted = make_writer(client, wal_path)
+    restarted.start()
+    restarted.close()
+
+    assert restarted.stats()["dead_letter_rows"] == 1
+    assert wal_path.read_text() == ""
+
+
+def test_wal_path_may_be_a_bare_file_name(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A log path without a directory is relative to the working directory."""
+    monkeypatch.chdir(tmp_path)
+    client = mock.Mock()
+    client.insert_rows_json.return_value = []
+    writer = make_writer(client, Path("bookings.wal"))
+
+    writer.submit({"request_id": "id-1", "status": "Registrada"})
+    writer.close()
+
+    assert writer.stats()["flushed_rows"] == 1
+
+
+def test_streaming_requires_a_wal_path() -> None:
+    """Without a persistent log path the writer refuses to start."""
+    writer = BatchedRowWriter(
+        "project.dataset.travel_requests", "request_id", wal_path=None
+    )
+
+    with pytest.raises(RuntimeError, match="BOOKING_WAL_PATH"):
+        writer.submit({"request_id": "id-1"})
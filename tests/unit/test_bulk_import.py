@@ -0,0 +1,113 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+from typing import Any
+from unittest import mock
+
+from app.utils import bulk_import
+from app.utils.bulk_import import LoadJobImporter, iter_records
+
+
+def make_importer(
+    max_errors: int = 10,
+) -> tuple[LoadJobImporter, mock.Mock, list[bytes]]:
+    client = mock.Mock()
+    staged: list[bytes] = []
+
+    def load_table_from_file(
+        file: Any, table: str, rewind: bool, job_config: Any
+    ) -> mock.Mock:
+        if rewind:
+            file.seek(0)
+        staged.append(file.read())
+        return mock.Mock(job_id="load-1")
+
+    client.load_table_from_file.side_effect = load_table_from_file
+    importer = LoadJobImporter(
+        "p.d.t", client_factory=lambda: client, max_errors=max_errors
+    )
+    return importer, client, staged
+
+
+def prepare(record: dict[str, Any]) -> dict[str, Any]:
+    if "city" not in record:
+        raise ValueError("city: Field required")
+    return {"city": record["city"].strip()}
+
+
+def test_csv_and_jsonl_parse_errors_keep_their_line_numbers() -> None:
+    """Malformed lines are reported where they are and do not stop parsing."""
+    upload = io.BytesIO("\ufeffcity,days\nBilbao,\nMadrid,2,extra\n".encode())
+    csv_rows = list(iter_records(upload, "csv"))
+    jsonl_rows = list(
+        iter_records(io.BytesIO(b'{"city": "Bilbao"}\n\n[1]\n{oops\n'), "jsonl")
+    )
+
+    assert csv_rows == [
+        (2, {"city": "Bilbao"}, None),
+        (3, None, "More values than header columns"),
+    ]
+    assert [(line, error is None) for line, _, error in jsonl_rows] == [
+        (1, True),
+        (3, False),
+        (4, False),
+    ]
+
+
+def test_valid_rows_are_loaded_in_one_job() -> None:
+    """Valid rows go to a single load job; invalid ones are reported up to max_errors."""
+    importer, client, staged = make_importer(max_errors=1)
+    upload = io.BytesIO(
+        b'{"city": " Bilbao "}\n{"days": 1}\n{"days": 2}\n{"city": "Sevilla"}\n'
+    )
+
+    result = importer.run(upload, "jsonl", prepare)
+
+    assert client.load_table_from_file.call_count == 1
+    assert [json.loads(line) for line in staged[0].splitlines()] == [
+        {"city": "Bilbao"},
+        {"city": "Sevilla"},
+    ]
+    assert (result.loaded, result.rejected, result.job_id) == (2, 2, "load-1")
+    assert result.errors == [{"line": 2, "error": "city: Field required"}]
+    assert result.errors_truncated
+    assert not upload.closed
+
+
+def test_loaded_rows_are_passed_on_in_batches() -> None:
+    """on_loaded sees every loaded row once the job succeeded, and nothing is loaded for no rows."""
+    importer, client, _ = make_importer()
+    batches: list[int] = []
+    upload = "".join(json.dumps({"city": f"c{i}"}) + "\n" for i in range(5)).encode()
+
+    with mock.patch.object(bulk_import, "_LOADED_BATCH_SIZE", 2):
+        result = importer.run(
+            io.BytesIO(upload),
+            "jsonl",
+            prepare,
+            on_loaded=lambda rows: batches.append(len(rows)),
+        )
+    empty = importer.run(
+        io.BytesIO(b'{"days": 1}\n'),
+        "jsonl",
+        prepare,
+        on_loaded=lambda rows: batches.append(0),
+    )
+
+    assert result.loaded == 5
+    assert batches == [2, 2, 1]
+    assert (empty.loaded, empty.job_id) == (0, None)
+    assert client.load_table_from_file.call_count == 1
@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from unittest import mock
+
+from app.utils.cache import GcsGeneration, TTLCache
+
+
+class FakeGeneration:
+    """In-memory stand-in for a generation shared between instances."""
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def current(self) -> int:
+        return self.value
+
+    def bump(self) -> None:
+        self.value += 1
+
+
+def test_lru_eviction_and_counters() -> None:
+    """The least recently used entry is evicted and hits/misses are counted."""
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set(("Aprobada",), "a")
+    cache.set(("Rechazada",), "r")
+    assert cache.get(("Aprobada",)) == "a"
+    cache.set(("Cancelada",), "c")
+
+    assert cache.get(("Rechazada",)) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+        "invalidations": 0,
+        "size": 2,
+    }
+
+
+def test_entries_expire_after_ttl() -> None:
+    """Entries are not served once their TTL has elapsed."""
+    cache = TTLCache(maxsize=2, ttl_seconds=0.05)
+    cache.set("key", "value")
+    time.sleep(0.1)
+
+    assert cache.get("key") is None
+
+
+def test_values_computed_before_invalidation_are_discarded() -> None:
+    """A read that raced with a write does not repopulate the cache."""
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    version = cache.version()
+    cache.invalidate()
+    cache.set("key", "stale", version=version)
+
+    assert cache.get("key") is None
+
+
+def test_shared_invalidation_reaches_other_instances() -> None:
+    """An invalidation on one instance clears the cache of another."""
+    shared = FakeGeneration()
+    writer = TTLCache(maxsize=2, ttl_seconds=60, shared=shared)
+    reader = TTLCache(maxsize=2, ttl_seconds=60, shared=shared)
+    reader.get("key")
+    reader.set("key", "value")
+    assert reader.get("key") == "value"
+
+    writer.invalidate()
+
+    assert reader.get("key") is None
+
+
+class SlowBlob:
+    """Stands in for the generation object; every call takes ``delay`` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.generation = 1
+        self.uploads = 0
+        self.reloads = 0
+
+    def upload_from_string(self, data: str, content_type: str) -> None:
+        time.sleep(self.delay)
+        self.uploads += 1
+        self.generation += 1
+
+    def reload(self) -> None:
+        time.sleep(self.delay)
+        self.reloads += 1
+
+
+def test_gcs_bumps_are_merged_into_one_background_write() -> None:
+    """Bumps and reads return at once; bumps of one interval cost one upload."""
+    blob = SlowBlob(delay=0.05)
+    client = mock.Mock()
+    client.bucket.return_value.blob.return_value = blob
+    shared = GcsGeneration(
+        "bucket", "generation", poll_interval=0.2, storage_client=client
+    )
+
+    start = time.monotonic()
+    for _ in range(20):
+        shared.bump()
+        shared.current()
+    assert time.monotonic() - start < 0.05
+
+    time.sleep(0.5)
+    assert blob.uploads == 1
+    assert shared.current() == 2
+    shared.bump()
+    shared.close()
+    assert blob.uploads == 2
+    assert shared.current() == 3
@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from unittest import mock
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.agent import (
+    _FAST_PATH_REQUEST_PATTERN,
+    _FAST_PATH_STATUS_PATTERN,
+)
+from app.utils.fast_path import FastPathRouter, Route
+
+
+def user_request(text: str) -> LlmRequest:
+    return LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])]
+    )
+
+
+def make_router(reply: str | None = "Hay 2 solicitudes aprobadas.") -> FastPathRouter:
+    async def handler(match: re.Match[str], callback_context: object) -> str | None:
+        return reply
+
+    return FastPathRouter(
+        [Route("status", re.compile(r"aprobadas\??", re.IGNORECASE), handler)]
+    )
+
+
+@pytest.mark.asyncio
+async def test_matching_message_skips_the_model() -> None:
+    """A message that fully matches a route is answered from the handler."""
+    router = make_router()
+
+    response = await router.before_model_callback(
+        mock.Mock(invocation_id="1"), user_request("  Aprobadas? ")
+    )
+
+    assert response is not None
+    assert response.content == types.Content(
+        role="model", parts=[types.Part(text="Hay 2 solicitudes aprobadas.")]
+    )
+    assert router.stats()["routes"]["status"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_partial_match_and_declined_route_reach_the_model() -> None:
+    """Messages with extra content, and handlers returning None, fall through."""
+    router = make_router()
+    assert (
+        await router.before_model_callback(
+            mock.Mock(invocation_id="1"), user_request("aprobadas y rechazadas")
+        )
+        is None
+    )
+
+    declining = make_router(reply=None)
+    assert (
+        await declining.before_model_callback(
+            mock.Mock(invocation_id="2"), user_request("aprobadas")
+        )
+        is None
+    )
+    assert declining.stats()["routes"]["status"]["declined"] == 1
+
+
+@pytest.mark.asyncio
+async def test_model_turns_are_timed_until_the_final_reply() -> None:
+    """Tool round trips inside a model turn are not routed nor counted as the end."""
+    router = make_router()
+    context = mock.Mock(invocation_id="1")
+    await router.before_model_callback(context, user_request("hola"))
+
+    tool_response = LlmRequest(
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            name="lookup", response={"result": "aprobadas"}
+                        )
+                    )
+                ],
+            )
+        ]
+    )
+    assert await router.before_model_callback(context, tool_response) is None
+    await router.after_model_callback(
+        context,
+        LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(name="lookup"))],
+            )
+        ),
+    )
+    assert router.stats()["model"]["turns"] == 0
+
+    await router.after_model_callback(
+        context,
+        LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")])),
+    )
+    stats = router.stats()
+    assert stats["turns"] == 1
+    assert stats["model"]["turns"] == 1
+
+
+@pytest.mark.parametrize(
+    "message, status",
+    [
+        ("¿Cuáles están aprobadas?", "aprobada"),
+        ("muéstrame las solicitudes canceladas", "cancelada"),
+        ("solicitudes pendientes de aprobación", "pendiente"),
+    ],
+)
+def test_status_pattern_matches_listing_requests(message: str, status: str) -> None:
+    match = _FAST_PATH_STATUS_PATTERN.fullmatch(message)
+    assert match is not None
+    assert match.group("status").lower() == status
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["¿cuáles están aprobadas este mes?", "aprueba las pendientes", "canceladas"],
+)
+def test_status_pattern_ignores_ambiguous_requests(message: str) -> None:
+    assert _FAST_PATH_STATUS_PATTERN.fullmatch(message) is None
+
+
+def test_request_pattern_extracts_the_id() -> None:
+    match = _FAST_PATH_REQUEST_PATTERN.fullmatch(
+        "Estado de la solicitud 3f2b8c1e-0d4a-4e6b-9a7c-1b2c3d4e5f60?"
+    )
+    assert match is not None
+    assert match.group("request_id") == "3f2b8c1e-0d4a-4e6b-9a7c-1b2c3d4e5f60"
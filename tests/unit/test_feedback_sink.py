@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from app.utils.feedback_sink import FeedbackSink, cloud_logging_batch_writer
+
+
+def make_record(i: int) -> dict[str, object]:
+    return {"score": 1, "invocation_id": f"inv-{i}", "log_type": "feedback"}
+
+
+def make_sink(write_batch: mock.Mock, tmp_path: Path, **kwargs: int) -> FeedbackSink:
+    return FeedbackSink(
+        write_batch,
+        flush_interval=60,
+        spill_path=str(tmp_path / "feedback.spill"),
+        retry_seconds=0,
+        **kwargs,
+    )
+
+
+def test_submit_does_not_wait_for_a_slow_backend(tmp_path: Path) -> None:
+    """Records are acknowledged immediately and written in batches on close."""
+    release = threading.Event()
+    write_batch = mock.Mock(side_effect=lambda records: release.wait())
+    sink = make_sink(write_batch, tmp_path, batch_size=10)
+
+    start = time.perf_counter()
+    for i in range(25):
+        sink.submit(make_record(i))
+    elapsed = time.perf_counter() - start
+    release.set()
+    sink.close()
+
+    assert elapsed < 0.5
+    assert [len(call.args[0]) for call in write_batch.call_args_list] == [10, 10, 5]
+    assert sink.stats()["written"] == 25
+
+
+def test_failed_batches_are_retried_then_spilled_and_restored(tmp_path: Path) -> None:
+    """A batch is retried, spilled after max_retries, and written by the next sink."""
+    failing = mock.Mock(side_effect=RuntimeError("unavailable"))
+    sink = make_sink(failing, tmp_path, batch_size=10, max_retries=3)
+    for i in range(4):
+        sink.submit(make_record(i))
+    sink.close()
+
+    assert failing.call_count == 3
+    assert sink.stats()["spilled"] == 4
+
+    working = mock.Mock()
+    restarted = make_sink(working, tmp_path, batch_size=10)
+    restarted.flush()
+
+    working.assert_called_once()
+    assert [r["invocation_id"] for r in working.call_args.args[0]] == [
+        f"inv-{i}" for i in range(4)
+    ]
+    assert not (tmp_path / "feedback.spill").exists()
+
+
+def test_close_spills_the_whole_buffer_after_a_failed_batch(tmp_path: Path) -> None:
+    """One failed batch on close spills every record still buffered, not just that batch."""
+    failing = mock.Mock(side_effect=RuntimeError("unavailable"))
+    sink = make_sink(failing, tmp_path, batch_size=10, max_retries=1)
+    for i in range(30):
+        sink.submit(make_record(i))
+    sink.close()
+
+    stats = sink.stats()
+    assert stats["spilled"] == 30
+    assert stats["buffered"] == 0
+    assert len((tmp_path / "feedback.spill").read_text().splitlines()) == 30
+
+
+def test_unwritable_spill_file_drops_records(tmp_path: Path) -> None:
+    """A spill that cannot be written is counted as dropped instead of failing submit."""
+    (tmp_path / "not-a-directory").write_text("")
+    sink = FeedbackSink(
+        mock.Mock(),
+        max_buffer=1,
+        flush_interval=60,
+        spill_path=str(tmp_path / "not-a-directory" / "feedback.spill"),
+    )
+
+    sink.submit(make_record(0))
+    sink.submit(make_record(1))
+
+    assert sink.stats()["dropped"] == 1
+    sink.close()
+    assert sink.stats()["written"] == 1
+
+
+def test_full_buffer_spills_to_disk(tmp_path: Path) -> None:
+    """Records beyond max_buffer go to the spill file instead of being dropped."""
+    write_batch = mock.Mock()
+    sink = make_sink(write_batch, tmp_path, max_buffer=3, batch_size=100)
+
+    for i in range(5):
+        sink.submit(make_record(i))
+
+    assert sink.stats()["buffered"] == 3
+    assert sink.stats()["spilled"] == 2
+    sink.close()
+    assert sum(len(call.args[0]) for call in write_batch.call_args_list) == 5
+
+
+def test_cloud_logging_writer_uses_one_batch_per_call() -> None:
+    """Each batch of records is committed through a single logger batch."""
+    logger = mock.MagicMock()
+    write = cloud_logging_batch_writer(logger)
+
+    write([make_record(i) for i in range(3)])
+
+    logger.batch.assert_called_once()
+    batch = logger.batch.return_value.__enter__.return_value
+    assert batch.log_struct.call_count == 3
@@ -0,0 +1,170 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid
+from unittest import mock
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app.agent import _booking_facts
+from app.utils.history import HistoryCompactor, estimate_tokens
+
+TURNS = 30
+TOKEN_BUDGET = 3000
+
+
+def listing(request_ids: list[str]) -> dict:
+    return {
+        "search_term": "aprobada",
+        "count": 42,
+        "requests": [
+            {
+                "request_id": request_id,
+                "employee_name": "Ana Gil",
+                "destination_city": "Roma",
+                "start_date": "2025-09-01",
+                "end_date": "2025-09-03",
+                "reason": "Congreso anual de ventas con clientes de la región sur",
+                "status": "Aprobada",
+            }
+            for request_id in request_ids
+        ],
+    }
+
+
+def conversation_turn(turn: int) -> list[types.Content]:
+    """A status query: user message, tool call, ten-record result and model summary."""
+    request_ids = [str(uuid.UUID(int=turn * 100 + i)) for i in range(10)]
+    return [
+        types.Content(
+            role="user",
+            parts=[types.Part(text=f"Turno {turn}: ¿cuáles están aprobadas?")],
+        ),
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="get_travel_requests_by_status",
+                        args={"search_term": "aprobada"},
+                    )
+                )
+            ],
+        ),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        name="get_travel_requests_by_status",
+                        response=listing(request_ids),
+                    )
+                )
+            ],
+        ),
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    text="He encontrado 42 solicitudes. "
+                    + " ".join(
+                        f"ID: {request_id}, Destino: Roma."
+                        for request_id in request_ids
+                    )
+                )
+            ],
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_turn_stay_flat_over_30_turns() -> None:
+    """Benchmark: the request size stops growing once the budget is reached."""
+    compactor = HistoryCompactor(
+        fact_extractor=_booking_facts, token_budget=TOKEN_BUDGET, keep_recent_turns=2
+    )
+    history: list[types.Content] = []
+    sent_tokens = []
+    raw_tokens = []
+    for turn in range(TURNS):
+        history += conversation_turn(turn)
+        request = LlmRequest(contents=list(history))
+        await compactor.before_model_callback(mock.Mock(), request)
+        raw_tokens.append(estimate_tokens(history))
+        sent_tokens.append(estimate_tokens(request.contents))
+
+    print(f"tokens per turn (raw):       {raw_tokens}")
+    print(f"tokens per turn (compacted): {sent_tokens}")
+    steady = sent_tokens[TURNS // 3 :]
+    assert raw_tokens[-1] > 8 * TOKEN_BUDGET
+    assert max(sent_tokens) <= TOKEN_BUDGET
+    assert max(steady) - min(steady) <= 0.1 * TOKEN_BUDGET
+    assert compactor.stats()["compacted_requests"] > 0
+
+
+def test_booking_facts_survive_compaction() -> None:
+    """Collected booking details and the latest request IDs stay in the summary."""
+    booking_id = str(uuid.uuid4())
+    history = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    text="Quiero ir de Madrid a Roma del 2025-09-01 al 2025-09-03"
+                )
+            ],
+        ),
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="request_travel_booking_logic",
+                        args={"origin_city": "Madrid", "destination_city": "Roma"},
+                    )
+                )
+            ],
+        ),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        name="request_travel_booking_logic",
+                        response={
+                            "result": f"Solicitud registrada con ID: {booking_id}"
+                        },
+                    )
+                )
+            ],
+        ),
+    ]
+    for turn in range(10):
+        history += conversation_turn(turn)
+    compactor = HistoryCompactor(
+        fact_extractor=_booking_facts, token_budget=1000, keep_recent_turns=1
+    )
+
+    compacted, dropped_turns = compactor.compact(history)
+
+    assert compacted[0].parts
+    summary = compacted[0].parts[0].text or ""
+    assert dropped_turns == 10
+    assert "destination_city=Roma" in summary
+    assert "Quiero ir de Madrid a Roma" in summary
+    assert booking_id in summary
+    assert str(uuid.UUID(int=909)) in summary
+    assert compacted[1:] == history[-4:]
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from app import agent
+from app.utils.idempotency import IdempotencyStore, idempotency_key
+from tests.benchmark.local_bigquery import LocalBigQueryClient
+
+
+def test_key_ignores_case_and_spacing_but_not_scope() -> None:
+    """A rephrased retry maps to the same key, another session does not."""
+    key = idempotency_key("s1", {"destination_city": "San Sebastián", "car_type": None})
+
+    assert key == idempotency_key(
+        "s1", {"destination_city": " san  sebastián", "car_type": None}
+    )
+    assert key != idempotency_key(
+        "s2", {"destination_city": "San Sebastián", "car_type": None}
+    )
+
+
+def test_results_are_replayed_until_they_expire_and_failures_are_not_kept() -> None:
+    """The store replays kept results within the window and stays bounded."""
+    store = IdempotencyStore(maxsize=2, ttl_seconds=0.05)
+
+    assert store.run("a", lambda: "ok-1") == ("ok-1", False)
+    assert store.run("a", lambda: "ok-2") == ("ok-1", True)
+    assert store.run("b", lambda: "error", keep=lambda result: result != "error") == (
+        "error",
+        False,
+    )
+    assert store.run("b", lambda: "ok-b") == ("ok-b", False)
+    store.run("c", lambda: "ok-c")
+    assert store.stats()["evictions"] == 1
+    time.sleep(0.06)
+    assert store.run("c", lambda: "ok-c2") == ("ok-c2", False)
+    assert store.stats()["size"] == 1
+
+
+def test_concurrent_duplicates_compute_once() -> None:
+    """Parallel calls with the same key wait for the first one."""
+    store = IdempotencyStore(maxsize=8, ttl_seconds=60)
+    calls = []
+    release = threading.Event()
+
+    def compute() -> str:
+        calls.append(1)
+        release.wait(1)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(store.run, "k", compute) for _ in range(4)]
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True]
+
+
+def test_repeated_booking_in_a_session_returns_the_original_request() -> None:
+    """The second identical booking call runs no DML and confirms the same request ID."""
+    client = LocalBigQueryClient()
+    client.seed(10)
+    start = datetime.date.today() + datetime.timedelta(days=10)
+    tool_context = mock.Mock()
+    tool_context._invocation_context.session.user_id = "u"
+    tool_context._invocation_context.session.id = "s"
+    args = {
+        "employee_first_name": "Lucía",
+        "employee_last_name": "García",
+        "employee_id": "EMP-1042",
+        "origin_city": "Madrid",
+        "destination_city": "Bilbao",
+        "start_date": start.isoformat(),
+        "end_date": (start + datetime.timedelta(days=1)).isoformat(),
+        "transport_mode": "Tren",
+        "reason": "Visita a cliente",
+    }
+
+    with (
+        mock.patch.object(agent, "get_bigquery_client", return_value=client),
+        mock.patch.object(agent, "booking_dedupe", IdempotencyStore()),
+    ):
+        first = agent.request_travel_booking_logic(**args, tool_context=tool_context)
+        queries = client.stats()["queries"]
+        args["destination_city"] = "bilbao "
+        second = agent.request_travel_booking_logic(**args, tool_context=tool_context)
+
+    assert first.startswith("¡Solicitud registrada")
+    assert second == first
+    assert client.stats()["queries"] == queries
@@ -0,0 +1,211 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from google.adk.agents import LiveRequestQueue
+from google.adk.events.event import Event
+from google.adk.sessions import InMemorySessionService
+from google.adk.sessions.session import Session
+from google.genai import types
+from prometheus_client import REGISTRY
+
+from app import agent
+from app.utils.live import LiveBridge, LiveTurn
+
+
+def sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def text_event(text: str, partial: bool) -> Event:
+    return Event(
+        author="root_agent",
+        partial=partial,
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+    )
+
+
+class EchoRunner:
+    """Stands in for a live Runner: streams the user text back in two chunks after a tool call."""
+
+    app_name = "app"
+
+    def __init__(self) -> None:
+        self.session_service = InMemorySessionService()
+
+    async def run_live(
+        self, session: Session, live_request_queue: LiveRequestQueue, run_config: Any
+    ) -> AsyncIterator[Event]:
+        while True:
+            request = await live_request_queue.get()
+            if request.close:
+                return
+            assert request.content is not None and request.content.parts
+            text = request.content.parts[0].text or ""
+            yield Event(
+                author="root_agent",
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(
+                                name="lookup", args={"q": text}
+                            )
+                        )
+                    ],
+                ),
+            )
+            yield Event(
+                author="root_agent",
+                content=types.Content(
+                    role="user",
+                    parts=[
+                        types.Part(
+                            function_response=types.FunctionResponse(
+                                name="lookup", response={}
+                            )
+                        )
+                    ],
+                ),
+            )
+            yield text_event(text[:3], partial=True)
+            yield text_event(text[3:], partial=True)
+            yield Event(
+                author="root_agent",
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=100, candidates_token_count=len(text)
+                ),
+            )
+            yield Event(author="root_agent", turn_complete=True)
+
+
+def live_app(bridge: LiveBridge) -> FastAPI:
+    app = FastAPI()
+
+    @app.websocket("/live")
+    async def live(
+        websocket: WebSocket, user_id: str, session_id: str | None = None
+    ) -> None:
+        await bridge.serve(websocket, user_id, session_id)
+
+    return app
+
+
+def converse(client: TestClient, url: str, texts: list[str]) -> tuple[str, list[dict]]:
+    received = []
+    with client.websocket_connect(url) as websocket:
+        session_id = websocket.receive_json()["session_id"]
+        for text in texts:
+            websocket.send_json({"type": "text", "text": text})
+            while (message := websocket.receive_json())["type"] != "turn_complete":
+                received.append(message)
+        websocket.send_json({"type": "close"})
+    return session_id, received
+
+
+def test_interrupt_drops_the_rest_of_the_answer() -> None:
+    """Partial text streams until the client interrupts; the next turn streams again."""
+    turn = LiveTurn()
+    assert not turn.interrupt()
+    turn.active = True
+
+    first = turn.messages(text_event("Hola", partial=True))
+    assert turn.interrupt()
+    dropped = turn.messages(text_event(", Lucía", partial=True)) + turn.messages(
+        text_event("Hola, Lucía", partial=False)
+    )
+    done = turn.messages(Event(author="root_agent", turn_complete=True))
+    unstreamed = turn.messages(text_event("Adiós", partial=False))
+
+    assert first == [{"type": "text", "text": "Hola", "partial": True}]
+    assert dropped == []
+    assert done == [{"type": "turn_complete"}]
+    assert unstreamed == [{"type": "text", "text": "Adiós", "partial": False}]
+
+
+def test_a_connection_keeps_its_session_across_turns_and_reconnects() -> None:
+    """Turns share one session, stream text and tool calls, and are stored for a reconnect."""
+    runner = EchoRunner()
+    bridge = LiveBridge(runner)  # type: ignore[arg-type]
+
+    with TestClient(live_app(bridge)) as client:
+        session_id, received = converse(
+            client, "/live?user_id=u", ["Barcelona", "Bilbao"]
+        )
+        resumed_id, _ = converse(
+            client, f"/live?user_id=u&session_id={session_id}", ["Sevilla"]
+        )
+        assert client.portal is not None
+        session = client.portal.call(
+            lambda: runner.session_service.get_session(
+                app_name="app", user_id="u", session_id=session_id
+            )
+        )
+
+    assert received[:4] == [
+        {"type": "tool_call", "name": "lookup", "args": {"q": "Barcelona"}},
+        {"type": "tool_result", "name": "lookup"},
+        {"type": "text", "text": "Bar", "partial": True},
+        {"type": "text", "text": "celona", "partial": True},
+    ]
+    assert len(received) == 8
+    assert resumed_id == session_id
+    user_texts = [
+        event.content.parts[0].text
+        for event in session.events
+        if event.author == "user"
+    ]
+    assert user_texts == ["Barcelona", "Bilbao", "Sevilla"]
+
+
+def test_live_agent_keeps_the_tool_callbacks_only() -> None:
+    """The live flow runs tool callbacks but never model callbacks, so only those are kept."""
+    assert (
+        agent.live_agent.before_tool_callback == agent.root_agent.before_tool_callback
+    )
+    assert agent.live_agent.after_tool_callback == agent.root_agent.after_tool_callback
+    assert agent.live_agent.before_tool_callback is not None
+    assert agent.live_agent.before_model_callback is None
+    assert agent.live_agent.after_model_callback is None
+
+
+def test_the_bridge_records_model_metrics_per_turn() -> None:
+    """Each completed turn is timed and the token usage of its events is counted."""
+    bridge = LiveBridge(EchoRunner(), model="live-test-model")  # type: ignore[arg-type]
+    labels = {"model": "live-test-model"}
+    calls = sample("travel_agent_model_call_seconds_count", labels)
+    prompt_tokens = sample(
+        "travel_agent_model_tokens_total", {**labels, "kind": "prompt"}
+    )
+    output_tokens = sample(
+        "travel_agent_model_tokens_total", {**labels, "kind": "output"}
+    )
+
+    with TestClient(live_app(bridge)) as client:
+        converse(client, "/live?user_id=u", ["Barcelona", "Bilbao"])
+
+    assert sample("travel_agent_model_call_seconds_count", labels) == calls + 2
+    assert (
+        sample("travel_agent_model_tokens_total", {**labels, "kind": "prompt"})
+        == prompt_tokens + 200
+    )
+    assert (
+        sample("travel_agent_model_tokens_total", {**labels, "kind": "output"})
+        == output_tokens + 15
+    )
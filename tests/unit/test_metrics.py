@@ -0,0 +1,185 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from unittest import mock
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from prometheus_client import REGISTRY, generate_latest
+
+from app.utils.metrics import (
+    MODEL_CALL_SECONDS,
+    ActiveStreamsMiddleware,
+    AgentMetrics,
+    is_tool_error,
+    record_bigquery_jobs,
+    record_model_usage,
+)
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_are_exposed_in_text_format() -> None:
+    """Counters get a _total suffix and histograms the latency buckets."""
+    record_model_usage(
+        "render-model",
+        types.GenerateContentResponseUsageMetadata(prompt_token_count=12),
+    )
+    MODEL_CALL_SECONDS.labels(model="render-model").observe(0.2)
+
+    text = generate_latest(REGISTRY).decode()
+
+    assert "# TYPE travel_agent_model_tokens_total counter" in text
+    assert (
+        'travel_agent_model_tokens_total{kind="prompt",model="render-model"} 12.0'
+        in text
+    )
+    assert (
+        'travel_agent_model_call_seconds_bucket{le="0.25",model="render-model"} 1.0'
+        in text
+    )
+
+
+def test_finished_jobs_are_recorded_without_api_calls() -> None:
+    """Job statistics are read from done jobs only; running ones are skipped."""
+    started = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    done = mock.Mock(
+        state="DONE",
+        statement_type="SELECT",
+        cache_hit=False,
+        total_bytes_processed=2048,
+        total_bytes_billed=10_485_760,
+        slot_millis=120,
+        started=started,
+        ended=started + datetime.timedelta(seconds=2),
+    )
+    running = mock.Mock(state="RUNNING")
+    bytes_name = "travel_agent_bigquery_bytes_processed_total"
+    jobs_name = "travel_agent_bigquery_job_seconds_count"
+    bytes_before = sample(bytes_name, tool="test_tool")
+    jobs_before = sample(jobs_name, tool="test_tool")
+
+    record_bigquery_jobs("test_tool", [done, running])
+
+    assert sample(bytes_name, tool="test_tool") == bytes_before + 2048
+    assert sample(jobs_name, tool="test_tool") == jobs_before + 1
+    running.reload.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_agent_callbacks_time_model_and_tool_calls() -> None:
+    """Model calls record latency and tokens; tool calls their source and outcome."""
+    metrics = AgentMetrics()
+    context = mock.Mock(invocation_id="inv-1")
+    calls_name = "travel_agent_model_call_seconds_count"
+    tokens_name = "travel_agent_model_tokens_total"
+    model_calls = sample(calls_name, model="test-model")
+    prompt_tokens = sample(tokens_name, model="test-model", kind="prompt")
+
+    await metrics.before_model_callback(context, LlmRequest(model="test-model"))
+    await metrics.after_model_callback(context, LlmResponse(partial=True))
+    await metrics.after_model_callback(
+        context,
+        LlmResponse(
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=900, candidates_token_count=40
+            )
+        ),
+    )
+
+    assert sample(calls_name, model="test-model") == model_calls + 1
+    assert sample(tokens_name, model="test-model", kind="prompt") == prompt_tokens + 900
+
+    tool = mock.Mock(func=None)
+    tool.name = "test_lookup"
+    tool_context = mock.Mock(function_call_id="call-1")
+    tool_calls_name = "travel_agent_tool_call_seconds_count"
+    errors = sample(
+        tool_calls_name, tool="test_lookup", source="function", outcome="error"
+    )
+
+    metrics.before_tool_callback(tool, {}, tool_context)
+    metrics.after_tool_callback(tool, {}, tool_context, "Error técnico: sin conexión")
+    metrics.after_tool_callback(tool, {}, tool_context, "Error técnico: sin conexión")
+
+    assert (
+        sample(tool_calls_name, tool="test_lookup", source="function", outcome="error")
+        == errors + 1
+    )
+
+
+@pytest.mark.parametrize(
+    ("response", "failed"),
+    [
+        ("Error técnico: sin conexión", True),
+        ('{"error": "Error de validación: falta request_id"}', True),
+        ({"error": "timeout"}, True),
+        ('{"count": 0, "requests": []}', False),
+        ("{no es JSON", False),
+        ('["error"]', False),
+        ({"result": "ok"}, False),
+    ],
+)
+def test_json_and_dict_errors_count_as_failed_tool_calls(
+    response: object, failed: bool
+) -> None:
+    """Errors returned as JSON objects or dicts are recorded with the error outcome."""
+    metrics = AgentMetrics()
+    tool = mock.Mock(func=None)
+    tool.name = "test_json_lookup"
+    tool_context = mock.Mock(function_call_id="call-json")
+    outcome = "error" if failed else "ok"
+    before = sample(
+        "travel_agent_tool_call_seconds_count",
+        tool="test_json_lookup",
+        source="function",
+        outcome=outcome,
+    )
+
+    metrics.before_tool_callback(tool, {}, tool_context)
+    metrics.after_tool_callback(tool, {}, tool_context, response)
+
+    assert is_tool_error(response) is failed
+    assert (
+        sample(
+            "travel_agent_tool_call_seconds_count",
+            tool="test_json_lookup",
+            source="function",
+            outcome=outcome,
+        )
+        == before + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_active_streams_are_counted_until_the_response_ends() -> None:
+    """The gauge covers the whole streaming response and ignores other paths."""
+    observed = []
+
+    async def app(scope: dict, receive: object, send: object) -> None:
+        observed.append(sample("travel_agent_active_streams", path="/run_sse"))
+
+    middleware = ActiveStreamsMiddleware(app)
+    before = sample("travel_agent_active_streams", path="/run_sse")
+
+    await middleware({"type": "http", "path": "/run_sse"}, None, None)
+    await middleware({"type": "http", "path": "/feedback"}, None, None)
+
+    assert observed == [before + 1, before]
+    assert sample("travel_agent_active_streams", path="/run_sse") == before
@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+import threading
+from pathlib import Path
+from unittest import mock
+
+from app.utils.payload_store import GcsPayloadStore, LocalPayloadStore, PayloadOffloader
+
+PAYLOAD = json.dumps({"llm.request": "Eres un asistente de viajes. " * 10000})
+
+
+def test_identical_payloads_are_stored_once_compressed(tmp_path: Path) -> None:
+    """Payloads are content-addressed and gzip-compressed."""
+    offloader = PayloadOffloader(LocalPayloadStore(str(tmp_path)))
+
+    first = offloader.submit(PAYLOAD)
+    offloader.flush()
+    second = offloader.submit(PAYLOAD)
+    offloader.close()
+
+    assert first is not None and first == second
+    files = list(tmp_path.rglob("*.json.gz"))
+    assert len(files) == 1
+    assert gzip.decompress(files[0].read_bytes()).decode() == PAYLOAD
+    stats = offloader.stats()
+    assert stats["uploaded"] == 1
+    assert stats["deduplicated"] == 1
+    assert stats["uploaded_bytes"] < stats["raw_bytes"] / 10
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path: Path) -> None:
+    """A slow store never blocks submit; overflow is dropped and counted."""
+    release = threading.Event()
+    store = LocalPayloadStore(str(tmp_path))
+    store.upload = mock.Mock(side_effect=lambda name, data: release.wait())  # type: ignore[method-assign]
+    offloader = PayloadOffloader(store, max_queue=2)
+
+    results = [offloader.submit(f"{PAYLOAD}{i}") for i in range(6)]
+    release.set()
+    offloader.close()
+
+    assert None in results
+    assert offloader.stats()["dropped"] >= 3
+
+
+def test_submit_leaves_the_availability_check_to_the_worker() -> None:
+    """Checking for the bucket may block, so it never happens on the caller's thread."""
+    release = threading.Event()
+    callers: list[threading.Thread] = []
+    store = mock.Mock()
+    store.uri.side_effect = lambda name: f"gs://bucket/{name}"
+    store.url.side_effect = lambda name: f"https://bucket/{name}"
+
+    def available() -> bool:
+        callers.append(threading.current_thread())
+        release.wait()
+        return False
+
+    store.available.side_effect = available
+    offloader = PayloadOffloader(store)
+
+    location = offloader.submit(PAYLOAD)
+    release.set()
+    offloader.close()
+
+    assert location is not None
+    assert callers and threading.current_thread() not in callers
+    store.upload.assert_not_called()
+    assert offloader.stats()["unavailable"] == 1
+
+
+def test_bucket_existence_is_checked_once() -> None:
+    """The bucket lookup is cached instead of repeated for every payload."""
+    storage_client = mock.Mock()
+    bucket = storage_client.bucket.return_value
+    bucket.exists.return_value = True
+    store = GcsPayloadStore(storage_client, "bucket")
+
+    assert all(store.available() for _ in range(10))
+    bucket.exists.assert_called_once()
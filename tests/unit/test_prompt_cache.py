@@ -0,0 +1,109 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from unittest import mock
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app.utils.prompt_cache import PromptCache
+
+STATIC = "Eres un asistente de viajes."
+DYNAMIC = "La fecha actual es: 2025-07-01."
+
+
+def make_request() -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[types.Content(role="user", parts=[types.Part(text="hola")])],
+        config=types.GenerateContentConfig(
+            system_instruction=DYNAMIC,
+            tools=[
+                types.Tool(
+                    function_declarations=[types.FunctionDeclaration(name="lookup")]
+                )
+            ],
+        ),
+    )
+
+
+def make_client(expire_in_seconds: float = 3600) -> mock.Mock:
+    def cached(name: str = "cachedContents/1", **_: object) -> types.CachedContent:
+        return types.CachedContent(
+            name=name,
+            expire_time=datetime.datetime.now(datetime.timezone.utc)
+            + datetime.timedelta(seconds=expire_in_seconds),
+        )
+
+    client = mock.Mock()
+    client.aio.caches.create = mock.AsyncMock(side_effect=lambda **_: cached())
+    client.aio.caches.update = mock.AsyncMock(side_effect=cached)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_request_points_at_cached_static_prompt() -> None:
+    """The static prompt and tools are cached once and the dynamic part moves to contents."""
+    client = make_client()
+    prompt_cache = PromptCache(STATIC, client=client)
+
+    for _ in range(3):
+        request = make_request()
+        await prompt_cache.before_model_callback(mock.Mock(), request)
+
+    client.aio.caches.create.assert_awaited_once()
+    config = client.aio.caches.create.await_args.kwargs["config"]
+    assert config.system_instruction == STATIC
+    assert config.tools[0].function_declarations[0].name == "lookup"
+    assert request.config is not None
+    assert request.config.cached_content == "cachedContents/1"
+    assert request.config.system_instruction is None
+    assert request.config.tools is None
+    assert [content.parts for content in request.contents] == [
+        [types.Part(text=DYNAMIC)],
+        [types.Part(text="hola")],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cache_ttl_is_renewed_before_expiry() -> None:
+    """A cache close to expiry gets its TTL extended instead of being recreated."""
+    client = make_client(expire_in_seconds=60)
+    prompt_cache = PromptCache(STATIC, renew_margin_seconds=300, client=client)
+
+    await prompt_cache.before_model_callback(mock.Mock(), make_request())
+    await prompt_cache.before_model_callback(mock.Mock(), make_request())
+
+    client.aio.caches.create.assert_awaited_once()
+    client.aio.caches.update.assert_awaited_once()
+    assert prompt_cache.stats()["caches_renewed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_inline_prompt_when_caching_fails() -> None:
+    """Without a usable cache the static prompt is sent inline with the dynamic one."""
+    client = make_client()
+    client.aio.caches.create.side_effect = RuntimeError("too small")
+    prompt_cache = PromptCache(STATIC, client=client)
+    request = make_request()
+
+    await prompt_cache.before_model_callback(mock.Mock(), request)
+
+    assert request.config is not None
+    assert request.config.cached_content is None
+    assert request.config.system_instruction == f"{STATIC}\n\n{DYNAMIC}"
+    assert request.config.tools is not None
+    assert prompt_cache.stats()["cache_errors"] == 1
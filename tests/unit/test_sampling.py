@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode
+
+from app.utils.sampling import (
+    TailSamplingSpanProcessor,
+    build_sampler,
+    build_span_processor,
+)
+
+TRACE_COUNT = 50
+
+
+def make_tracer(
+    memory_exporter: InMemorySpanExporter,
+    ratio: float = 1.0,
+    tail_sampling: bool = False,
+    allowlist: str | None = None,
+) -> tuple[TracerProvider, SpanProcessor]:
+    provider = TracerProvider(sampler=build_sampler(ratio, tail_sampling))
+    processor = build_span_processor(
+        SimpleSpanProcessor(memory_exporter),
+        ratio=ratio,
+        tail_sampling=tail_sampling,
+        allowlist=allowlist,
+    )
+    provider.add_span_processor(processor)
+    return provider, processor
+
+
+def test_head_sampling_keeps_whole_traces() -> None:
+    """With ratio 0 nothing is exported; child spans follow the root's decision."""
+    memory_exporter = InMemorySpanExporter()
+    provider, _ = make_tracer(memory_exporter, ratio=0.0)
+    tracer = provider.get_tracer(__name__)
+
+    for _ in range(TRACE_COUNT):
+        with tracer.start_as_current_span("invocation"):
+            with tracer.start_as_current_span("call_llm"):
+                pass
+
+    assert memory_exporter.get_finished_spans() == ()
+
+
+def test_tail_sampling_keeps_errored_and_slow_traces() -> None:
+    """Unremarkable traces are dropped while errored and slow ones are exported whole."""
+    memory_exporter = InMemorySpanExporter()
+    provider, processor = make_tracer(memory_exporter, ratio=0.0, tail_sampling=True)
+    tracer = provider.get_tracer(__name__)
+
+    for _ in range(TRACE_COUNT):
+        with tracer.start_as_current_span("invocation"):
+            with tracer.start_as_current_span("execute_tool get_travel_requests"):
+                pass
+    with tracer.start_as_current_span("invocation"):
+        with tracer.start_as_current_span(
+            "execute_tool register_travel_request"
+        ) as span:
+            span.set_status(Status(StatusCode.ERROR))
+    with tracer.start_as_current_span("invocation"):
+        span = tracer.start_span("execute_tool update_travel_request_status")
+        span.end(end_time=span.start_time + 5_000_000_000)  # type: ignore[attr-defined]
+
+    assert isinstance(processor, TailSamplingSpanProcessor)
+    assert len(memory_exporter.get_finished_spans()) == 4
+    stats = processor.stats()
+    assert stats["kept_for_error"] == 1
+    assert stats["kept_for_latency"] == 1
+    assert stats["dropped_traces"] == TRACE_COUNT
+    assert stats["buffered_traces"] == 0
+
+
+def test_attribute_allowlist_strips_prompt_bodies() -> None:
+    """Only allow-listed attributes reach the exporter."""
+    memory_exporter = InMemorySpanExporter()
+    provider, _ = make_tracer(memory_exporter, allowlist="gen_ai.request.model, gcp.*")
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span(
+        "call_llm",
+        attributes={
+            "gen_ai.request.model": "gemini-2.0-flash",
+            "gcp.vertex.agent.llm_request": "Eres un asistente de viajes.",
+            "llm.prompt": "Eres un asistente de viajes.",
+        },
+    ):
+        pass
+
+    (span,) = memory_exporter.get_finished_spans()
+    assert dict(span.attributes or {}) == {
+        "gen_ai.request.model": "gemini-2.0-flash",
+        "gcp.vertex.agent.llm_request": "Eres un asistente de viajes.",
+    }
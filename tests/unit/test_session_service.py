@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from app.utils.session_service import TieredSessionService
+
+
+def make_service(tmp_path: Path, **kwargs: int) -> TieredSessionService:
+    return TieredSessionService(f"sqlite:///{tmp_path / 'sessions.db'}", **kwargs)
+
+
+def make_event(text: str, **state: object) -> Event:
+    return Event(
+        author="user",
+        invocation_id="inv",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state),
+    )
+
+
+@pytest.mark.asyncio
+async def test_resident_sessions_are_bounded(tmp_path: Path) -> None:
+    """Only the most recently used sessions stay in memory; the rest are reloaded."""
+    service = make_service(tmp_path, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        session = await service.create_session(
+            app_name="app", user_id="u", session_id=session_id
+        )
+        await service.append_event(session, make_event(f"hola {session_id}"))
+
+    stats = service.stats()
+    assert stats["resident_sessions"] == 2
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] > 0
+
+    evicted = await service.get_session(app_name="app", user_id="u", session_id="a")
+    assert evicted is not None
+    assert evicted.events[0].content == types.Content(
+        role="user", parts=[types.Part(text="hola a")]
+    )
+    assert service.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sessions_survive_a_restart(tmp_path: Path) -> None:
+    """Events and state are written through to the store."""
+    service = make_service(tmp_path)
+    session = await service.create_session(app_name="app", user_id="u")
+    await service.append_event(session, make_event("hola", destino="Roma"))
+
+    restarted = make_service(tmp_path)
+    reloaded = await restarted.get_session(
+        app_name="app", user_id="u", session_id=session.id
+    )
+
+    assert reloaded is not None
+    assert reloaded.state["destino"] == "Roma"
+    assert len(reloaded.events) == 1
+
+
+@pytest.mark.asyncio
+async def test_changes_from_another_instance_are_picked_up(tmp_path: Path) -> None:
+    """A resident session updated elsewhere is reloaded instead of served stale."""
+    service = make_service(tmp_path)
+    other = make_service(tmp_path)
+    session = await service.create_session(app_name="app", user_id="u")
+    assert await service.get_session(app_name="app", user_id="u", session_id=session.id)
+
+    remote = await other.get_session(app_name="app", user_id="u", session_id=session.id)
+    assert remote is not None
+    await other.append_event(remote, make_event("desde otra instancia"))
+
+    current = await service.get_session(
+        app_name="app", user_id="u", session_id=session.id
+    )
+    assert current is not None
+    assert len(current.events) == 1
+    assert service.stats()["stale"] == 1
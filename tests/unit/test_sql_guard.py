@@ -0,0 +1,181 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from google.api_core.exceptions import BadRequest
+
+from app.utils.cache import TTLCache
+from app.utils.sql_guard import SqlGuard, normalize_sql
+from app.utils.toolbox_cache import MANIFEST_CACHE_VERSION, CachedToolboxToolset
+
+
+def make_guard(
+    bytes_processed: int = 1000, statement_type: str = "SELECT"
+) -> tuple[SqlGuard, mock.Mock]:
+    client = mock.Mock()
+    client.query.return_value = mock.Mock(
+        total_bytes_processed=bytes_processed, statement_type=statement_type
+    )
+    guard = SqlGuard(
+        TTLCache(maxsize=8, ttl_seconds=60),
+        client_factory=lambda: client,
+        max_bytes=10_000,
+        max_rows=50,
+    )
+    return guard, client
+
+
+def test_normalize_sql_keeps_literals() -> None:
+    """Comments and whitespace go away, string contents and identifiers do not."""
+    sql = "SELECT  *\n-- todas\nFROM `t`  WHERE city = 'San  Sebastián' ; "
+
+    assert normalize_sql(sql) == "SELECT * FROM `t` WHERE city = 'San  Sebastián'"
+
+
+@pytest.mark.asyncio
+async def test_select_is_limited_and_cached_by_normalized_sql() -> None:
+    """A SELECT gets a LIMIT and an equivalent spelling is served from the cache."""
+    guard, client = make_guard()
+    run = mock.AsyncMock(return_value='[{"n": 3}]')
+
+    first = await guard.execute("SELECT destination_city FROM `t`", run)
+    second = await guard.execute(
+        "SELECT destination_city\n  FROM `t`; -- destinos", run
+    )
+
+    assert first == second == '[{"n": 3}]'
+    run.assert_awaited_once_with("SELECT destination_city FROM `t`\nLIMIT 50")
+    assert client.query.call_count == 1
+    assert client.query.call_args.kwargs["job_config"].dry_run is True
+    assert guard.stats()["cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_results_are_not_cached() -> None:
+    """An error returned by the tool is passed on and the next call runs the query again."""
+    guard, _ = make_guard()
+    run = mock.AsyncMock(
+        side_effect=[
+            "Error técnico: la operación no terminó en 30 segundos",
+            '{"error": "quota exceeded"}',
+            '[{"n": 3}]',
+            "unused",
+        ]
+    )
+
+    results = [await guard.execute("SELECT n FROM `t`", run) for _ in range(4)]
+
+    assert results[2:] == ['[{"n": 3}]', '[{"n": 3}]']
+    assert run.await_count == 3
+    assert guard.stats()["failed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expensive_and_invalid_queries_never_run() -> None:
+    """Over-budget and malformed statements are answered with an error message."""
+    guard, client = make_guard(bytes_processed=50_000)
+    run = mock.AsyncMock()
+
+    rejected = await guard.execute("SELECT * FROM `t`", run)
+    client.query.side_effect = BadRequest("Syntax error: Unexpected end of script")
+    invalid = await guard.execute("SELECT FROM", run)
+
+    assert "Filtra por la columna `timestamp`" in rejected
+    assert "Syntax error" in invalid
+    run.assert_not_awaited()
+    assert guard.stats()["rejected"] == 1
+    assert guard.stats()["invalid"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dml_runs_as_written_and_invalidates_the_cache() -> None:
+    """Writes are not limited nor cached, and drop every cached read."""
+    guard, _ = make_guard(statement_type="UPDATE")
+    guard.cache.set(("sql", "SELECT 1"), "[]")
+    run = mock.AsyncMock(return_value="1 row affected")
+
+    await guard.execute(
+        "UPDATE `t` SET status = 'Aprobada' WHERE request_id = 'x'", run
+    )
+
+    run.assert_awaited_once_with(
+        "UPDATE `t` SET status = 'Aprobada' WHERE request_id = 'x'"
+    )
+    assert guard.cache.get(("sql", "SELECT 1")) is None
+
+
+@pytest.mark.asyncio
+async def test_only_writes_call_the_on_write_hook() -> None:
+    """State kept outside the cache is refreshed after DML, not after reads."""
+    guard, client = make_guard()
+    guard.on_write = mock.Mock()
+    run = mock.AsyncMock(return_value="[]")
+
+    await guard.execute("SELECT 1", run)
+    guard.on_write.assert_not_called()
+
+    client.query.return_value.statement_type = "UPDATE"
+    await guard.execute("UPDATE `t` SET status = 'Aprobada' WHERE TRUE", run)
+    guard.on_write.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_wrapped_toolbox_tool_keeps_its_declaration(tmp_path: Path) -> None:
+    """The model sees the same tool name and parameters through the wrapper."""
+    guard, _ = make_guard()
+    toolset = CachedToolboxToolset(
+        "http://127.0.0.1:9",
+        "travel",
+        cache_dir=str(tmp_path),
+        tool_wrappers={"execute_sql_tool": guard.wrap},
+    )
+    os.makedirs(os.path.dirname(toolset.cache_path), exist_ok=True)
+    with open(toolset.cache_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": MANIFEST_CACHE_VERSION,
+                "fetched_at": time.time(),
+                "manifest": {
+                    "serverVersion": "0.9.0",
+                    "tools": {
+                        "execute_sql_tool": {
+                            "description": "Ejecuta una consulta SQL.",
+                            "parameters": [
+                                {
+                                    "name": "sql",
+                                    "type": "string",
+                                    "description": "La consulta.",
+                                }
+                            ],
+                        }
+                    },
+                },
+            },
+            f,
+        )
+
+    [tool] = await toolset.get_tools()
+    declaration = tool._get_declaration()
+
+    assert declaration is not None
+    assert declaration.parameters is not None
+    assert declaration.name == "execute_sql_tool"
+    assert list(declaration.parameters.properties or {}) == ["sql"]
+    await toolset.close()
@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+from collections.abc import Iterator
+from typing import Any
+from unittest import mock
+
+import pytest
+from google.cloud import bigquery
+
+from app import agent
+from app.utils.cache import TTLCache
+from tests.benchmark.local_bigquery import (
+    TABLE_NAME,
+    LocalBigQueryClient,
+    LocalQueryJob,
+    LocalRow,
+)
+
+PAGE_SIZE = 4
+
+
+class RecordingClient(LocalBigQueryClient):
+    """Records when each job is submitted and when its result is read."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.events: list[str] = []
+
+    def query(
+        self, query: str, job_config: bigquery.QueryJobConfig | None = None
+    ) -> LocalQueryJob:
+        kind = "count" if "COUNT(*)" in query else "page"
+        self.events.append(f"submit {kind}")
+        job = super().query(query, job_config)
+        result = job.result
+
+        def recorded_result(timeout: float | None = None) -> list[LocalRow]:
+            self.events.append(f"result {kind}")
+            return result(timeout)
+
+        job.result = recorded_result  # type: ignore[method-assign]
+        return job
+
+
+def booking(request_id: str, day: int) -> dict[str, Any]:
+    return {
+        "request_id": request_id,
+        "timestamp": f"2025-01-{day:02d}T09:00:00+00:00",
+        "employee_first_name": "Lucía",
+        "employee_last_name": "García",
+        "destination_city": "Bilbao",
+        "start_date": "2025-02-01",
+        "end_date": "2025-02-02",
+        "reason": "Visita a cliente",
+        "status": "Aprobada",
+    }
+
+
+@pytest.fixture
+def client() -> Iterator[RecordingClient]:
+    client = RecordingClient()
+    # Three requests share each timestamp, so request_id has to break the ties.
+    client.insert_rows_json(
+        TABLE_NAME, [booking(f"id-{i:02d}", 1 + i // 3) for i in range(10)]
+    )
+    with (
+        mock.patch.object(agent, "get_bigquery_client", return_value=client),
+        mock.patch.object(
+            agent, "status_query_cache", TTLCache(maxsize=16, ttl_seconds=60)
+        ),
+        mock.patch.object(agent, "TRAVEL_REQUESTS_PAGE_SIZE", PAGE_SIZE),
+    ):
+        yield client
+
+
+def list_page(page_token: str | None = None) -> dict[str, Any]:
+    return json.loads(agent.get_travel_requests_by_status("Aprobada", page_token))
+
+
+def test_pages_follow_timestamp_then_request_id_without_gaps(
+    client: RecordingClient,
+) -> None:
+    """Pages walk (timestamp, request_id) newest first, even when rows are added between them."""
+    first = list_page()
+    client.insert_rows_json(TABLE_NAME, [booking("id-new", 28)])
+    second = list_page(first["next_page_token"])
+    third = list_page(second["next_page_token"])
+
+    listed = [
+        request["request_id"]
+        for page in (first, second, third)
+        for request in page["requests"]
+    ]
+    assert listed == [f"id-{i:02d}" for i in reversed(range(10))]
+    assert [len(page["requests"]) for page in (first, second, third)] == [4, 4, 2]
+    assert "next_page_token" not in third
+    assert first["count"] == 10
+
+
+def test_count_runs_alongside_the_page_query(client: RecordingClient) -> None:
+    """The COUNT job is submitted before the page is read and reused from the cache afterwards."""
+    first = list_page()
+    list_page(first["next_page_token"])
+
+    assert client.events[:4] == [
+        "submit count",
+        "submit page",
+        "result page",
+        "result count",
+    ]
+    assert client.events[4:] == ["submit page", "result page"]
+
+
+@pytest.mark.parametrize(
+    "tamper",
+    [
+        lambda token: "no-es-un-token",
+        lambda token: token[:-6],
+        lambda token: base64.urlsafe_b64encode(b'{"ts": "2025-01-01"}').decode(),
+        lambda token: base64.urlsafe_b64encode(
+            json.dumps(
+                {**json.loads(base64.urlsafe_b64decode(token)), "f": "0" * 16}
+            ).encode()
+        ).decode(),
+    ],
+    ids=["not-base64", "truncated", "missing-fields", "other-filter"],
+)
+def test_malformed_or_tampered_tokens_are_rejected(
+    client: RecordingClient, tamper: Any
+) -> None:
+    """A token that does not decode to a position of this search is refused without a query."""
+    token = list_page()["next_page_token"]
+    queries = client.stats()["queries"]
+
+    response = list_page(tamper(token))
+
+    assert "page_token" in response["error"]
+    assert client.stats()["queries"] == queries
+
+
+def test_a_token_of_another_search_is_rejected(client: RecordingClient) -> None:
+    """Tokens are bound to the statuses they were issued for."""
+    token = list_page()["next_page_token"]
+
+    response = json.loads(agent.get_travel_requests_by_status("Cancelada", token))
+
+    assert "page_token" in response["error"]
@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from app.utils.status_summary import DIMENSIONS, StatusSummary, SummaryKey, group_key
+from app.utils.travel_store import AnalyticsSpec, BigQueryTravelStore
+from tests.benchmark.local_bigquery import LocalBigQueryClient
+
+ROW = {
+    "request_id": "new-1",
+    "status": "Registrada",
+    "destination_city": "Bilbao",
+    "start_date": "2031-05-10",
+}
+
+
+def make_summary(**kwargs: Any) -> tuple[StatusSummary, LocalBigQueryClient]:
+    client = LocalBigQueryClient()
+    client.seed(300)
+    store = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=client.factory()
+    )
+
+    def load_counts() -> Iterator[tuple[SummaryKey, int]]:
+        for group in store.aggregate(
+            AnalyticsSpec(DIMENSIONS, ("requests",)), limit=10_000
+        ):
+            yield group_key(group), group["requests"]
+
+    return StatusSummary(load_counts, **kwargs), client
+
+
+def test_counts_match_a_group_by_over_the_table() -> None:
+    """After a reconciliation the summary agrees with the equivalent SQL aggregate."""
+    summary, client = make_summary()
+    assert summary.query(["status"]) is None
+
+    summary.reconcile()
+
+    expected = {
+        row.status: row.n
+        for row in client.query(
+            "SELECT status, COUNT(*) AS n FROM `t` GROUP BY status"
+        ).result()
+    }
+    assert {
+        group["status"]: group["count"] for group in summary.query(["status"]) or []
+    } == expected
+    assert summary.stats()["tracked_requests"] == 0
+    with pytest.raises(ValueError):
+        summary.query(["employee_id"])
+
+
+def approved_in_bilbao(summary: StatusSummary) -> int:
+    result = summary.query([], statuses=["Aprobada"], destination_city="bilbao")
+    assert result is not None
+    return result[0]["count"]
+
+
+def test_writes_update_the_counts_without_reading_the_table() -> None:
+    """Bookings and status changes move counts in memory; queries never run a job."""
+    summary, client = make_summary()
+    summary.reconcile()
+    queries = client.stats()["queries"]
+
+    summary.record(ROW)
+    before = approved_in_bilbao(summary)
+    summary.record_status_change(
+        {"new-1": "Registrada", "missing": "Registrada"}, "Aprobada"
+    )
+
+    after = summary.query(
+        ["month"],
+        statuses=["Aprobada"],
+        destination_city="bilbao",
+        month_from="2031-05",
+    )
+    assert after == [{"month": "2031-05", "count": 1}]
+    assert approved_in_bilbao(summary) == before + 1
+    assert summary.stats()["unknown_updates"] == 1
+    assert client.stats()["queries"] == queries
+
+
+def test_writes_during_a_reconciliation_are_kept() -> None:
+    """A status change recorded while the table is read survives the rebuild."""
+    summary: StatusSummary
+
+    def load_counts() -> Iterator[tuple[SummaryKey, int]]:
+        yield SummaryKey("Registrada", "Bilbao", "2031-05"), 1
+        # Written after the snapshot was read.
+        summary.record_status_change({"new-1": "Registrada"}, "Cancelada")
+        summary.record({**ROW, "request_id": "new-2"})
+
+    summary = StatusSummary(load_counts)
+    summary.record(ROW)
+
+    summary.reconcile()
+
+    assert summary.query(["status"]) == [
+        {"status": "Cancelada", "count": 1},
+        {"status": "Registrada", "count": 1},
+    ]
+
+
+def test_memory_is_bounded_and_changes_elsewhere_trigger_a_rebuild() -> None:
+    """Only recent writes are tracked; untracked changes and a new generation make it due."""
+    generation = [0]
+    summary, _ = make_summary(
+        max_tracked=2,
+        min_interval=0,
+        reconcile_interval=3600,
+        generation=lambda: generation[0],
+    )
+    summary.reconcile()
+    assert not summary._due()
+
+    for i in range(5):
+        summary.record({**ROW, "request_id": f"new-{i}"})
+    assert summary.stats()["tracked_requests"] == 2
+    summary.record_status_change({"new-4": "Registrada"}, "Aprobada")
+    assert not summary._due()
+
+    summary.record_status_change({"new-0": "Registrada"}, "Aprobada")
+    assert summary._due()
+    summary.reconcile()
+    assert not summary._due()
+
+    generation[0] += 1
+    assert summary._due()
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import sqlite3
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+from google.cloud import bigquery
+
+from app import agent
+from app.utils.travel_store import BigQueryTravelStore
+from tests.benchmark.local_bigquery import LocalBigQueryClient, LocalQueryJob
+
+
+@pytest.fixture
+def client() -> Iterator[LocalBigQueryClient]:
+    client = LocalBigQueryClient()
+    with mock.patch.object(agent, "get_bigquery_client", return_value=client):
+        yield client
+
+
+def status_of(client: LocalBigQueryClient, request_id: str) -> str | None:
+    store = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=client.factory()
+    )
+    row = store.get(request_id)
+    return row["status"] if row else None
+
+
+def test_bulk_update_reports_each_request(client: LocalBigQueryClient) -> None:
+    """Found, missing and already-updated IDs are told apart by one script run."""
+    updated, unchanged = client.seed(2)
+    agent.update_travel_request_status(updated, "Registrada")
+    agent.update_travel_request_status(unchanged, "Aprobada")
+    queries = client.stats()["queries"]
+
+    response = json.loads(
+        agent.update_travel_requests_status_bulk(
+            [updated, "missing", f" {unchanged}", updated], "aprobada"
+        )
+    )
+
+    assert client.stats()["queries"] == queries + 1
+    assert response == {
+        "new_status": "Aprobada",
+        "updated": 1,
+        "results": [
+            {
+                "request_id": updated,
+                "result": "actualizada",
+                "previous_status": "Registrada",
+            },
+            {"request_id": "missing", "result": "no_encontrada"},
+            {
+                "request_id": unchanged,
+                "result": "sin_cambios",
+                "previous_status": "Aprobada",
+            },
+        ],
+    }
+    assert status_of(client, updated) == status_of(client, unchanged) == "Aprobada"
+
+
+def test_bulk_update_rejects_too_many_ids_and_unknown_statuses(
+    client: LocalBigQueryClient,
+) -> None:
+    """Invalid calls are answered with an error before any job is run."""
+    request_ids = [f"id-{i}" for i in range(agent.BULK_UPDATE_MAX_IDS + 1)]
+
+    too_many = json.loads(
+        agent.update_travel_requests_status_bulk(request_ids, "Aprobada")
+    )
+    unknown = json.loads(agent.update_travel_requests_status_bulk(["id-1"], "Perdida"))
+
+    assert too_many["error"].startswith("Error de validación")
+    assert "no es un estado válido" in unknown["error"]
+    assert client.stats()["queries"] == 0
+
+
+def test_a_failed_status_change_changes_nothing(client: LocalBigQueryClient) -> None:
+    """The update runs in a transaction, so a failure before it commits rolls it back."""
+    (request_id,) = client.seed(1)
+    agent.update_travel_request_status(request_id, "Registrada")
+    store = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=client.factory()
+    )
+    query = client.query
+    scripts = []
+
+    def fail_before_commit(
+        sql: str, job_config: bigquery.QueryJobConfig | None = None
+    ) -> LocalQueryJob:
+        scripts.append(sql)
+        return query(
+            sql.replace("COMMIT TRANSACTION;", "SELECT missing; COMMIT TRANSACTION;"),
+            job_config,
+        )
+
+    with (
+        mock.patch.object(client, "query", fail_before_commit),
+        pytest.raises(sqlite3.OperationalError),
+    ):
+        store.apply_status_change(
+            [request_id], "Cancelada", "2025-01-01T00:00:00+00:00"
+        )
+
+    assert scripts[0].split()[:2] == ["BEGIN", "TRANSACTION;"]
+    assert status_of(client, request_id) == "Registrada"
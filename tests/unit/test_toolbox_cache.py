@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.utils.toolbox_cache import MANIFEST_CACHE_VERSION, CachedToolboxToolset
+
+UNREACHABLE_URL = "http://127.0.0.1:9"
+MANIFEST = {
+    "serverVersion": "0.9.0",
+    "tools": {
+        "execute_sql_tool": {
+            "description": "Ejecuta una consulta SQL.",
+            "parameters": [
+                {"name": "sql", "type": "string", "description": "La consulta."}
+            ],
+        }
+    },
+}
+
+
+def write_cache(toolset: CachedToolboxToolset, fetched_at: float) -> None:
+    os.makedirs(os.path.dirname(toolset.cache_path), exist_ok=True)
+    with open(toolset.cache_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": MANIFEST_CACHE_VERSION,
+                "fetched_at": fetched_at,
+                "manifest": MANIFEST,
+            },
+            f,
+        )
+
+
+@pytest.mark.asyncio
+async def test_stale_cache_is_kept_when_toolbox_is_unreachable(tmp_path: Path) -> None:
+    """A stale manifest is served and survives a failed background refresh."""
+    toolset = CachedToolboxToolset(
+        UNREACHABLE_URL, "travel", cache_dir=str(tmp_path), fetch_timeout=1
+    )
+    write_cache(toolset, fetched_at=time.time() - 10 * toolset.ttl_seconds)
+
+    tools = await toolset.get_tools()
+    assert [tool.name for tool in tools] == ["execute_sql_tool"]
+
+    assert await toolset.refresh() is False
+    assert [tool.name for tool in await toolset.get_tools()] == ["execute_sql_tool"]
+    await toolset.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_cache_and_unreachable_toolbox_yields_no_tools(
+    tmp_path: Path,
+) -> None:
+    """Without a cache the agent still starts, just without toolbox tools."""
+    toolset = CachedToolboxToolset(
+        UNREACHABLE_URL, "travel", cache_dir=str(tmp_path), fetch_timeout=1
+    )
+
+    assert await toolset.get_tools() == []
+    await toolset.close()
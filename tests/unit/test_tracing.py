@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from unittest import mock
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from app.utils.payload_store import LocalPayloadStore
+from app.utils.tracing import CloudTraceLoggingSpanExporter, MeteredBatchSpanProcessor
+
+SPAN_COUNT = 20
+
+
+def make_spans(count: int) -> list[ReadableSpan]:
+    memory_exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    tracer = provider.get_tracer(__name__)
+    with tracer.start_as_current_span("invocation"):
+        for i in range(count - 1):
+            with tracer.start_as_current_span(
+                "call_llm", attributes={"turn": i}
+            ) as span:
+                span.add_event("response", {"tokens": 10})
+    return list(memory_exporter.get_finished_spans())
+
+
+def make_exporter() -> CloudTraceLoggingSpanExporter:
+    return CloudTraceLoggingSpanExporter(
+        project_id="test-project",
+        client=mock.Mock(),
+        logging_client=mock.Mock(),
+        storage_client=mock.Mock(),
+    )
+
+
+def test_batch_is_written_in_one_logging_request() -> None:
+    """All spans of an export batch go out in a single Cloud Logging write."""
+    exporter = make_exporter()
+    spans = make_spans(SPAN_COUNT)
+
+    with mock.patch(
+        "opentelemetry.exporter.cloud_trace.CloudTraceSpanExporter.export",
+        return_value=SpanExportResult.SUCCESS,
+    ):
+        assert exporter.export(spans) == SpanExportResult.SUCCESS
+
+    batch = exporter.logger.batch.return_value
+    exporter.logger.batch.assert_called_once()
+    batch.commit.assert_called_once()
+    assert batch.log_struct.call_count == SPAN_COUNT
+    exporter.logger.log_struct.assert_not_called()
+    stats = exporter.stats()
+    assert stats["exported_spans"] == SPAN_COUNT
+    assert stats["dropped_spans"] == 0
+
+
+def test_log_entry_matches_span_json() -> None:
+    """The entry has the fields of ReadableSpan.to_json() plus trace and span IDs."""
+    exporter = make_exporter()
+    span = make_spans(2)[0]
+
+    entry, _ = exporter._span_entry(span)
+
+    expected = json.loads(span.to_json())
+    assert {k: v for k, v in entry.items() if k in expected} == expected
+    assert entry["trace"].startswith("projects/test-project/traces/")
+
+
+class StructBatch:
+    """Stands in for a gRPC logging batch, whose Struct conversion rejects tuples."""
+
+    def __init__(self) -> None:
+        self.entries: list[dict] = []
+
+    def log_struct(self, info: dict, **kwargs: object) -> None:
+        self.entries.append(info)
+
+    def commit(self) -> None:
+        for entry in self.entries:
+            json.dumps(entry, default=self._reject)
+
+    @staticmethod
+    def _reject(value: object) -> None:
+        raise TypeError(f"Value {value!r} has unexpected type {type(value).__name__}")
+
+
+def test_sequence_attributes_are_logged_as_lists() -> None:
+    """Tuple attributes of spans, events and resources do not fail the batch."""
+    memory_exporter = InMemorySpanExporter()
+    provider = TracerProvider(
+        resource=Resource.create({"service.tags": ("travel", "agent")})
+    )
+    provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    with provider.get_tracer(__name__).start_as_current_span(
+        "call_llm", attributes={"gen_ai.response.finish_reasons": ("stop",)}
+    ) as span:
+        span.add_event("response", {"token_counts": (3, 4)})
+    exporter = make_exporter()
+    batch = StructBatch()
+    exporter.logger.batch.return_value = batch
+
+    with mock.patch(
+        "opentelemetry.exporter.cloud_trace.CloudTraceSpanExporter.export",
+        return_value=SpanExportResult.SUCCESS,
+    ):
+        exporter.export(memory_exporter.get_finished_spans())
+
+    assert exporter.stats()["dropped_spans"] == 0
+    [entry] = batch.entries
+    assert entry["attributes"]["gen_ai.response.finish_reasons"] == ["stop"]
+    assert entry["events"][0]["attributes"]["token_counts"] == [3, 4]
+    assert entry["resource"]["attributes"]["service.tags"] == ["travel", "agent"]
+
+
+def test_failed_write_is_reported_as_dropped() -> None:
+    """Spans are still sent to Cloud Trace when the logging write fails."""
+    exporter = make_exporter()
+    exporter.logger.batch.return_value.commit.side_effect = RuntimeError("quota")
+
+    with mock.patch(
+        "opentelemetry.exporter.cloud_trace.CloudTraceSpanExporter.export",
+        return_value=SpanExportResult.SUCCESS,
+    ) as trace_export:
+        exporter.export(make_spans(3))
+
+    trace_export.assert_called_once()
+    assert exporter.stats()["dropped_spans"] == 3
+
+
+def test_large_attributes_are_offloaded_in_the_background(tmp_path: Path) -> None:
+    """Oversized attributes go to the payload store and out of the log entry."""
+    exporter = CloudTraceLoggingSpanExporter(
+        project_id="test-project",
+        client=mock.Mock(),
+        logging_client=mock.Mock(),
+        payload_store=LocalPayloadStore(str(tmp_path)),
+    )
+    provider = TracerProvider()
+    memory_exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    with provider.get_tracer(__name__).start_as_current_span(
+        "call_llm", attributes={"llm.request": "x" * 300 * 1024, "model": "gemini"}
+    ):
+        pass
+
+    entry, _ = exporter._span_entry(memory_exporter.get_finished_spans()[0])
+    exporter.payload_offloader.close()
+
+    assert "llm.request" not in entry["attributes"]
+    assert entry["attributes"]["model"] == "gemini"
+    assert entry["attributes"]["uri_payload"].startswith("file://")
+    assert len(list(tmp_path.rglob("*.json.gz"))) == 1
+
+
+class BlockingSpanExporter(InMemorySpanExporter):
+    """Holds the first export until released, so that the processor queue fills up."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = threading.Event()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        self.release.wait(5)
+        return super().export(spans)
+
+
+def test_spans_discarded_by_a_full_queue_are_counted() -> None:
+    """Dropped spans are the spans received minus those that reached the exporter."""
+    exporter = BlockingSpanExporter()
+    processor = MeteredBatchSpanProcessor(
+        exporter, max_queue_size=2, max_export_batch_size=1
+    )
+    spans = make_spans(SPAN_COUNT)
+
+    for span in spans:
+        processor.on_end(span)
+    exporter.release.set()
+    processor.force_flush()
+
+    exported = len(exporter.get_finished_spans())
+    assert processor.received_spans == SPAN_COUNT
+    assert 0 < exported < SPAN_COUNT
+    assert processor.dropped_spans == SPAN_COUNT - exported
+    processor.shutdown()
@@ -0,0 +1,263 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import io
+import json
+import time
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from app import agent
+from app.utils.bulk_import import LoadJobImporter
+from app.utils.cache import TTLCache
+from app.utils.travel_store import (
+    AnalyticsSpec,
+    BigQueryTravelStore,
+    ReplicatedTravelStore,
+    SqliteTravelStore,
+    StatusFilter,
+)
+from tests.benchmark.local_bigquery import LocalBigQueryClient, LocalQueryJob
+
+ROW_COUNT = 200
+PENDING = StatusFilter(("Registrada", "Pendiente de Aprobación"), case_insensitive=True)
+
+
+def make_store(
+    max_staleness: float = 60, on_change: mock.Mock | None = None
+) -> tuple[ReplicatedTravelStore, BigQueryTravelStore, list[str]]:
+    client = LocalBigQueryClient()
+    request_ids = client.seed(ROW_COUNT)
+    primary = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=client.factory()
+    )
+    store = ReplicatedTravelStore(
+        primary,
+        SqliteTravelStore(":memory:"),
+        sync_interval=3600,
+        max_staleness=max_staleness,
+        on_change=on_change,
+    )
+    store._thread = mock.Mock()  # syncs are run explicitly by the tests
+    return store, primary, request_ids
+
+
+def read_all_pages(store: ReplicatedTravelStore | BigQueryTravelStore) -> list[str]:
+    request_ids: list[str] = []
+    cursor = None
+    while True:
+        rows = store.find_by_status(PENDING, cursor, limit=25, count=False).rows or []
+        request_ids += [row["request_id"] for row in rows]
+        if len(rows) < 25:
+            return request_ids
+        cursor = (rows[-1]["timestamp"], rows[-1]["request_id"])
+
+
+def test_replica_serves_the_same_listing_as_bigquery_once_synced() -> None:
+    """Before the first sync reads go to BigQuery; afterwards the replica answers identically."""
+    store, primary, request_ids = make_store()
+
+    assert store.get(request_ids[0]) is not None
+    assert store.stats()["primary_reads"] == 1
+
+    store.sync()
+    replica_ids = read_all_pages(store)
+
+    assert replica_ids == read_all_pages(primary)
+    assert store.find_by_status(PENDING, None, 1).total == len(replica_ids)
+    assert store.get(request_ids[0])["status"] == primary.get(request_ids[0])["status"]  # type: ignore[index]
+    assert store.stats()["primary_reads"] == 1
+
+
+def test_sync_is_incremental_and_reports_foreign_changes() -> None:
+    """Only rows changed since the watermark are copied, and foreign changes are signalled."""
+    on_change = mock.Mock()
+    store, primary, request_ids = make_store(on_change=on_change)
+    store.sync()
+    on_change.reset_mock()
+    synced_before = store.stats()["synced_rows"]
+
+    # Another instance updates a request directly in BigQuery.
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    primary.apply_status_change([request_ids[0]], "Cancelada", now)
+    assert store.sync() == 1
+
+    on_change.assert_called_once()
+    assert store.get(request_ids[0])["status"] == "Cancelada"  # type: ignore[index]
+    assert store.stats()["synced_rows"] - synced_before < ROW_COUNT / 2
+
+
+def test_own_writes_are_visible_before_the_next_sync() -> None:
+    """Writes go to BigQuery and are applied to the replica straight away."""
+    store, primary, request_ids = make_store()
+    store.sync()
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    store.apply_status_change([request_ids[1]], "Aprobada", now)
+    store.insert(
+        {
+            "request_id": "new-request",
+            "timestamp": now,
+            "employee_first_name": "Lucía",
+            "status": "Registrada",
+        }
+    )
+
+    assert store.get(request_ids[1])["status"] == "Aprobada"  # type: ignore[index]
+    assert primary.get(request_ids[1])["status"] == "Aprobada"  # type: ignore[index]
+    assert store.get("new-request") is not None
+    assert store.stats()["primary_reads"] == 0
+
+
+def test_full_sync_copies_rows_the_watermark_skips() -> None:
+    """A row visible only after the overlap is missed incrementally and copied by a full sync."""
+    store, primary, _ = make_store()
+    store.sync()
+    replayed = {
+        "request_id": "replayed-from-wal",
+        "timestamp": "2020-01-01T00:00:00+00:00",
+        "status": "Registrada",
+    }
+    primary.insert(replayed)
+
+    store.sync()
+    assert store.replica.get("replayed-from-wal") is None
+
+    store.request_full_sync()
+    assert store.sync() == 1
+    assert store.replica.get("replayed-from-wal") is not None
+    assert store.stats()["full_syncs"] == 2
+
+
+def test_streamed_bookings_are_read_back_from_the_replica() -> None:
+    """In stream mode a confirmed booking is found before the writer flushes it."""
+    store, _, _ = make_store()
+    store.sync()
+    writer = mock.Mock()
+    booking = agent._TravelBookingArgsSchema(
+        employee_first_name="Lucía",
+        employee_last_name="García",
+        employee_id="EMP-1042",
+        origin_city="Madrid",
+        destination_city="Bilbao",
+        start_date="2031-05-10",
+        end_date="2031-05-12",
+        transport_mode="Tren",
+        reason="Visita a cliente",
+    )
+    with (
+        mock.patch.object(agent, "BOOKING_WRITE_MODE", "stream"),
+        mock.patch.object(agent, "booking_writer", writer),
+        mock.patch.object(agent, "travel_store", store),
+        mock.patch.object(agent, "status_summary", mock.Mock()),
+        mock.patch.object(agent, "status_query_cache", TTLCache(16, 60)),
+    ):
+        agent._register_booking(booking)
+        request_id = writer.submit.call_args.args[0]["request_id"]
+        response = json.loads(agent._lookup_travel_request(request_id))
+
+    assert response["request"]["request_id"] == request_id
+    assert store.stats()["primary_reads"] == 0
+
+
+def test_imported_rows_reach_the_replicas_of_other_instances() -> None:
+    """Rows are stamped when their load job commits, after a watermark set during a slow load."""
+    client = LocalBigQueryClient()
+    client.seed(ROW_COUNT)
+    primary = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=client.factory()
+    )
+    importer, other = (
+        ReplicatedTravelStore(primary, SqliteTravelStore(":memory:"), sync_overlap=0)
+        for _ in range(2)
+    )
+    for store in (importer, other):
+        store._thread = mock.Mock()  # syncs are run explicitly by the test
+        store.sync()
+    load_table_from_file = client.load_table_from_file
+
+    def slow_load(*args: Any, **kwargs: Any) -> LocalQueryJob:
+        # While the job runs, a booking elsewhere moves the other replica's watermark.
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        primary.insert(
+            {"request_id": "booked-meanwhile", "timestamp": now, "status": "Registrada"}
+        )
+        other.sync()
+        return load_table_from_file(*args, **kwargs)
+
+    bulk_importer = LoadJobImporter(
+        "project.dataset.travel_requests",
+        client_factory=client.factory(),
+        timestamp_column="timestamp",
+    )
+    upload = "".join(
+        json.dumps({"request_id": f"imported-{i}", "status": "Registrada"}) + "\n"
+        for i in range(3)
+    )
+    with mock.patch.object(client, "load_table_from_file", slow_load):
+        result = bulk_importer.run(
+            io.BytesIO(upload.encode()), "jsonl", dict, importer.replica.upsert
+        )
+
+    assert result.loaded == 3
+    assert importer.get("imported-0") is not None
+    assert other.get("booked-meanwhile") is not None
+    assert other.stats()["primary_reads"] == 0
+    assert other.get("imported-0") is None
+    other.sync()
+    assert all(other.get(f"imported-{i}") is not None for i in range(3))
+
+
+def test_stale_replica_falls_back_to_bigquery() -> None:
+    """Reads go to BigQuery once the last sync is older than max_staleness."""
+    store, _, request_ids = make_store(max_staleness=0.05)
+    store.sync()
+    time.sleep(0.1)
+
+    store.get(request_ids[0])
+
+    assert store.stats()["primary_reads"] == 1
+    assert store.stats()["replica_reads"] == 0
+
+
+def test_aggregate_compiles_one_parameterized_query() -> None:
+    """Names map to fixed expressions and every filter value is a parameter."""
+    client = mock.Mock()
+    client.query.return_value.result.return_value = []
+    store = BigQueryTravelStore(
+        "project.dataset.travel_requests", client_factory=lambda: client
+    )
+    spec = AnalyticsSpec(
+        dimensions=("month", "transport_mode"),
+        metrics=("requests", "avg_trip_days"),
+        start_from=datetime.date(2025, 1, 1),
+        statuses=("Aprobada",),
+    )
+
+    store.aggregate(spec, limit=10)
+
+    query = client.query.call_args.args[0]
+    params = {
+        p.name for p in client.query.call_args.kwargs["job_config"].query_parameters
+    }
+    assert "FORMAT_DATE('%Y-%m', start_date) AS month" in query
+    assert "GROUP BY 1, 2" in query
+    assert "ORDER BY month, requests DESC" in query
+    assert "Aprobada" not in query and "2025" not in query
+    assert params == {"group_limit", "start_from", "statuses"}
+    with pytest.raises(ValueError):
+        store.aggregate(spec._replace(metrics=("SUM(salary)",)), limit=10)